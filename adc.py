@@ -13,6 +13,7 @@
 #    limitations under the License.
 
 from uctypes import BF_POS, BF_LEN, BFUINT32, struct
+from .reg import Atomic
 
 ADC_BASE = 0x4004c000
 
@@ -66,4 +67,5 @@ ADC_FIELDS = {
     "INTS": 0x20 | 0 << BF_POS | 1 << BF_LEN | BFUINT32, # Interrupt status
 }
 
-adc = struct(ADC_BASE, ADC_FIELDS)
\ No newline at end of file
+adc = struct(ADC_BASE, ADC_FIELDS)
+adc_atomic = Atomic(ADC_BASE, ADC_FIELDS)
@@ -0,0 +1,169 @@
+#    Copyright 2025 Hessam Mehr
+
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+
+#        http://www.apache.org/licenses/LICENSE-2.0
+
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+
+from array import array
+from uctypes import addressof
+from .adc import adc, ADC_BASE
+from .dma import *
+from .clkplan import adc_div
+
+ADC_FIFO_ADDR = const(ADC_BASE + 0x0c)
+
+class AdcStream:
+    """
+    Continuous ADC capture into a pair of DMA ping-pong buffers.
+
+    channels is a list of ADC inputs (0-4) sampled round-robin, in ascending
+    order, at rate samples/s each. Two DMA channels paced by DREQ_ADC chain
+    to each other, each filling one block of block samples. Every buffer is
+    a write ring aligned to its size, so a finished channel is ready to be
+    re-triggered by its partner without CPU involvement and no samples are
+    dropped between blocks; block must therefore be a power of two (at most
+    32 kB of data).
+
+    With bits=8 the FIFO delivers the top 8 bits of each result (FCS.SHIFT)
+    as bytes, otherwise 12-bit results as halfwords.
+
+    Iterating over blocks() yields memoryviews of completed blocks without
+    copying; a view is overwritten two blocks later, so it must be consumed
+    (or demultiplexed) before then. overruns counts blocks that completed
+    while the previous one was still being handed out.
+    """
+
+    def __init__(self, channels, rate, block=256, bits=12):
+        if block & (block - 1):
+            raise ValueError("block must be a power of two")
+        self.channels = sorted(channels)
+        self.rate = rate
+        self.block = block
+        self.bits = bits
+        itemsize = 1 if bits == 8 else 2
+        nbytes = block * itemsize
+        if nbytes > 1 << 15:
+            raise ValueError("block too large for a DMA ring")
+        # Room to align the pair of buffers to the ring size
+        self._raw = array("B" if bits == 8 else "H", bytearray(3 * nbytes))
+        start = (-addressof(self._raw) % nbytes) // itemsize
+        raw = memoryview(self._raw)
+        self.buffers = (raw[start:start + block], raw[start + block:start + 2 * block])
+        self.dma_ch = (allocator.claim_channel(owner=self), allocator.claim_channel(owner=self))
+        ring = 0
+        while 1 << ring < nbytes:
+            ring += 1
+        self._configs = [DmaConfig(
+            read_addr=ADC_FIFO_ADDR,
+            write_addr=addressof(self.buffers[i]),
+            trans_count=block,
+            CHAIN_TO=self.dma_ch[1 - i],
+            TREQ_SEL=DREQ_ADC,
+            DATA_SIZE=DMA_SIZE_BYTE if bits == 8 else DMA_SIZE_HALFWORD,
+            INCR_READ=0,
+            INCR_WRITE=1,
+            RING_SEL=1,
+            RING_SIZE=ring,
+        ) for i in range(2)]
+        self.running = False
+        self.overruns = 0
+        self.count = 0
+
+    def _drain(self):
+        while not adc.FCS.EMPTY:
+            adc.FIFO.VAL
+
+    def start(self):
+        mask = 0
+        for ch in self.channels:
+            mask |= 1 << ch
+        int_div, frac_div = adc_div(self.rate * len(self.channels))[:2]
+        adc.CS.EN = 1
+        while not adc.CS.READY:
+            pass
+        adc.CS.START_MANY = 0
+        self._drain()
+        adc.DIV.INT = int_div
+        adc.DIV.FRAC = frac_div
+        adc.FCS.ERR = 0
+        adc.FCS.SHIFT = 1 if self.bits == 8 else 0
+        adc.FCS.THRESH = 1
+        adc.FCS.DREQ_EN = 1
+        adc.FCS.EN = 1
+        adc.FCS.OVER = 1
+        adc.FCS.UNDER = 1
+        dma_words.INTR = 1 << self.dma_ch[0] | 1 << self.dma_ch[1]
+        self._configs[1].apply(self.dma_ch[1], trigger=False)
+        self._configs[0].apply(self.dma_ch[0])
+        self.overruns = 0
+        self.count = 0
+        self.running = True
+        adc.CS.AINSEL = min(self.channels)
+        adc.CS.RROBIN = mask
+        adc.CS.START_MANY = 1
+
+    def stop(self):
+        self.running = False
+        adc.CS.START_MANY = 0
+        for ch in self.dma_ch:
+            # Clear EN first so an aborted channel cannot trigger its partner
+            dma.CH[ch].ALIAS1.CTRL.EN = 0
+        dma_words.CHAN_ABORT = 1 << self.dma_ch[0] | 1 << self.dma_ch[1]
+        while dma_words.CHAN_ABORT:
+            pass
+        adc.CS.RROBIN = 0
+        adc.FCS.DREQ_EN = 0
+        self._drain()
+
+    def close(self):
+        if self.running:
+            self.stop()
+        for ch in self.dma_ch:
+            allocator.unclaim_channel(ch)
+
+    def blocks(self):
+        """Yield each completed block, in order, until stop() is called."""
+        bits = (1 << self.dma_ch[0], 1 << self.dma_ch[1])
+        n = self.count & 1
+        while self.running:
+            bit = bits[n]
+            while not dma_words.INTR & bit:
+                if not self.running:
+                    return
+            dma_words.INTR = bit
+            if dma_words.INTR & bits[1 - n]:
+                self.overruns += 1
+            self.count += 1
+            yield self.buffers[n]
+            n ^= 1
+
+    def phase(self):
+        """Index into channels of the first sample of the last yielded block."""
+        return (self.count - 1) * self.block % len(self.channels)
+
+    def demux(self, view, outs, phase=0):
+        """
+        Split an interleaved round-robin block into per-channel arrays.
+        outs[i] receives the samples of channels[i] (from index 0); phase is
+        the channel index of view[0] (see phase()), which varies from block to
+        block when block is not a multiple of the number of channels. Returns
+        the sample count of each.
+        """
+        n = len(self.channels)
+        counts = []
+        for c in range(n):
+            out = outs[c]
+            j = 0
+            for i in range((c - phase) % n, len(view), n):
+                out[j] = view[i]
+                j += 1
+            counts.append(j)
+        return counts
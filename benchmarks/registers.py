@@ -0,0 +1,210 @@
+#    Copyright 2025 Hessam Mehr
+
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+
+#        http://www.apache.org/licenses/LICENSE-2.0
+
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+
+"""
+Register-access benchmarks, run on a host against the simulated register space.
+
+Each scenario is a typical configuration sequence; for each one the number of
+MMIO reads and writes per run and the wall time per run are reported. Results
+are written as JSON so they can be compared between releases:
+
+    python -m rp2040hw.benchmarks.registers -o new.json --compare old.json
+
+--compare exits with status 1 if any scenario needs more bus accesses than in
+the baseline. Wall times are host timings of the simulation and only useful
+relative to each other.
+"""
+
+import json
+import sys
+import time
+
+from rp2040hw import sim
+
+memory = sim.install()
+
+from uctypes import addressof
+from rp2040hw.adc import adc, ADC_FIELDS
+from rp2040hw.dma import *
+from rp2040hw.gpio import io_bank0
+from rp2040hw.pio import pios, pios_atomic, SM_FILEDS
+from rp2040hw.pwm import pwm, CHANNEL_FIELDS
+from rp2040hw.reg import Shadow, pack
+
+DMA_CHANNEL = 0
+DMA_TIMER_NUM = 0
+SM = 1
+PWM_SLICE = 2
+
+_data = bytearray(8)
+_data_addr = addressof(_data)
+_gpio_ctrl_addr = addressof(io_bank0.GPIO[18].CTRL)
+
+def dma_blink_fields():
+    # The per-field sequence from examples/dma_blink.py
+    ch = dma.CH[DMA_CHANNEL]
+    ch.CTRL_TRIG.EN = 0
+    ch.READ_ADDR = _data_addr
+    ch.WRITE_ADDR = _gpio_ctrl_addr
+    ch.TRANS_COUNT = 1000
+    ch.CTRL_TRIG.CHAIN_TO = DMA_CHANNEL
+    ch.CTRL_TRIG.TREQ_SEL = DREQ_TIMER0 + DMA_TIMER_NUM
+    ch.CTRL_TRIG.INCR_WRITE = 0
+    ch.CTRL_TRIG.INCR_READ = 1
+    ch.CTRL_TRIG.DATA_SIZE = DMA_SIZE_WORD
+    ch.CTRL_TRIG.RING_SIZE = 3
+    ch.CTRL_TRIG.EN = 1
+
+_blink_config = DmaConfig(
+    read_addr=_data_addr, write_addr=_gpio_ctrl_addr, trans_count=1000,
+    TREQ_SEL=DREQ_TIMER0 + DMA_TIMER_NUM, INCR_WRITE=0, RING_SIZE=3,
+)
+
+def dma_blink_config():
+    _blink_config.apply(DMA_CHANNEL)
+
+def dma_rearm_fields():
+    dma.CH[DMA_CHANNEL].ALIAS1.TRANS_COUNT_TRIG = 1000
+
+def dma_rearm_config():
+    _blink_config.rearm(DMA_CHANNEL)
+
+def pio_sm_fields():
+    pio = pios[0]
+    pio.CTRL.SM_ENABLE = pio.CTRL.SM_ENABLE & ~(1 << SM)
+    sm = pio.SM[SM]
+    sm.CLKDIV.INT = 125
+    sm.CLKDIV.FRAC = 0
+    sm.EXECCTRL.WRAP_BOTTOM = 0
+    sm.EXECCTRL.WRAP_TOP = 3
+    sm.EXECCTRL.JMP_PIN = 5
+    sm.SHIFTCTRL.AUTOPUSH = 1
+    sm.SHIFTCTRL.PUSH_THRESH = 8
+    sm.SHIFTCTRL.IN_SHIFTDIR = 1
+    sm.PINCTRL.IN_BASE = 5
+    sm.PINCTRL.SET_BASE = 6
+    sm.PINCTRL.SET_COUNT = 1
+    pio.CTRL.SM_ENABLE = pio.CTRL.SM_ENABLE | 1 << SM
+
+def pio_sm_shadow():
+    pios_atomic[0].clr.CTRL = 1 << SM
+    with Shadow(addressof(pios[0].SM[SM]), SM_FILEDS) as sm:
+        sm.CLKDIV.INT = 125
+        sm.CLKDIV.FRAC = 0
+        sm.EXECCTRL.WRAP_BOTTOM = 0
+        sm.EXECCTRL.WRAP_TOP = 3
+        sm.EXECCTRL.JMP_PIN = 5
+        sm.SHIFTCTRL.AUTOPUSH = 1
+        sm.SHIFTCTRL.PUSH_THRESH = 8
+        sm.SHIFTCTRL.IN_SHIFTDIR = 1
+        sm.PINCTRL.IN_BASE = 5
+        sm.PINCTRL.SET_BASE = 6
+        sm.PINCTRL.SET_COUNT = 1
+    pios_atomic[0].set.CTRL = 1 << SM
+
+def pwm_sweep_fields():
+    cc = pwm.CH[PWM_SLICE].CC
+    for duty in range(0, 1024, 64):
+        cc.A = duty
+        cc.B = 1023 - duty
+
+def pwm_sweep_shadow():
+    txn = Shadow(addressof(pwm.CH[PWM_SLICE]), CHANNEL_FIELDS, zero=True)
+    for duty in range(0, 1024, 64):
+        with txn as ch:
+            ch.CC.A = duty
+            ch.CC.B = 1023 - duty
+
+def adc_rrobin_fields():
+    adc.CS.EN = 1
+    adc.DIV.INT = 959
+    adc.DIV.FRAC = 0
+    adc.FCS.EN = 1
+    adc.FCS.DREQ_EN = 1
+    adc.FCS.THRESH = 1
+    adc.FCS.SHIFT = 0
+    adc.CS.AINSEL = 0
+    adc.CS.RROBIN = 0b00111
+    adc.CS.START_MANY = 1
+
+def adc_rrobin_shadow():
+    with Shadow(addressof(adc), ADC_FIELDS, zero=True) as a:
+        a.DIV.INT = 959
+        a.FCS.EN = 1
+        a.FCS.DREQ_EN = 1
+        a.FCS.THRESH = 1
+        a.CS.EN = 1
+        a.CS.AINSEL = 0
+        a.CS.RROBIN = 0b00111
+    adc.CS.START_MANY = 1
+
+SCENARIOS = (
+    dma_blink_fields, dma_blink_config,
+    dma_rearm_fields, dma_rearm_config,
+    pio_sm_fields, pio_sm_shadow,
+    pwm_sweep_fields, pwm_sweep_shadow,
+    adc_rrobin_fields, adc_rrobin_shadow,
+)
+
+def run(scenario, repeat=200):
+    """Return MMIO reads and writes per run and wall time per run in us."""
+    scenario()
+    memory.reset_counts()
+    scenario()
+    reads, writes = memory.reads, memory.writes
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        scenario()
+    us = (time.perf_counter() - t0) * 1e6 / repeat
+    return {"reads": reads, "writes": writes, "us": round(us, 2)}
+
+def compare(results, baseline):
+    """Print per-scenario changes and return True if bus accesses went up."""
+    worse = False
+    for name, r in results.items():
+        b = baseline.get(name)
+        if b is None:
+            continue
+        d_reads = r["reads"] - b["reads"]
+        d_writes = r["writes"] - b["writes"]
+        if d_reads or d_writes:
+            print(f"{name}: reads {b['reads']} -> {r['reads']}, writes {b['writes']} -> {r['writes']}")
+        worse |= d_reads > 0 or d_writes > 0
+    return worse
+
+def main(argv):
+    out = baseline = None
+    args = iter(argv)
+    for arg in args:
+        if arg in ("-o", "--output"):
+            out = next(args)
+        elif arg == "--compare":
+            baseline = next(args)
+        else:
+            raise SystemExit(f"unknown argument {arg}")
+    results = {}
+    for scenario in SCENARIOS:
+        r = results[scenario.__name__] = run(scenario)
+        print(f"{scenario.__name__:20} {r['reads']:4} reads {r['writes']:4} writes {r['us']:10.2f} us")
+    if out is not None:
+        with open(out, "w") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+    if baseline is not None:
+        with open(baseline) as f:
+            if compare(results, json.load(f)):
+                return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
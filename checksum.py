@@ -0,0 +1,173 @@
+#    Copyright 2025 Hessam Mehr
+
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+
+#        http://www.apache.org/licenses/LICENSE-2.0
+
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+
+"""
+Checksums computed by the DMA sniffer, with a hashlib-like interface.
+
+    h = checksum.new("crc32")
+    h.update(chunk)
+    h.digest()
+
+Data is run through a memory-to-memory DMA transfer into a dummy word with
+the sniffer watching the channel, so the checksum costs about one system
+clock per byte. Off-target (or with hw=False) a bit-exact table-driven
+software implementation of the same sniffer modes is used instead.
+"""
+
+from array import array
+from sys import platform
+from uctypes import addressof
+from .dma import *
+from .piodma import itemsize
+from .reg import pack
+
+_HW = platform == "rp2"
+
+# Buffers shorter than this are cheaper to checksum in software
+_HW_MIN_BYTES = const(32)
+
+# name: (sniffer mode, seed, width, reflect result, final XOR)
+ALGORITHMS = {
+    "crc32":        (DMA_SNIFF_CALC_CRC32R, 0xFFFFFFFF, 32, True, 0xFFFFFFFF), # zlib/Ethernet
+    "crc32_mpeg2":  (DMA_SNIFF_CALC_CRC32, 0xFFFFFFFF, 32, False, 0),
+    "crc16":        (DMA_SNIFF_CALC_CRC16, 0xFFFF, 16, False, 0),               # CCITT-FALSE
+    "crc16_xmodem": (DMA_SNIFF_CALC_CRC16, 0, 16, False, 0),
+    "crc16_kermit": (DMA_SNIFF_CALC_CRC16R, 0, 16, True, 0),
+    "parity":       (DMA_SNIFF_CALC_EVEN, 0, 1, False, 0),
+    "sum32":        (DMA_SNIFF_CALC_SUM, 0, 32, False, 0),
+}
+
+_POLY = {32: 0x04C11DB7, 16: 0x1021}
+_tables = {}
+_REV8 = bytes(int("{:08b}".format(i)[::-1], 2) for i in range(256))
+
+def _crc_table(width):
+    table = _tables.get(width)
+    if table is None:
+        poly = _POLY[width]
+        top = 1 << (width - 1)
+        mask = (1 << width) - 1
+        table = _tables[width] = array("L", [0] * 256)
+        for i in range(256):
+            crc = i << (width - 8)
+            for _ in range(8):
+                crc = ((crc << 1) ^ poly if crc & top else crc << 1) & mask
+            table[i] = crc
+    return table
+
+def _reflect(value, width):
+    out = 0
+    for _ in range(width):
+        out = out << 1 | value & 1
+        value >>= 1
+    return out
+
+def sniff(calc, state, data):
+    """
+    Software model of the sniffer: the SNIFF_DATA value after byte transfers
+    of data starting from state, in mode calc.
+    """
+    if calc == DMA_SNIFF_CALC_SUM:
+        return (state + sum(data)) & 0xFFFFFFFF
+    if calc == DMA_SNIFF_CALC_EVEN:
+        for b in data:
+            b ^= b >> 4
+            b ^= b >> 2
+            state ^= (b ^ b >> 1) & 1
+        return state
+    width = 16 if calc >= DMA_SNIFF_CALC_CRC16 else 32
+    table = _crc_table(width)
+    shift = width - 8
+    mask = (1 << width) - 1
+    if calc & 1:
+        rev = _REV8
+        for b in data:
+            state = (state << 8 & mask) ^ table[(state >> shift) ^ rev[b]]
+    else:
+        for b in data:
+            state = (state << 8 & mask) ^ table[(state >> shift) ^ b]
+    return state
+
+_sink = array("L", [0])
+_channel = None
+_config = None
+
+def _sniff_dma(calc, state, buf, nbytes):
+    global _channel, _config
+    if _channel is None:
+        _channel = allocator.claim_channel(owner="checksum")
+        _config = DmaConfig(write_addr=addressof(_sink), DATA_SIZE=DMA_SIZE_BYTE, SNIFF_EN=1)
+    dma.SNIFF_DATA = state
+    dma_words.SNIFF_CTRL = pack(DMA_SNIFF_CTRL_FIELDS, EN=1, DMACH=_channel, CALC=calc)
+    _config.read_addr = addressof(buf)
+    _config.trans_count = nbytes
+    _config.apply(_channel)
+    while dma.CH[_channel].CTRL_TRIG.BUSY:
+        pass
+    state = dma.SNIFF_DATA
+    dma_words.SNIFF_CTRL = 0
+    return state
+
+class Checksum:
+    """
+    Incremental checksum in one of ALGORITHMS.
+
+    The running value is kept in sniffer form and seeded into SNIFF_DATA for
+    each update(), so updates may be split anywhere. Data is fed byte by byte
+    regardless of the buffer's item size. The sniffer is shared, so updates
+    are synchronous; the DMA channel is claimed on first use and kept.
+    """
+
+    def __init__(self, name="crc32", data=None, hw=None):
+        self.name = name
+        self._calc, self._state, self._width, self._reflect, self._xorout = ALGORITHMS[name]
+        self.hw = _HW if hw is None else hw
+        self.digest_size = (self._width + 7) // 8
+        if data is not None:
+            self.update(data)
+
+    def update(self, data):
+        view = memoryview(data)
+        size = itemsize(data)
+        nbytes = len(view) * size
+        if self.hw and nbytes >= _HW_MIN_BYTES:
+            state = _sniff_dma(self._calc, self._state, data, nbytes)
+            if self._width < 32:
+                state &= (1 << self._width) - 1
+            self._state = state
+        else:
+            if size != 1:
+                view = memoryview(bytes(view))
+            self._state = sniff(self._calc, self._state, view)
+
+    def copy(self):
+        other = Checksum(self.name, hw=self.hw)
+        other._state = self._state
+        return other
+
+    def intdigest(self):
+        value = self._state
+        if self._reflect:
+            value = _reflect(value, self._width)
+        return value ^ self._xorout
+
+    def digest(self):
+        value = self.intdigest()
+        return bytes((value >> (8 * i)) & 0xFF for i in range(self.digest_size - 1, -1, -1))
+
+    def hexdigest(self):
+        return "".join("{:02x}".format(b) for b in self.digest())
+
+def new(name, data=None, hw=None):
+    return Checksum(name, data, hw)
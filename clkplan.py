@@ -0,0 +1,201 @@
+#    Copyright 2025 Hessam Mehr
+
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+
+#        http://www.apache.org/licenses/LICENSE-2.0
+
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+
+"""
+Clock divider planning for PIO, PWM, ADC, SPI, UART and the DMA pacing timers.
+
+Each planner returns the register settings closest to a target frequency
+followed by the frequency actually achieved and its error in ppm. All
+arithmetic is done on integers (clocks given as floats are truncated to
+whole Hz), so results are exact regardless of float precision, and
+results are memoized per (block, target, clock).
+"""
+
+try:
+    from machine import freq as _machine_freq
+except ImportError:
+    _machine_freq = None
+
+DEFAULT_SYSCLK_HZ = const(125_000_000)
+ADC_CLK_HZ = const(48_000_000)
+
+_cache = {}
+
+def sysclk():
+    """Current system clock, or 125 MHz off-target."""
+    return _machine_freq() if _machine_freq is not None else DEFAULT_SYSCLK_HZ
+
+def _ratio(freq):
+    # Frequencies as num/den; floats are taken to the nearest mHz
+    if isinstance(freq, int):
+        return freq, 1
+    return int(freq * 1000 + 0.5), 1000
+
+def _result(f_num, f_den, num, den):
+    # Achieved frequency f_num/f_den against a target of num/den
+    return f_num / f_den, (f_num * den - f_den * num) * 1e6 / (f_den * num)
+
+def pio_div(target, clk=None):
+    """
+    PIO SM CLKDIV for target: (INT, FRAC, freq, ppm), with the divider
+    INT + FRAC/256 rounded to nearest (INT=0 encodes 65536).
+    """
+    clk = int(clk or sysclk())
+    key = ("pio", target, clk)
+    result = _cache.get(key)
+    if result is None:
+        num, den = _ratio(target)
+        total = (2 * clk * 256 * den + num) // (2 * num)
+        if not 256 <= total <= 65536 * 256:
+            raise ValueError("PIO frequency out of range")
+        result = _cache[key] = (total >> 8 & 0xFFFF, total & 0xFF) + _result(clk * 256, total, num, den)
+    return result
+
+def pwm_div(target, clk=None, phase_correct=False, tolerance_ppm=None):
+    """
+    PWM slice DIV and TOP for a wrap frequency of target:
+    (INT, FRAC, TOP, freq, ppm).
+
+    The smallest divider (INT + FRAC/16) that lets TOP fit in 16 bits is
+    chosen, which maximizes duty cycle resolution. With tolerance_ppm, the
+    divider is instead raised until the error is within tolerance, trading
+    resolution for accuracy; if it never is, the most accurate setting wins.
+    """
+    clk = int(clk or sysclk())
+    key = ("pwm", target, clk, phase_correct, tolerance_ppm)
+    result = _cache.get(key)
+    if result is None:
+        num, den = _ratio(target)
+        if phase_correct:
+            num *= 2
+        # Counter clocks per period, in 1/16ths: div16 * (TOP + 1)
+        p16 = clk * 16 * den
+        best = None
+        div16 = max(16, (p16 + num * 65536 - 1) // (num * 65536))
+        while div16 < 4096:
+            top1 = (2 * p16 + div16 * num) // (2 * div16 * num)
+            if 2 <= top1 <= 65536:
+                freq, ppm = _result(clk * 16, div16 * top1, num, den)
+                if best is None or abs(ppm) < abs(best[4]):
+                    best = (div16 >> 4, div16 & 0xF, top1 - 1, freq, ppm)
+                if tolerance_ppm is None or abs(ppm) <= tolerance_ppm:
+                    break
+            elif top1 < 2:
+                break
+            div16 += 1
+        if best is None:
+            raise ValueError("PWM frequency out of range")
+        if phase_correct:
+            best = best[:3] + (best[3] / 2,) + best[4:]
+        result = _cache[key] = best
+    return result
+
+def adc_div(rate, clk=ADC_CLK_HZ):
+    """
+    ADC DIV for a total conversion rate in samples/s: (INT, FRAC, rate, ppm),
+    with the sample period 1 + INT + FRAC/256 ADC clocks. A conversion takes
+    96 clocks, so rates above clk/96 (500 kS/s) are not achievable.
+    """
+    clk = int(clk)
+    key = ("adc", rate, clk)
+    result = _cache.get(key)
+    if result is None:
+        num, den = _ratio(rate)
+        period = (2 * clk * 256 * den + num) // (2 * num)
+        if not 96 * 256 <= period <= 65536 * 256 + 255:
+            raise ValueError("ADC rate out of range")
+        div = period - 256
+        result = _cache[key] = (div >> 8, div & 0xFF) + _result(clk * 256, period, num, den)
+    return result
+
+def best_rational(p, q, limit):
+    """
+    Closest fraction h/k to p/q with h, k <= limit, by continued fractions
+    including semiconvergents.
+    """
+    h0, h1, k0, k1 = 0, 1, 1, 0
+    a_p, a_q = p, q
+    while a_q:
+        a = a_p // a_q
+        h2 = a * h1 + h0
+        k2 = a * k1 + k0
+        if h2 > limit or k2 > limit:
+            t = limit
+            if h1:
+                t = min(t, (limit - h0) // h1)
+            if k1:
+                t = min(t, (limit - k0) // k1)
+            hs, ks = t * h1 + h0, t * k1 + k0
+            if not k1 or (ks and abs(hs * q - p * ks) * k1 < abs(h1 * q - p * k1) * ks):
+                return hs, ks
+            return h1, k1
+        h0, h1, k0, k1 = h1, h2, k1, k2
+        a_p, a_q = a_q, a_p - a * a_q
+    return h1, k1
+
+def dma_timer(target, clk=None):
+    """
+    DMA pacing timer TIMERn X and Y for a transfer rate of target:
+    (X, Y, freq, ppm), with the rate clk * X / Y, X <= Y < 65536.
+    """
+    clk = int(clk or sysclk())
+    key = ("dma", target, clk)
+    result = _cache.get(key)
+    if result is None:
+        num, den = _ratio(target)
+        if num * 0xFFFF < clk * den or num > clk * den:
+            raise ValueError("DMA timer rate out of range")
+        x, y = best_rational(int(num), int(clk * den), 0xFFFF)
+        result = _cache[key] = (x, y) + _result(clk * x, y, num, den)
+    return result
+
+def spi_div(target, clk=None):
+    """
+    SPI SSPCPSR.CPSDVSR and SSPCR0.SCR for a bit rate of target:
+    (CPSDVSR, SCR, freq, ppm), with the rate clk / (CPSDVSR * (1 + SCR)),
+    CPSDVSR even. The fastest rate not above target is chosen, since SPI
+    targets are usually a device's maximum clock.
+    """
+    clk = int(clk or sysclk())
+    key = ("spi", target, clk)
+    result = _cache.get(key)
+    if result is None:
+        num, den = _ratio(target)
+        best = None
+        for cpsdvsr in range(2, 255, 2):
+            # Smallest 1 + SCR with clk / (cpsdvsr * (1 + SCR)) <= target
+            scr1 = -(-clk * den // (num * cpsdvsr))
+            if scr1 <= 256 and (best is None or cpsdvsr * scr1 < best[0] * best[1]):
+                best = (cpsdvsr, max(scr1, 1))
+        if best is None:
+            raise ValueError("SPI frequency out of range")
+        cpsdvsr, scr1 = best
+        result = _cache[key] = (cpsdvsr, scr1 - 1) + _result(clk, cpsdvsr * scr1, num, den)
+    return result
+
+def uart_div(baud, clk=None):
+    """
+    UART UARTIBRD and UARTFBRD for baud: (IBRD, FBRD, baud, ppm), with the
+    baud rate clk / (16 * (IBRD + FBRD/64)) rounded to nearest.
+    """
+    clk = int(clk or sysclk())
+    key = ("uart", baud, clk)
+    result = _cache.get(key)
+    if result is None:
+        num, den = _ratio(baud)
+        total = (2 * 4 * clk * den + num) // (2 * num)
+        if not 64 <= total <= 0xFFFF * 64 + 63:
+            raise ValueError("UART baud rate out of range")
+        result = _cache[key] = (total >> 6, total & 0x3F) + _result(4 * clk, total, num, den)
+    return result
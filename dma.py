@@ -13,6 +13,12 @@
 #    limitations under the License.
 
 from uctypes import BF_POS, BF_LEN, BFUINT32, ARRAY, UINT32, struct
+from .reg import Atomic, flatten, pack
+
+try:
+    from rp2 import DMA as _RuntimeDMA
+except ImportError:
+    _RuntimeDMA = None
 
 DMA_BASE = const(0x50000000)
 
@@ -77,6 +83,36 @@ DMA_CHANNEL_FIELDS = {
     "ALIAS3":           (0x30, DMA_CHANNEL_ALIAS3_FIELDS), # Trigger on READ_ADDR write
 }
 
+# --- Whole-word DMA Channel Registers ---
+# Same layout as DMA_CHANNEL_FIELDS with every register as a plain 32-bit word,
+# so that a complete CTRL value can be written with a single store.
+DMA_CHANNEL_REGS = {
+    "READ_ADDR":            0x00 | UINT32,
+    "WRITE_ADDR":           0x04 | UINT32,
+    "TRANS_COUNT":          0x08 | UINT32,
+    "CTRL_TRIG":            0x0C | UINT32,
+    "AL1_CTRL":             0x10 | UINT32,
+    "AL1_READ_ADDR":        0x14 | UINT32,
+    "AL1_WRITE_ADDR":       0x18 | UINT32,
+    "AL1_TRANS_COUNT_TRIG": 0x1C | UINT32,
+    "AL2_CTRL":             0x20 | UINT32,
+    "AL2_TRANS_COUNT":      0x24 | UINT32,
+    "AL2_READ_ADDR":        0x28 | UINT32,
+    "AL2_WRITE_ADDR_TRIG":  0x2C | UINT32,
+    "AL3_CTRL":             0x30 | UINT32,
+    "AL3_WRITE_ADDR":       0x34 | UINT32,
+    "AL3_TRANS_COUNT":      0x38 | UINT32,
+    "AL3_READ_ADDR_TRIG":   0x3C | UINT32,
+}
+
+# Channel registers whose write starts a transfer; see reg.Shadow(late=...)
+DMA_TRIGGER_REGS = ("CTRL_TRIG", "TRANS_COUNT_TRIG", "WRITE_ADDR_TRIG", "READ_ADDR_TRIG",
+                    "AL1_TRANS_COUNT_TRIG", "AL2_WRITE_ADDR_TRIG", "AL3_READ_ADDR_TRIG")
+
+DMA_CH_STRIDE = const(0x40)
+DMA_NUM_CHANNELS = const(12)
+DMA_NUM_TIMERS = const(4)
+
 # DMA Interrupt Status Registers (INTR, INTE0/1, INTF0/1, INTS0/1)
 DMA_INTS_FIELDS = {
     # Bits 0-11 for channels 0-11
@@ -121,6 +157,8 @@ DMA_DBG_CTDREQ_FIELDS = {
 DMA_DEBUG_CHANNEL_FIELDS = {
     "CTDREQ":           (0x00, DMA_DBG_CTDREQ_FIELDS),
     "TCR":              0x04 | UINT32, # Debug Transfer Count Register reload value
+    # Pads the array stride to the 0x40 spacing of the debug registers
+    "_RESERVED":        (0x08 | ARRAY, 14 | UINT32),
 }
 
 
@@ -148,12 +186,16 @@ DMA_FIELDS = {
     "CHAN_ABORT":       (0x444, DMA_CHAN_ABORT_FIELDS), # Abort channel transfers (bitmask)
     "N_CHANNELS":       0x448 | UINT32,                # (Read Only) Number of DMA Channels implemented
     # Reserved space 0x44C to 0x7FC
-    # Debug Registers (Array stride ensures correct 0x08 spacing)
+    # Debug Registers (Array stride ensures correct 0x40 spacing)
     "CH_DBG":           (0x800 | ARRAY, 12, DMA_DEBUG_CHANNEL_FIELDS)
 }
 
 # --- Create the DMA structure instance ---
 dma = struct(DMA_BASE, DMA_FIELDS)
+dma_atomic = Atomic(DMA_BASE, DMA_FIELDS)
+# Whole-word view, e.g. for write-1-to-clear INTR/INTS bits or CHAN_ABORT masks
+dma_words = struct(DMA_BASE, flatten(DMA_FIELDS))
+dma_ch_regs = [struct(DMA_BASE + n * DMA_CH_STRIDE, DMA_CHANNEL_REGS) for n in range(DMA_NUM_CHANNELS)]
 
 # DMA_CTRL_FIELDS['DATA_SIZE']
 DMA_SIZE_BYTE     = const(0)
@@ -225,4 +267,229 @@ DMA_SNIFF_CALC_CRC16  = const(2)
 DMA_SNIFF_CALC_CRC16R = const(3)  # Bit reversed data
 # 4-13 reserved
 DMA_SNIFF_CALC_EVEN   = const(14) # XOR reduction over all data
-DMA_SNIFF_CALC_SUM    = const(15) # Simple 32-bit checksum (addition)
\ No newline at end of file
+DMA_SNIFF_CALC_SUM    = const(15) # Simple 32-bit checksum (addition)
+
+_CHAIN_TO_POS = const(11)
+
+class DmaConfig:
+    """
+    Precomputed register image for a DMA channel.
+
+    Control bits are given by their DMA_CTRL_FIELDS names and packed into a
+    single CTRL word up front, so applying the configuration costs one store
+    per register rather than a read-modify-write per bitfield. A config is not
+    tied to a channel and can be cached and applied any number of times.
+    Unless CHAIN_TO is given, the channel chains to itself (i.e. no chaining).
+
+    Defaults follow the pico-sdk: enabled, 32-bit transfers, unpaced
+    (DREQ_PERMANENT), read address incremented and write address fixed.
+    """
+
+    def __init__(self, read_addr=0, write_addr=0, trans_count=0, **ctrl):
+        fields = {"EN": 1, "DATA_SIZE": DMA_SIZE_WORD, "TREQ_SEL": DREQ_PERMANENT, "INCR_READ": 1}
+        fields.update(ctrl)
+        self.chain_to = fields.pop("CHAIN_TO", None)
+        self.read_addr = read_addr
+        self.write_addr = write_addr
+        self.trans_count = trans_count
+        self.ctrl = pack(DMA_CTRL_FIELDS, **fields)
+
+    def ctrl_for(self, ch):
+        """CTRL word for channel ch, with CHAIN_TO resolved."""
+        chain_to = ch if self.chain_to is None else self.chain_to
+        return self.ctrl | chain_to << _CHAIN_TO_POS
+
+    def apply(self, ch, alias=0, trigger=True):
+        """
+        Program channel ch. The trigger register of the chosen alias (0 for
+        CTRL_TRIG, 1-3 for ALIAS1-3) is written last. With trigger=False the
+        channel is armed through the non-triggering AL1_CTRL instead.
+        """
+        r = dma_ch_regs[ch]
+        ctrl = self.ctrl_for(ch)
+        if not trigger:
+            r.AL1_CTRL = ctrl
+            r.READ_ADDR = self.read_addr
+            r.WRITE_ADDR = self.write_addr
+            r.TRANS_COUNT = self.trans_count
+        elif alias == 0:
+            r.READ_ADDR = self.read_addr
+            r.WRITE_ADDR = self.write_addr
+            r.TRANS_COUNT = self.trans_count
+            r.CTRL_TRIG = ctrl
+        elif alias == 1:
+            r.AL1_CTRL = ctrl
+            r.READ_ADDR = self.read_addr
+            r.WRITE_ADDR = self.write_addr
+            r.AL1_TRANS_COUNT_TRIG = self.trans_count
+        elif alias == 2:
+            r.AL1_CTRL = ctrl
+            r.TRANS_COUNT = self.trans_count
+            r.READ_ADDR = self.read_addr
+            r.AL2_WRITE_ADDR_TRIG = self.write_addr
+        elif alias == 3:
+            r.AL1_CTRL = ctrl
+            r.WRITE_ADDR = self.write_addr
+            r.TRANS_COUNT = self.trans_count
+            r.AL3_READ_ADDR_TRIG = self.read_addr
+        else:
+            raise ValueError("alias must be 0-3")
+
+    def rearm(self, ch, alias=1):
+        """
+        Restart channel ch, already programmed with apply(), with a single
+        store to the trigger register of the chosen alias. The other
+        registers still hold this configuration: READ_ADDR and WRITE_ADDR as
+        left by the last transfer (which is what ring buffers and fixed
+        addresses want) and TRANS_COUNT reloaded from the value last written.
+        """
+        r = dma_ch_regs[ch]
+        if alias == 0:
+            r.CTRL_TRIG = self.ctrl_for(ch)
+        elif alias == 1:
+            r.AL1_TRANS_COUNT_TRIG = self.trans_count
+        elif alias == 2:
+            r.AL2_WRITE_ADDR_TRIG = self.write_addr
+        elif alias == 3:
+            r.AL3_READ_ADDR_TRIG = self.read_addr
+        else:
+            raise ValueError("alias must be 0-3")
+
+# Index of a single set bit: 2**k % 13 is distinct for k < 12
+_BIT_INDEX = bytes((0, 0, 1, 4, 2, 9, 5, 11, 3, 8, 10, 7, 6))
+
+class DmaAllocator:
+    """
+    Ownership tracking for DMA channels, pacing timers and IRQ lines.
+
+    Claims are kept as bitmasks, so claiming and releasing are constant time.
+    When the firmware provides rp2.DMA, channels are obtained through it,
+    which reserves them in the runtime's own allocator and keeps them clear
+    of channels the runtime (or other rp2.DMA users) already hold; claiming
+    a specific channel the runtime holds raises OSError. Bits set in
+    reserved are never handed out.
+
+    owner is any object identifying the driver that holds a resource; it is
+    only recorded for owner() lookups, e.g. by an interrupt dispatcher.
+    """
+
+    def __init__(self, reserved=0):
+        self.channels = reserved
+        self.timers = 0
+        self.irq_mask = [0, 0]
+        self.owners = {}
+        self._runtime = {}
+
+    def claim_channel(self, ch=None, owner=None):
+        """Claim channel ch, or the lowest free channel, and return its number."""
+        if ch is None:
+            if _RuntimeDMA is not None:
+                ch = self._runtime_free()
+            else:
+                free = ~self.channels & ((1 << DMA_NUM_CHANNELS) - 1)
+                if not free:
+                    raise OSError("no free DMA channel")
+                ch = _BIT_INDEX[(free & -free) % 13]
+        elif not 0 <= ch < DMA_NUM_CHANNELS:
+            raise ValueError("no DMA channel %d" % ch)
+        elif self.channels >> ch & 1:
+            raise ValueError("DMA channel %d already claimed" % ch)
+        elif _RuntimeDMA is not None:
+            self._runtime[ch] = self._runtime_channel(ch)
+        self.channels |= 1 << ch
+        self.owners[ch] = owner
+        return ch
+
+    def _runtime_free(self):
+        # Take channels from the runtime until one is not reserved here, then
+        # give the others back
+        others = []
+        try:
+            while True:
+                # Raises once the runtime has no free channels left
+                rt = _RuntimeDMA()
+                ch = rt.channel
+                if not self.channels >> ch & 1:
+                    self._runtime[ch] = rt
+                    return ch
+                others.append(rt)
+        finally:
+            for rt in others:
+                rt.close()
+
+    def _runtime_channel(self, ch):
+        # rp2.DMA() cannot ask for a channel by number: take channels from
+        # the runtime until it hands out ch, then give the others back
+        others = []
+        try:
+            while True:
+                try:
+                    rt = _RuntimeDMA()
+                except OSError:
+                    raise OSError("DMA channel %d is in use by the runtime" % ch)
+                if rt.channel == ch:
+                    return rt
+                others.append(rt)
+        finally:
+            for rt in others:
+                rt.close()
+
+    def unclaim_channel(self, ch):
+        """Release channel ch and disconnect it from both IRQ lines."""
+        bit = 1 << ch
+        if self.irq_mask[0] & bit:
+            self.route_irq(ch, 0, False)
+        if self.irq_mask[1] & bit:
+            self.route_irq(ch, 1, False)
+        self.channels &= ~bit
+        self.owners.pop(ch, None)
+        rt = self._runtime.pop(ch, None)
+        if rt is not None:
+            rt.close()
+
+    def is_claimed(self, ch):
+        return bool(self.channels >> ch & 1)
+
+    def owner(self, ch):
+        return self.owners.get(ch)
+
+    def runtime(self, ch):
+        """The rp2.DMA object holding channel ch, if it was claimed through one."""
+        return self._runtime.get(ch)
+
+    def claim_timer(self, timer=None):
+        """Claim pacing timer timer, or the lowest free one, and return its number."""
+        if timer is None:
+            free = ~self.timers & ((1 << DMA_NUM_TIMERS) - 1)
+            if not free:
+                raise OSError("no free DMA pacing timer")
+            timer = _BIT_INDEX[(free & -free) % 13]
+        elif self.timers >> timer & 1:
+            raise ValueError("DMA timer %d already claimed" % timer)
+        self.timers |= 1 << timer
+        return timer
+
+    def unclaim_timer(self, timer):
+        self.timers &= ~(1 << timer)
+
+    def route_irq(self, ch, line=0, enable=True):
+        """
+        Connect (or disconnect) claimed channel ch to DMA_IRQ_0 or DMA_IRQ_1
+        by setting its INTE0/INTE1 bit with a single atomic write.
+        """
+        if line not in (0, 1):
+            raise ValueError("line must be 0 or 1")
+        if not self.channels >> ch & 1:
+            raise ValueError("DMA channel %d not claimed" % ch)
+        bit = 1 << ch
+        view = dma_atomic.set if enable else dma_atomic.clr
+        if line:
+            view.INTE1 = bit
+        else:
+            view.INTE0 = bit
+        if enable:
+            self.irq_mask[line] |= bit
+        else:
+            self.irq_mask[line] &= ~bit
+
+allocator = DmaAllocator()
@@ -0,0 +1,123 @@
+#    Copyright 2025 Hessam Mehr
+
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+
+#        http://www.apache.org/licenses/LICENSE-2.0
+
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+
+"""
+asyncio completion for DMA channels.
+
+    irq = dmairq.dispatcher
+    irq.register(ch)
+    config.apply(ch)
+    await irq.wait(ch)
+
+MicroPython does not let Python code install an NVIC handler directly. When
+the firmware provides rp2.DMA every claimed channel is held through it (see
+DmaAllocator.claim_channel), and its hard IRQ handler runs the dispatcher
+from DMA_IRQ_0. Channels left without one (no rp2.DMA, or line 1) are only
+serviced by polling, which must be started explicitly:
+
+    asyncio.create_task(irq.run(period_ms=1))
+
+A polled completion is then noticed up to period_ms plus the scheduler's
+own latency after it happens; period_ms=0 polls on every scheduler pass,
+keeping the CPU busy.
+"""
+
+try:
+    import asyncio
+except ImportError:
+    import uasyncio as asyncio
+from .dma import *
+from .dma import _BIT_INDEX
+
+_Flag = getattr(asyncio, "ThreadSafeFlag", asyncio.Event)
+
+class DmaIrqDispatcher:
+    """
+    Owns the INTE/INTS registers of one DMA IRQ line for registered
+    channels. service() reads INTS once, acknowledges every completed
+    channel with a single write-1-to-clear of that mask and sets each
+    channel's flag, waking its waiter.
+    """
+
+    def __init__(self, line=0):
+        self.line = line
+        self.mask = 0
+        self.polled = 0     # Registered channels without an rp2.DMA handler
+        self.flags = {}
+        self._handler = self._irq
+
+    def register(self, ch):
+        """Route claimed channel ch to this line and create its flag."""
+        if ch not in self.flags:
+            self.flags[ch] = _Flag()
+        allocator.route_irq(ch, self.line)
+        self.mask |= 1 << ch
+        rt = allocator.runtime(ch) if self.line == 0 else None
+        if rt is not None:
+            rt.irq(handler=self._handler, hard=True)
+            self.polled &= ~(1 << ch)
+        else:
+            self.polled |= 1 << ch
+
+    def unregister(self, ch):
+        bit = 1 << ch
+        if self.mask & bit:
+            self.mask &= ~bit
+            self.polled &= ~bit
+            rt = allocator.runtime(ch)
+            if rt is not None and self.line == 0:
+                rt.irq(handler=None)
+            if allocator.is_claimed(ch):
+                allocator.route_irq(ch, self.line, False)
+        self.flags.pop(ch, None)
+
+    def service(self):
+        """Acknowledge and signal completed channels; returns their mask."""
+        if self.line == 0:
+            pending = dma_words.INTS0 & self.mask
+            if pending:
+                dma_words.INTS0 = pending
+        else:
+            pending = dma_words.INTS1 & self.mask
+            if pending:
+                dma_words.INTS1 = pending
+        done = pending
+        flags = self.flags
+        while pending:
+            bit = pending & -pending
+            flags[_BIT_INDEX[bit % 13]].set()
+            pending ^= bit
+        return done
+
+    def _irq(self, rt):
+        # The runtime has already acknowledged rt.channel
+        self.flags[rt.channel].set()
+        self.service()
+
+    async def wait(self, ch):
+        """Wait for the next completion of registered channel ch."""
+        flag = self.flags[ch]
+        await flag.wait()
+        flag.clear()
+
+    async def run(self, period_ms=1):
+        """
+        Poll the line every period_ms, for the channels in polled. Completions
+        are signalled up to period_ms (plus scheduling delays) late.
+        """
+        while True:
+            self.service()
+            await asyncio.sleep(period_ms / 1000)
+
+dispatcher = DmaIrqDispatcher(0)
@@ -0,0 +1,168 @@
+#    Copyright 2025 Hessam Mehr
+
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+
+#        http://www.apache.org/licenses/LICENSE-2.0
+
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+
+"""
+DMA throughput and latency monitor.
+
+    mon = DmaMonitor([ch_a, ch_b])
+    machine.Timer(freq=1000, callback=mon.sample)
+    ...
+    print(mon.report())
+"""
+
+from array import array
+from uctypes import BF_POS, BF_LEN, BFUINT32, struct
+from .dma import DMA_BASE, DMA_CH_STRIDE
+
+try:
+    from time import ticks_us, ticks_diff
+except ImportError:
+    from time import perf_counter
+
+    def ticks_us():
+        return int(perf_counter() * 1e6) & 0x3FFFFFFF
+
+    def ticks_diff(a, b):
+        return ((a - b + 0x20000000) & 0x3FFFFFFF) - 0x20000000
+
+# What one sample reads of a channel. Counts are read as 30-bit fields so
+# that every value is a small int and sampling never allocates.
+_SAMPLE_FIELDS = {
+    "TRANS_COUNT":  0x008 | 0 << BF_POS | 30 << BF_LEN | BFUINT32,
+    "FLAGS":        0x00C | 24 << BF_POS | 8 << BF_LEN | BFUINT32, # CTRL AHB_ERROR..BUSY
+    "DATA_SIZE":    0x00C | 2 << BF_POS | 2 << BF_LEN | BFUINT32,
+    "CTDREQ":       0x800 | 0 << BF_POS | 6 << BF_LEN | BFUINT32,
+    "TCR":          0x804 | 0 << BF_POS | 30 << BF_LEN | BFUINT32,
+}
+
+# TDF_LVL, RAF_LVL and WAF_LVL in one read
+_LEVELS_FIELDS = {
+    "FIFO_LEVELS":  0x440 | 0 << BF_POS | 24 << BF_LEN | BFUINT32,
+}
+
+_FLAG_BUSY = const(0x01)
+_FLAG_AHB_ERROR = const(0x80)
+
+class DmaMonitor:
+    """
+    Periodic sampler of DMA channel progress into a preallocated ring.
+
+    sample() records, for each monitored channel, the remaining TRANS_COUNT,
+    its reload value (CH_DBG.TCR), the outstanding DREQ count (CH_DBG.CTDREQ)
+    and the CTRL status bits, plus the global FIFO_LEVELS and a timestamp. It
+    only stores small ints into arrays, so it can be a timer IRQ callback
+    (it accepts and ignores the timer argument). The ring keeps the last
+    depth samples.
+
+    stats() derives per-channel figures over the samples in the ring:
+    bytes/s moved, mean and peak DREQ backlog, stall time (busy with no
+    progress between two samples, in us) and AHB errors (rising edges of
+    CTRL.AHB_ERROR).
+    """
+
+    def __init__(self, channels, depth=64):
+        self.channels = tuple(channels)
+        self.depth = depth
+        n = len(self.channels)
+        self._levels = struct(DMA_BASE, _LEVELS_FIELDS)
+        self._regs = [struct(DMA_BASE + ch * DMA_CH_STRIDE, _SAMPLE_FIELDS) for ch in self.channels]
+        self.times = array("L", [0] * depth)
+        self.fifo = array("L", [0] * depth)
+        self.counts = array("L", [0] * (depth * n))
+        self.reloads = array("L", [0] * (depth * n))
+        self.backlog = array("B", bytearray(depth * n))
+        self.flags = array("B", bytearray(depth * n))
+        self.sizes = array("B", bytearray(n))
+        self.head = 0
+        self.filled = 0
+
+    def sample(self, _=None):
+        i = self.head
+        self.times[i] = ticks_us()
+        self.fifo[i] = self._levels.FIFO_LEVELS
+        n = len(self._regs)
+        j = i * n
+        for k in range(n):
+            r = self._regs[k]
+            self.counts[j + k] = r.TRANS_COUNT
+            self.reloads[j + k] = r.TCR
+            self.backlog[j + k] = r.CTDREQ
+            self.flags[j + k] = r.FLAGS
+            self.sizes[k] = r.DATA_SIZE
+        self.head = i + 1 if i + 1 < self.depth else 0
+        if self.filled < self.depth:
+            self.filled += 1
+
+    def reset(self):
+        self.head = 0
+        self.filled = 0
+
+    def _order(self):
+        start = (self.head - self.filled) % self.depth
+        return [(start + m) % self.depth for m in range(self.filled)]
+
+    def stats(self):
+        """
+        Per-channel dicts of bytes_per_s, backlog_mean, backlog_max,
+        stall_us and ahb_errors, keyed by channel number.
+        """
+        order = self._order()
+        n = len(self.channels)
+        out = {}
+        for k, ch in enumerate(self.channels):
+            moved = stall = errors = backlog = peak = 0
+            prev = None
+            for i in order:
+                j = i * n + k
+                backlog += self.backlog[j]
+                peak = max(peak, self.backlog[j])
+                if prev is not None:
+                    pj = prev * n + k
+                    before, now = self.counts[pj], self.counts[j]
+                    # A larger count means the channel was re-triggered and
+                    # reloaded TRANS_COUNT from TCR in between
+                    done = before - now if now <= before else before + self.reloads[j] - now
+                    moved += done
+                    if not done and self.flags[j] & self.flags[pj] & _FLAG_BUSY:
+                        stall += ticks_diff(self.times[i], self.times[prev])
+                    if self.flags[j] & ~self.flags[pj] & _FLAG_AHB_ERROR:
+                        errors += 1
+                prev = i
+            span = ticks_diff(self.times[order[-1]], self.times[order[0]]) if len(order) > 1 else 0
+            out[ch] = {
+                "bytes_per_s": moved * (1 << self.sizes[k]) * 1000000 // span if span > 0 else 0,
+                "backlog_mean": backlog / len(order) if order else 0,
+                "backlog_max": peak,
+                "stall_us": stall,
+                "ahb_errors": errors,
+            }
+        return out
+
+    def fifo_levels(self):
+        """Peak (TDF, RAF, WAF) FIFO levels over the ring."""
+        tdf = raf = waf = 0
+        for i in self._order():
+            v = self.fifo[i]
+            tdf = max(tdf, v & 0xFF)
+            raf = max(raf, v >> 8 & 0xFF)
+            waf = max(waf, v >> 16 & 0xFF)
+        return tdf, raf, waf
+
+    def report(self):
+        lines = []
+        for ch, s in self.stats().items():
+            lines.append("ch%-2d %10d B/s  backlog %.1f/%d  stall %d us  ahb_err %d" % (
+                ch, s["bytes_per_s"], s["backlog_mean"], s["backlog_max"], s["stall_us"], s["ahb_errors"]))
+        lines.append("fifo peak tdf/raf/waf %d/%d/%d" % self.fifo_levels())
+        return "\n".join(lines)
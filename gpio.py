@@ -13,6 +13,7 @@
 #    limitations under the License.
 
 from uctypes import BF_POS, BF_LEN, BFUINT32, ARRAY, UINT32, struct
+from .reg import Atomic
 
 IO_BANK0_BASE   = const(0x40014000)
 IO_QSPI_BASE    = const(0x40018000)
@@ -70,6 +71,7 @@ IO_QSPI_FIELDS = {
 }
 
 io_qspi = struct(IO_QSPI_BASE, IO_QSPI_FIELDS)
+io_qspi_atomic = Atomic(IO_QSPI_BASE, IO_QSPI_FIELDS)
 
 IO_BANK0_FIELDS = {
     "GPIO": (0x000 | ARRAY, 30, GPIO_FIELDS),
@@ -86,15 +88,16 @@ IO_BANK0_FIELDS = {
 }
 
 io_bank0 = struct(IO_BANK0_BASE, IO_BANK0_FIELDS)
+io_bank0_atomic = Atomic(IO_BANK0_BASE, IO_BANK0_FIELDS)
 
 GPIO_PAD_FIELDS = {
-    "OD": 7 << BF_POS | 1 << BF_LEN | UINT32, # Output disable
-    "IE": 6 << BF_POS | 1 << BF_LEN | UINT32, # Input enable
-    "DRIVE": 4 << BF_POS | 2 << BF_LEN | UINT32, # Drive strength, see PADS_DRIVE_*
-    "PUE": 3 << BF_POS | 1 << BF_LEN | UINT32, # Pull-up enable
-    "PDE": 2 << BF_POS | 1 << BF_LEN | UINT32, # Pull-down enable
-    "SCHMITT": 1 << BF_POS | 1 << BF_LEN | UINT32,
-    "SLEWFAST": 0 << BF_POS | 1 << BF_LEN | UINT32,
+    "OD": 7 << BF_POS | 1 << BF_LEN | BFUINT32, # Output disable
+    "IE": 6 << BF_POS | 1 << BF_LEN | BFUINT32, # Input enable
+    "DRIVE": 4 << BF_POS | 2 << BF_LEN | BFUINT32, # Drive strength, see PADS_DRIVE_*
+    "PUE": 3 << BF_POS | 1 << BF_LEN | BFUINT32, # Pull-up enable
+    "PDE": 2 << BF_POS | 1 << BF_LEN | BFUINT32, # Pull-down enable
+    "SCHMITT": 1 << BF_POS | 1 << BF_LEN | BFUINT32,
+    "SLEWFAST": 0 << BF_POS | 1 << BF_LEN | BFUINT32,
 }
 
 PADS_BANK0_FIELDS = {
@@ -105,6 +108,7 @@ PADS_BANK0_FIELDS = {
 }
 
 pads_bank0 = struct(PADS_BANK0_BASE, PADS_BANK0_FIELDS)
+pads_bank0_atomic = Atomic(PADS_BANK0_BASE, PADS_BANK0_FIELDS)
 
 PADS_QSPI_FIELDS = {
     "VOLTAGE_SELECT": 0x00 | 0 << BF_POS | 1 << BF_LEN | BFUINT32,
@@ -117,6 +121,7 @@ PADS_QSPI_FIELDS = {
 }
 
 pads_qspi = struct(PADS_QSPI_BASE, PADS_QSPI_FIELDS)
+pads_qspi_atomic = Atomic(PADS_QSPI_BASE, PADS_QSPI_FIELDS)
 
 # GPIO Voltage Select (for VOLTAGE_SELECT in PADS_BANK0 and PADS_QSPI)
 GPIO_VOLTAGE_3V3 = const(0) # 3.3V
@@ -0,0 +1,323 @@
+#    Copyright 2025 Hessam Mehr
+
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+
+#        http://www.apache.org/licenses/LICENSE-2.0
+
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+
+"""
+Batch operations on the SIO interpolators.
+
+    gamma = bytes(int(255 * (i / 255) ** 2.8 + 0.5) for i in range(256))
+    interp.lookup(frame, frame, gamma)              # in place
+    interp.blend(out, frame_a, frame_b, 64)         # a + (b - a) * 64 / 256
+
+Every call takes whole buffers (array, bytearray, bytes) of 8, 16 or 32-bit
+elements and loops in a viper kernel that feeds the interpolators of the
+calling core: interp0 for lookup, blend, scale and texture, interp1 for
+clamp. Their configuration is overwritten. On other ports the same results
+are computed in Python.
+"""
+
+from sys import platform
+from uctypes import addressof
+from .piodma import itemsize
+from .reg import pack
+from .sio import INTERP_CTRL_FIELDS, sio_words
+
+_HW = platform == "rp2"
+
+_SIZE_LOG2 = (None, 0, 1, None, 2)
+
+def _size(buf):
+    return itemsize(buf)
+
+def _configure(n, lane0, lane1, base0=0, base1=0, base2=0, accum0=0, accum1=0):
+    regs = sio_words.INTERP[n]
+    regs.CTRL_LANE0 = pack(INTERP_CTRL_FIELDS, **lane0)
+    regs.CTRL_LANE1 = pack(INTERP_CTRL_FIELDS, **lane1)
+    regs.BASE0 = base0
+    regs.BASE1 = base1
+    regs.BASE2 = base2
+    regs.ACCUM0 = accum0
+    regs.ACCUM1 = accum1
+
+def _check(out, n):
+    if len(out) < n:
+        raise ValueError("output too short")
+
+def lookup(out, src, lut, shift=0, bits=8):
+    """
+    out[i] = lut[(src[i] >> shift) & (2**bits - 1)] for every element of src,
+    e.g. gamma or palette conversion. lut must have 2**bits entries; out may
+    be src.
+    """
+    n = len(src)
+    _check(out, n)
+    if len(lut) < 1 << bits:
+        raise ValueError("lut needs %d entries" % (1 << bits))
+    if _HW:
+        lsl = _SIZE_LOG2[_size(lut)]
+        lane, pre = _lookup_lane(shift, bits, lsl)
+        _configure(0, lane, {}, base0=addressof(lut))
+        _lookup_hw(out, _size(out), src, _size(src), n, lsl, pre)
+        return out
+    mask = (1 << bits) - 1
+    for i in range(n):
+        out[i] = lut[src[i] >> shift & mask]
+    return out
+
+def blend(out, a, b, alpha, signed=False):
+    """
+    out[i] = a[i] + (b[i] - a[i]) * alpha[i] // 256, with alpha (0-255) a
+    scalar or a bytes-like sequence. a or b may also be scalars; arrays must
+    have the same element size.
+    """
+    arrays = [x for x in (a, b, alpha) if not isinstance(x, int)]
+    if not arrays:
+        raise ValueError("nothing to blend")
+    n = len(arrays[0])
+    _check(out, n)
+    if _HW:
+        size = _size(a) if not isinstance(a, int) else _size(b) if not isinstance(b, int) else 4
+        mode = (not isinstance(a, int)) | (not isinstance(b, int)) << 1 | (not isinstance(alpha, int)) << 2
+        _configure(0, {"BLEND": 1}, {"MASK_MSB": 7, "SIGNED": signed},
+                   base0=a & 0xFFFFFFFF if mode & 1 == 0 else 0,
+                   base1=b & 0xFFFFFFFF if mode & 2 == 0 else 0,
+                   accum1=alpha if mode & 4 == 0 else 0)
+        sign = 1 << (8 * size - 1) if signed and size < 4 else 0
+        _blend_hw(out, _size(out), a if mode & 1 else out, b if mode & 2 else out, size,
+                  alpha if mode & 4 else out, n, sign, mode)
+        return out
+    for i in range(n):
+        x = a if isinstance(a, int) else a[i]
+        y = b if isinstance(b, int) else b[i]
+        t = alpha if isinstance(alpha, int) else alpha[i]
+        out[i] = x + ((y - x) * (t & 0xFF) >> 8)
+    return out
+
+def scale(out, src, alpha, signed=False):
+    """Fixed-point scale by alpha/256: out[i] = src[i] * alpha // 256."""
+    return blend(out, 0, src, alpha, signed)
+
+def _lookup_lane(shift, bits, lsl):
+    # Lane 0: BASE0 + ((src << pre) >> SHIFT) masked to the index bits moved
+    # up by lsl. The shift right absorbs lsl where it can, so src goes in
+    # unshifted; only a shift below lsl needs the pre-shift, which loses
+    # nothing while the index ends below bit 32
+    if lsl + bits > 32:
+        raise ValueError("index does not fit the lane")
+    if shift >= lsl:
+        return {"SHIFT": shift - lsl, "MASK_LSB": lsl, "MASK_MSB": lsl + bits - 1}, 0
+    return {"SHIFT": 0, "MASK_LSB": lsl, "MASK_MSB": lsl + bits - 1}, lsl - shift
+
+def _clamp_lane(shift, signed):
+    # The shift is logical; masking to the bits left and sign-extending
+    # from the top one makes it arithmetic for SIGNED
+    return {"CLAMP": 1, "SHIFT": shift, "MASK_MSB": 31 - shift, "SIGNED": signed}
+
+def clamp(out, src, lo, hi, shift=0, signed=False):
+    """
+    out[i] = min(max(src[i] >> shift, lo), hi), e.g. to saturate fixed-point
+    results into a narrower type.
+    """
+    n = len(src)
+    _check(out, n)
+    if _HW:
+        size = _size(src)
+        _configure(1, _clamp_lane(shift, signed), {}, base0=lo & 0xFFFFFFFF, base1=hi & 0xFFFFFFFF)
+        sign = 1 << (8 * size - 1) if signed and size < 4 else 0
+        _clamp_hw(out, _size(out), src, size, n, sign)
+        return out
+    for i in range(n):
+        out[i] = min(max(src[i] >> shift, lo), hi)
+    return out
+
+def texture(out, tex, width_bits, u=0, du=1 << 16, height_bits=0, v=0, dv=0, frac_bits=16):
+    """
+    Step through a 2**width_bits x 2**height_bits texture (row-major, rows of
+    2**width_bits elements) along fixed-point coordinates with frac_bits
+    fractional bits, starting at (u, v) and advancing by (du, dv) per output
+    element, wrapping at the edges:
+
+        out[i] = tex[(u >> frac_bits) % width + ((v >> frac_bits) % height) * width]
+
+    Returns the coordinates after the last element, e.g. to carry on along a
+    scanline.
+    """
+    n = len(out)
+    if len(tex) < 1 << (width_bits + height_bits):
+        raise ValueError("texture too small")
+    if width_bits < 1 or frac_bits > 31:
+        raise ValueError("need width_bits > 0 and frac_bits < 32")
+    mask = 0xFFFFFFFF
+    if _HW:
+        lsl = _SIZE_LOG2[_size(tex)]
+        if frac_bits < width_bits + lsl:
+            raise ValueError("need frac_bits >= width_bits + log2(element size)")
+        # POP_FULL = BASE2 + both lanes' shifted and masked coordinates, and
+        # writes back ACCUMn += BASEn
+        lane1 = {"ADD_RAW": 1}
+        if height_bits:
+            lane1.update(SHIFT=frac_bits - width_bits - lsl, MASK_LSB=width_bits + lsl,
+                         MASK_MSB=width_bits + height_bits + lsl - 1)
+        else:
+            v = dv = 0
+        _configure(0, {"ADD_RAW": 1, "SHIFT": frac_bits - lsl, "MASK_LSB": lsl, "MASK_MSB": lsl + width_bits - 1},
+                   lane1, base0=du & mask, base1=dv & mask, base2=addressof(tex), accum0=u & mask, accum1=v & mask)
+        _texture_hw(out, _size(out), n, lsl)
+        regs = sio_words.INTERP[0]
+        return regs.ACCUM0, regs.ACCUM1
+    wmask = (1 << width_bits) - 1
+    hmask = (1 << height_bits) - 1
+    for i in range(n):
+        out[i] = tex[(u >> frac_bits & wmask) | (v >> frac_bits & hmask) << width_bits]
+        u = (u + du) & mask
+        v = (v + dv) & mask
+    return u, v
+
+if _HW:
+    import micropython
+
+    # Register word indices from INTERP0; INTERP1 is 16 words further on
+    _ACCUM0 = const(0)
+    _ACCUM1 = const(1)
+    _BASE0 = const(2)
+    _BASE1 = const(3)
+    _POP_FULL = const(7)
+    _PEEK_LANE0 = const(8)
+    _PEEK_LANE1 = const(9)
+    _INTERP1_ACCUM0 = const(16)
+    _INTERP1_PEEK_LANE0 = const(24)
+
+    @micropython.viper
+    def _lookup_hw(out, osize: int, src, ssize: int, n: int, lsl: int, pre: int):
+        hw = ptr32(0xd0000080)
+        s8 = ptr8(src)
+        s16 = ptr16(src)
+        s32 = ptr32(src)
+        o8 = ptr8(out)
+        o16 = ptr16(out)
+        o32 = ptr32(out)
+        i = 0
+        while i < n:
+            if ssize == 1:
+                x = s8[i]
+            elif ssize == 2:
+                x = s16[i]
+            else:
+                x = s32[i]
+            hw[_ACCUM0] = x << pre
+            addr = hw[_PEEK_LANE0]
+            if lsl == 0:
+                x = ptr8(addr)[0]
+            elif lsl == 1:
+                x = ptr16(addr)[0]
+            else:
+                x = ptr32(addr)[0]
+            if osize == 1:
+                o8[i] = x
+            elif osize == 2:
+                o16[i] = x
+            else:
+                o32[i] = x
+            i += 1
+
+    @micropython.viper
+    def _blend_hw(out, osize: int, a, b, size: int, alpha, n: int, sign: int, mode: int):
+        hw = ptr32(0xd0000080)
+        a8 = ptr8(a)
+        a16 = ptr16(a)
+        a32 = ptr32(a)
+        b8 = ptr8(b)
+        b16 = ptr16(b)
+        b32 = ptr32(b)
+        t8 = ptr8(alpha)
+        o8 = ptr8(out)
+        o16 = ptr16(out)
+        o32 = ptr32(out)
+        i = 0
+        while i < n:
+            if mode & 1:
+                if size == 1:
+                    x = a8[i]
+                elif size == 2:
+                    x = a16[i]
+                else:
+                    x = a32[i]
+                hw[_BASE0] = (x ^ sign) - sign
+            if mode & 2:
+                if size == 1:
+                    x = b8[i]
+                elif size == 2:
+                    x = b16[i]
+                else:
+                    x = b32[i]
+                hw[_BASE1] = (x ^ sign) - sign
+            if mode & 4:
+                hw[_ACCUM1] = t8[i]
+            x = hw[_PEEK_LANE1]
+            if osize == 1:
+                o8[i] = x
+            elif osize == 2:
+                o16[i] = x
+            else:
+                o32[i] = x
+            i += 1
+
+    @micropython.viper
+    def _clamp_hw(out, osize: int, src, size: int, n: int, sign: int):
+        hw = ptr32(0xd0000080)
+        s8 = ptr8(src)
+        s16 = ptr16(src)
+        s32 = ptr32(src)
+        o8 = ptr8(out)
+        o16 = ptr16(out)
+        o32 = ptr32(out)
+        i = 0
+        while i < n:
+            if size == 1:
+                x = s8[i]
+            elif size == 2:
+                x = s16[i]
+            else:
+                x = s32[i]
+            hw[_INTERP1_ACCUM0] = (x ^ sign) - sign
+            x = hw[_INTERP1_PEEK_LANE0]
+            if osize == 1:
+                o8[i] = x
+            elif osize == 2:
+                o16[i] = x
+            else:
+                o32[i] = x
+            i += 1
+
+    @micropython.viper
+    def _texture_hw(out, osize: int, n: int, lsl: int):
+        hw = ptr32(0xd0000080)
+        o8 = ptr8(out)
+        o16 = ptr16(out)
+        o32 = ptr32(out)
+        i = 0
+        while i < n:
+            addr = hw[_POP_FULL]
+            if lsl == 0:
+                x = ptr8(addr)[0]
+            elif lsl == 1:
+                x = ptr16(addr)[0]
+            else:
+                x = ptr32(addr)[0]
+            if osize == 1:
+                o8[i] = x
+            elif osize == 2:
+                o16[i] = x
+            else:
+                o32[i] = x
+            i += 1
@@ -0,0 +1,381 @@
+#    Copyright 2025 Hessam Mehr
+
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+
+#        http://www.apache.org/licenses/LICENSE-2.0
+
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+
+"""
+Logic analyzer built from a PIO state machine and a DMA ring.
+
+    la = LogicAnalyzer(pin_base=2, pin_count=4, rate=10_000_000)
+    cap = la.capture(pattern=0b0101, pre=1000, post=3000)
+    with open("bus.vcd", "w") as f:
+        cap.write_vcd(f)
+"""
+
+from array import array
+from uctypes import addressof
+from .dma import *
+from .pio import pios, pios_atomic, clkdiv, state_machines, PIO_BASE, SM_FILEDS
+from .clkplan import pio_div
+from .pioasm import assemble, instr_mem
+from .reg import Shadow, words
+
+_CTRL_SM_RESTART_POS = const(4)
+_CTRL_CLKDIV_RESTART_POS = const(8)
+_MAX_RUN = const(0xFFFF)
+
+class Capture:
+    """
+    A run-length encoded capture: sample values[i] repeats runs[i] times.
+    Runs are at most 65535 samples; longer ones continue in the next entry
+    with the same value. trigger is the sample index of the trigger, or
+    None. truncated is True if the capture ended early because the run
+    buffer filled up or the ring was overwritten before it was encoded.
+    """
+
+    def __init__(self, values, runs, rate, pin_base, pin_count, trigger=None, truncated=False):
+        self.values = values
+        self.runs = runs
+        self.rate = rate
+        self.pin_base = pin_base
+        self.pin_count = pin_count
+        self.trigger = trigger
+        self.truncated = truncated
+
+    def __len__(self):
+        return sum(self.runs)
+
+    def samples(self):
+        for value, run in zip(self.values, self.runs):
+            for _ in range(run):
+                yield value
+
+    def write_vcd(self, f, names=None):
+        """Write the capture to a text stream as a Value Change Dump."""
+        n = self.pin_count
+        names = names or ["gpio%d" % (self.pin_base + i) for i in range(n)]
+        ids = [chr(33 + i) for i in range(n)]
+        f.write("$timescale 1 ns $end\n$scope module logic $end\n")
+        for i in range(n):
+            f.write("$var wire 1 %s %s $end\n" % (ids[i], names[i]))
+        f.write("$upscope $end\n$enddefinitions $end\n")
+        if self.trigger is not None:
+            f.write("$comment trigger at sample %d $end\n" % self.trigger)
+        t = 0
+        prev = None
+        for value, run in zip(self.values, self.runs):
+            f.write("#%d\n" % (t * 1_000_000_000 // self.rate))
+            for i in range(n):
+                bit = value >> i & 1
+                if prev is None or bit != prev >> i & 1:
+                    f.write("%d%s\n" % (bit, ids[i]))
+            prev = value
+            t += run
+        f.write("#%d\n" % (t * 1_000_000_000 // self.rate))
+
+    def write_raw(self, f):
+        """
+        Write the samples to a binary stream as little-endian units of one
+        to four bytes, for sigrok's binary input format, e.g.
+        sigrok-cli -I binary:numchannels=8:samplerate=10M -i capture.bin
+        """
+        unit = (self.pin_count + 7) // 8
+        for value, run in zip(self.values, self.runs):
+            sample = bytes((value >> (8 * i)) & 0xFF for i in range(unit))
+            while run:
+                chunk = min(run, 1024)
+                f.write(sample * chunk)
+                run -= chunk
+
+class LogicAnalyzer:
+    """
+    Samples pin_count consecutive GPIOs from pin_base at rate samples/s.
+
+    A one-instruction program ("in pins, pin_count" with autopush, shifting
+    right so that word bit k*pin_count holds sample k) runs on state machine
+    sm of block pio, and a DMA channel moves its joined RX FIFO into a write
+    ring of depth words (a power of two, at most 8192). pin_count must
+    divide 32.
+
+    With a trigger pattern, a second state machine (trigger_sm) compares the
+    same pins with the pattern and sets PIO IRQ flag irq when they match.
+    Triggers are ignored until pre samples have been captured; once one
+    fires, capture continues for post more samples and stops. The trigger
+    is then located exactly in the data, as the start of the matching run
+    before the point the CPU noticed the flag. Without a pattern, pre + post
+    samples are captured from the start.
+
+    arm() starts a capture and poll() advances it without blocking, returning
+    True when it is complete; capture() does both and returns the result.
+    Samples are run-length encoded by poll() as the ring fills, into value
+    and run buffers of runs entries allocated up front, so a capture without
+    a trigger may be longer than the ring as long as poll() keeps up. The
+    capture stops early, marked truncated, when the run buffer is full or
+    the DMA laps the encoder.
+
+    Unless pio, sm and trigger_sm are all given, both state machines are
+    claimed from the spare ones of a block with room for both programs.
+    """
+
+    def __init__(self, pin_base, pin_count=8, rate=1_000_000, depth=4096, runs=4096,
+                 pio=None, sm=None, trigger_sm=None, irq=0):
+        if 32 % pin_count or depth & (depth - 1) or depth > 8192:
+            raise ValueError("pin_count must divide 32 and depth be a power of two up to 8192")
+        self.pin_base = pin_base
+        self.pin_count = pin_count
+        self.rate = pio_div(rate)[2]
+        self._div = clkdiv(rate)
+        self.depth = depth
+        self.irq = irq
+        self.program = assemble(".wrap_target\nin pins, %d\n.wrap" % pin_count)
+        self.trigger_program = assemble("""
+            .wrap_target
+            top:
+                mov isr, null
+                in pins, %d
+                mov x, isr
+                jmp x!=y top
+                irq nowait %d
+            .wrap
+        """ % (pin_count, irq))
+        pio, sm, trigger_sm = self._claim_sms(pio, sm, trigger_sm)
+        self.pio = pio
+        self.sm = sm
+        self.trigger_sm = trigger_sm
+        typecode = "B" if pin_count <= 8 else "H" if pin_count <= 16 else "L"
+        self._values = array(typecode, [0] * runs)
+        self._runs = array("H", [0] * runs)
+        self._raw = array("L", [0] * (2 * depth))
+        start = (-addressof(self._raw) % (4 * depth)) // 4
+        self.ring = memoryview(self._raw)[start:start + depth]
+        ring = 0
+        while 1 << ring < 4 * depth:
+            ring += 1
+        self._config = DmaConfig(
+            read_addr=PIO_BASE[pio] + 0x020 + 4 * sm,
+            write_addr=addressof(self.ring),
+            trans_count=0xFFFFFFFF,
+            TREQ_SEL=DREQ_PIO0_RX0 + 8 * pio + sm,
+            INCR_READ=0,
+            INCR_WRITE=1,
+            RING_SEL=1,
+            RING_SIZE=ring,
+        )
+        self._irq_flags = words(PIO_BASE[pio] + 0x030, 1)
+        self.dma_ch = None
+        self.pattern = None
+        self.state = None
+        self.result = None
+
+    def _claim_sms(self, pio, sm, trigger_sm):
+        if pio is not None and sm is not None and trigger_sm is not None:
+            state_machines.claim(pio, sm, self)
+            try:
+                state_machines.claim(pio, trigger_sm, self)
+            except ValueError:
+                state_machines.unclaim(pio, sm)
+                raise
+            return pio, sm, trigger_sm
+        for p in range(len(PIO_BASE)) if pio is None else (pio,):
+            free = state_machines.free(p)
+            mem = instr_mem[p]
+            # Two spare state machines and room for both programs
+            if free & (free - 1) and mem.find(self.program) >= 0 and mem.find(self.trigger_program) >= 0:
+                _, sm = state_machines.claim(p, owner=self)
+                _, trigger_sm = state_machines.claim(p, owner=self)
+                return p, sm, trigger_sm
+        raise OSError("no PIO block with two spare state machines")
+
+    def _setup_sm(self, sm, program, autopush):
+        offset = instr_mem[self.pio].load(program)
+        program.configure(self.pio, sm, offset)
+        with Shadow(addressof(pios[self.pio].SM[sm]), SM_FILEDS) as s:
+            s.CLKDIV.INT = self._div[0]
+            s.CLKDIV.FRAC = self._div[1]
+            s.SHIFTCTRL.AUTOPUSH = autopush
+            s.SHIFTCTRL.PUSH_THRESH = 0     # 32 bits
+            s.SHIFTCTRL.IN_SHIFTDIR = autopush
+            s.SHIFTCTRL.FJOIN_RX = autopush
+            s.PINCTRL.IN_BASE = self.pin_base
+        return offset
+
+    def _written(self):
+        return 0xFFFFFFFF - dma_ch_regs[self.dma_ch].TRANS_COUNT
+
+    def arm(self, pattern=None, pre=None, post=None):
+        """
+        Start a capture. pre and post are in samples; by default the ring is
+        split evenly around the trigger, or filled once without one.
+        """
+        spw = 32 // self.pin_count
+        ring_samples = self.depth * spw
+        if pre is None:
+            pre = ring_samples // 2
+        if post is None:
+            post = ring_samples - pre
+        if pattern is not None and pre + post > ring_samples:
+            raise ValueError("pre + post exceeds the ring")
+        self.pattern = pattern
+        self._pre_words = (pre + spw - 1) // spw
+        self._post_words = (post + spw - 1) // spw
+        # Encoder state: next ring word, index of the open run, its value and length
+        self._start = self._next = 0
+        self._end = self._pre_words + self._post_words
+        self._k = -1
+        self._value = -1
+        self._run = 0
+        self._truncated = False
+        pio, sm, tsm = self.pio, self.sm, self.trigger_sm
+        mask = 1 << sm
+        if pattern is not None:
+            mask |= 1 << tsm
+        pios_atomic[pio].clr.CTRL = mask
+        self._setup_sm(sm, self.program, 1)
+        if pattern is not None:
+            self._setup_sm(tsm, self.trigger_program, 0)
+            regs = pios[pio].SM[tsm]
+            pios[pio].TXF[tsm] = pattern
+            regs.INSTR = assemble("pull block").instructions[0]
+            regs.INSTR = assemble("mov y, osr").instructions[0]
+        pios_atomic[pio].set.CTRL = mask << _CTRL_SM_RESTART_POS
+        if self.dma_ch is None:
+            self.dma_ch = allocator.claim_channel(owner=self)
+        self._config.apply(self.dma_ch)
+        self._irq_flags[0] = 1 << self.irq
+        self.result = None
+        self.state = "pre" if pattern is not None else "fill"
+        self._trig = None
+        # Start both state machines with their dividers in phase
+        pios_atomic[pio].set.CTRL = mask | mask << _CTRL_CLKDIV_RESTART_POS
+
+    def poll(self):
+        """Advance the capture; True once the result is ready."""
+        state = self.state
+        if state is None:
+            return self.result is not None
+        written = self._written()
+        if state == "pre":
+            if written >= self._pre_words:
+                self._irq_flags[0] = 1 << self.irq
+                self.state = "armed"
+        elif state == "armed":
+            if self._irq_flags[0] >> self.irq & 1:
+                self._trig = written
+                self._start = self._next = written - self._pre_words
+                self._end = written + self._post_words
+                self.state = "post"
+        elif written - self._next > self.depth:
+            self._truncated = True
+            self.stop()
+        elif not self._feed(min(written, self._end)) or written >= self._end:
+            self.stop()
+        return self.result is not None
+
+    def capture(self, pattern=None, pre=None, post=None):
+        self.arm(pattern, pre, post)
+        while not self.poll():
+            pass
+        return self.result
+
+    def stop(self):
+        """Stop sampling and encode the rest of what has been captured."""
+        pio = self.pio
+        pios_atomic[pio].clr.CTRL = 1 << self.sm | 1 << self.trigger_sm
+        dma_words.CHAN_ABORT = 1 << self.dma_ch
+        while dma_words.CHAN_ABORT:
+            pass
+        end = self._written()
+        instr_mem[pio].unload(self.program)
+        if self.pattern is not None:
+            instr_mem[pio].unload(self.trigger_program)
+        if self._trig is None and self.state != "fill":
+            # Stopped before a trigger: keep the latest ring's worth
+            self._start = self._next = max(0, end - self.depth)
+            self._end = end
+        if end - self._next > self.depth:
+            self._truncated = True
+        elif not self._truncated:
+            self._feed(min(end, self._end))
+        k = self._k + 1
+        values = self._values[:k]
+        runs = self._runs[:k]
+        trigger = None
+        if self._trig is not None:
+            trigger = self._locate(values, runs, (self._trig - self._start) * (32 // self.pin_count))
+        self.result = Capture(values, runs, self.rate, self.pin_base, self.pin_count, trigger, self._truncated)
+        self.state = None
+
+    def close(self):
+        if self.state is not None:
+            self.stop()
+        if self.dma_ch is not None:
+            allocator.unclaim_channel(self.dma_ch)
+            self.dma_ch = None
+        if self.sm is not None:
+            state_machines.unclaim(self.pio, self.sm)
+            state_machines.unclaim(self.pio, self.trigger_sm)
+            self.sm = self.trigger_sm = None
+
+    def _feed(self, end):
+        """Encode ring words up to end; False once the run buffer is full."""
+        n = self.pin_count
+        spw = 32 // n
+        mask = (1 << n) - 1 if n < 32 else 0xFFFFFFFF
+        ring = self.ring
+        wrap = self.depth - 1
+        values = self._values
+        runs = self._runs
+        last = len(runs) - 1
+        k = self._k
+        current = self._value
+        run = self._run
+        w = self._next
+        ok = True
+        while w < end:
+            word = ring[w & wrap]
+            w += 1
+            for _ in range(spw):
+                value = word & mask
+                word >>= n
+                if value == current and run < _MAX_RUN:
+                    run += 1
+                    continue
+                if k >= 0:
+                    runs[k] = run
+                if k == last:
+                    self._truncated = True
+                    ok = False
+                    break
+                k += 1
+                values[k] = current = value
+                run = 1
+            if not ok:
+                break
+        if k >= 0 and ok:
+            runs[k] = run
+        self._k = k
+        self._value = current
+        self._run = run
+        self._next = w
+        return ok
+
+    def _locate(self, values, runs, seen):
+        # Start of the last run matching the pattern at or before sample seen
+        starts = []
+        t = 0
+        for run in runs:
+            starts.append(t)
+            t += run
+        for i in range(len(runs) - 1, -1, -1):
+            if starts[i] <= seen and values[i] == self.pattern:
+                return starts[i]
+        return seen
@@ -0,0 +1,159 @@
+#    Copyright 2025 Hessam Mehr
+
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+
+#        http://www.apache.org/licenses/LICENSE-2.0
+
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+
+"""
+Asynchronous memory-to-memory copy and fill by DMA.
+
+    t = memdma.copy(dst, src)
+    ...                 # CPU is free while the copy runs
+    t.wait()
+
+Transfers are unpaced (DREQ_PERMANENT) and use the widest DATA_SIZE the
+relative alignment of source and destination allows; the few bytes before
+and after the aligned body are copied by the CPU before the DMA starts.
+"""
+
+from array import array
+from uctypes import addressof, bytearray_at
+from .dma import *
+from .piodma import itemsize
+
+# Transfers shorter than this are done by the CPU
+_DMA_MIN_BYTES = const(32)
+
+_SIZE_LOG2 = {1: 0, 2: 1, 4: 2}
+_DATA_SIZE = (DMA_SIZE_BYTE, DMA_SIZE_HALFWORD, DMA_SIZE_WORD)
+_configs = {}
+
+def _config(size_log2, incr_read, bswap):
+    key = (size_log2, incr_read, bswap)
+    config = _configs.get(key)
+    if config is None:
+        config = _configs[key] = DmaConfig(
+            DATA_SIZE=_DATA_SIZE[size_log2],
+            INCR_READ=incr_read,
+            INCR_WRITE=1,
+            BSWAP=1 if bswap else 0,
+        )
+    return config
+
+def _nbytes(buf):
+    return len(memoryview(buf)) * itemsize(buf)
+
+class DmaTransfer:
+    """
+    Handle for a running copy or fill. done() polls it and wait() spins
+    until it completes; the channel is released at completion and the
+    buffers are kept referenced until then.
+    """
+
+    def __init__(self, ch=None, refs=()):
+        self.ch = ch
+        self._refs = refs
+
+    def done(self):
+        ch = self.ch
+        if ch is not None and not dma.CH[ch].CTRL_TRIG.BUSY:
+            allocator.unclaim_channel(ch)
+            self.ch = None
+            self._refs = ()
+        return self.ch is None
+
+    def wait(self):
+        while not self.done():
+            pass
+
+    def abort(self):
+        ch = self.ch
+        if ch is not None:
+            dma_words.CHAN_ABORT = 1 << ch
+            while dma_words.CHAN_ABORT:
+                pass
+            self.done()
+
+def _start(write_addr, read_addr, nbytes, size_log2, incr_read, bswap, refs):
+    ch = allocator.claim_channel(owner="memdma")
+    config = _config(size_log2, incr_read, bswap)
+    config.read_addr = read_addr
+    config.write_addr = write_addr
+    config.trans_count = nbytes >> size_log2
+    config.apply(ch)
+    return DmaTransfer(ch, refs)
+
+def copy(dst, src, nbytes=None, bswap=0):
+    """
+    Copy nbytes (default: all of src) from src to dst, both buffer-protocol
+    objects. bswap=2 or 4 reverses the bytes of each halfword or word, which
+    requires both buffers to be aligned to that size. Returns a DmaTransfer.
+    """
+    if nbytes is None:
+        nbytes = _nbytes(src)
+    elif nbytes > _nbytes(src):
+        raise ValueError("source too small")
+    if nbytes > _nbytes(dst):
+        raise ValueError("destination too small")
+    d = addressof(dst)
+    s = addressof(src)
+    if bswap:
+        size_log2 = _SIZE_LOG2[bswap]
+        if (d | s | nbytes) & (bswap - 1):
+            raise ValueError("byte-swapped copy must be aligned")
+        return _start(d, s, nbytes, size_log2, 1, True, (dst, src))
+    if nbytes < _DMA_MIN_BYTES:
+        bytearray_at(d, nbytes)[:] = bytearray_at(s, nbytes)
+        return DmaTransfer()
+    rel = (d - s) & 3
+    size_log2 = 2 if rel == 0 else 1 if rel == 2 else 0
+    size = 1 << size_log2
+    head = -d & (size - 1)
+    body = (nbytes - head) & -size
+    tail = nbytes - head - body
+    if head:
+        bytearray_at(d, head)[:] = bytearray_at(s, head)
+    if tail:
+        end = head + body
+        bytearray_at(d + end, tail)[:] = bytearray_at(s + end, tail)
+    return _start(d + head, s + head, body, size_log2, 1, False, (dst, src))
+
+def fill(dst, value, size=1, nbytes=None):
+    """
+    Fill nbytes (default: all) of dst with a repeating value of size bytes
+    (1, 2 or 4, little-endian), read from a one-word source with INCR_READ=0.
+    Returns a DmaTransfer.
+    """
+    if size not in _SIZE_LOG2:
+        raise ValueError("size must be 1, 2 or 4")
+    if nbytes is None:
+        nbytes = _nbytes(dst)
+    elif nbytes > _nbytes(dst):
+        raise ValueError("destination too small")
+    pattern = bytes((value >> (8 * i)) & 0xFF for i in range(size))
+    d = addressof(dst)
+    head = min(-d & 3, nbytes)
+    body = (nbytes - head) & -4
+    if nbytes < _DMA_MIN_BYTES:
+        head, body = nbytes, 0
+    out = bytearray_at(d, nbytes)
+    for i in range(head):
+        out[i] = pattern[i % size]
+    for i in range(head + body, nbytes):
+        out[i] = pattern[i % size]
+    if not body:
+        return DmaTransfer()
+    # Source word holds the pattern as it falls at the first aligned address
+    word = 0
+    for i in range(4):
+        word |= pattern[(head + i) % size] << (8 * i)
+    source = array("L", [word])
+    return _start(d + head, addressof(source), body, 2, 0, False, (dst, source))
@@ -0,0 +1,114 @@
+#    Copyright 2025 Hessam Mehr
+
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+
+#        http://www.apache.org/licenses/LICENSE-2.0
+
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+
+from array import array
+from uctypes import addressof
+from .adc import adc
+from .adcstream import ADC_FIFO_ADDR
+from .clkplan import adc_div
+from .dma import *
+from .reg import pack
+
+class Oversampler:
+    """
+    ADC oversampling with the DMA sniffer doing the accumulation.
+
+    Each pass converts count samples of one input, paced by DREQ_ADC, and
+    DMAs them from the ADC FIFO into a dummy word with the sniffer in SUM
+    mode, so the CPU only reads back the total. The sniffer has a single
+    accumulator, so a set of channels is sampled one pass per channel, in
+    order. rate is the conversion rate in samples/s (None for the maximum,
+    500 kS/s).
+
+    read() returns the totals for all channels; dividing by count gives the
+    mean, and the totals of 4**n samples shifted right by n give n extra
+    bits of resolution. stream() yields totals continuously.
+    """
+
+    def __init__(self, channels, count=64, rate=None):
+        self.channels = tuple(channels)
+        self.count = count
+        self.rate = rate
+        self.totals = array("L", [0] * len(self.channels))
+        self._sink = array("L", [0])
+        self.dma_ch = allocator.claim_channel(owner=self)
+        self._config = DmaConfig(
+            read_addr=ADC_FIFO_ADDR,
+            write_addr=addressof(self._sink),
+            trans_count=count,
+            TREQ_SEL=DREQ_ADC,
+            DATA_SIZE=DMA_SIZE_HALFWORD,
+            INCR_READ=0,
+            SNIFF_EN=1,
+        )
+        self._sniff_ctrl = pack(DMA_SNIFF_CTRL_FIELDS, EN=1, DMACH=self.dma_ch, CALC=DMA_SNIFF_CALC_SUM)
+
+    def _idle(self):
+        adc.CS.START_MANY = 0
+        while not adc.CS.READY:
+            pass
+        while not adc.FCS.EMPTY:
+            adc.FIFO.VAL
+
+    def _setup(self):
+        int_div, frac_div = adc_div(self.rate)[:2] if self.rate else (0, 0)
+        adc.CS.EN = 1
+        self._idle()
+        adc.CS.RROBIN = 0
+        adc.DIV.INT = int_div
+        adc.DIV.FRAC = frac_div
+        adc.FCS.ERR = 0     # Keep bit 15 out of the sums
+        adc.FCS.SHIFT = 0
+        adc.FCS.THRESH = 1
+        adc.FCS.DREQ_EN = 1
+        adc.FCS.EN = 1
+        adc.FCS.OVER = 1
+        adc.FCS.UNDER = 1
+
+    def _pass(self, channel):
+        adc.CS.AINSEL = channel
+        dma.SNIFF_DATA = 0
+        dma_words.SNIFF_CTRL = self._sniff_ctrl
+        self._config.apply(self.dma_ch)
+        adc.CS.START_MANY = 1
+        while dma.CH[self.dma_ch].CTRL_TRIG.BUSY:
+            pass
+        self._idle()
+        total = dma.SNIFF_DATA
+        dma_words.SNIFF_CTRL = 0
+        return total
+
+    def read(self):
+        """One pass per channel; returns totals, indexed like channels."""
+        self._setup()
+        totals = self.totals
+        for i, channel in enumerate(self.channels):
+            totals[i] = self._pass(channel)
+        adc.FCS.DREQ_EN = 0
+        return totals
+
+    def stream(self):
+        """Yield totals for every round of passes, reusing one array."""
+        self._setup()
+        totals = self.totals
+        try:
+            while True:
+                for i, channel in enumerate(self.channels):
+                    totals[i] = self._pass(channel)
+                yield totals
+        finally:
+            adc.FCS.DREQ_EN = 0
+
+    def close(self):
+        allocator.unclaim_channel(self.dma_ch)
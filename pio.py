@@ -13,6 +13,8 @@
 #    limitations under the License.
 
 from uctypes import BF_POS, BF_LEN, BFUINT32, ARRAY, UINT32, struct
+from .reg import Atomic
+from .clkplan import pio_div
 
 PIO_BASE = [0x50200000, 0x50300000]
 
@@ -97,8 +99,8 @@ SM_FILEDS = {
     "CLKDIV": (0x00, CLKDIV_FIELDS),
     "EXECCTRL": (0x04, EXECCTRL_FIELDS),
     "SHIFTCTRL": (0x08, SHIFTCTRL_FIELDS),
-    "ADDR": (0x0C | ARRAY, 4 | 4 << BF_LEN | BFUINT32),
-    "INSTR": (0x10 | ARRAY, 4 | 16 << BF_LEN | BFUINT32),
+    "ADDR": 0x0C | 0 << BF_POS | 5 << BF_LEN | BFUINT32, # Read only: current program counter
+    "INSTR": 0x10 | 0 << BF_POS | 16 << BF_LEN | BFUINT32, # Write to execute immediately
     "PINCTRL": (0x14, PINCTRL_FIELDS),
 }
 
@@ -128,7 +130,7 @@ PIO_REGS = {
     "DBG_PADOUT": 0x03C | BFUINT32,
     "DBG_PADOE": 0x040 | BFUINT32,
     "DBG_CFGINFO": (0x044, DBG_CFGINFO_FIELDS),
-    "INSR_MEM": (0x048 | ARRAY, 32, 16 << BF_LEN | BFUINT32),
+    "INSR_MEM": (0x048 | ARRAY, 32 | UINT32), # Write only
     "SM": (0x0C8 | ARRAY, 4, SM_FILEDS),
     "INTR": (0x128, INTR_FIELDS),
     "IRQ": (0x12C | ARRAY, 2, IRQ_FIELDS),
@@ -137,14 +139,67 @@ PIO_REGS = {
 }
 
 pios = [struct(addr, PIO_REGS) for addr in PIO_BASE]
+pios_atomic = [Atomic(addr, PIO_REGS) for addr in PIO_BASE]
 
-def clkdiv(target_freq, clk_freq=125e6):
+PIO_NUM_SMS = const(4)
+
+class SmAllocator:
+    """
+    Ownership tracking for the state machines of both PIO blocks, kept as a
+    bitmask like DmaAllocator's with state machine sm of block pio at bit
+    4 * pio + sm. State machines claimed without a specific number are only
+    taken from those that are also stopped, which keeps them clear of any
+    started through rp2.StateMachine. Bits set in reserved are never handed
+    out.
+    """
+
+    def __init__(self, reserved=0):
+        self.sms = reserved
+        self.owners = {}
+
+    def free(self, pio):
+        """Bitmask of the unclaimed, stopped state machines of block pio."""
+        return ~(self.sms >> PIO_NUM_SMS * pio | pios[pio].CTRL.SM_ENABLE) & 0xF
+
+    def claim(self, pio=None, sm=None, owner=None):
+        """
+        Claim state machine sm of block pio, or the lowest spare one of
+        block pio (or of either block), and return (pio, sm).
+        """
+        if sm is None:
+            for p in range(len(PIO_BASE)) if pio is None else (pio,):
+                free = self.free(p)
+                if free:
+                    pio, sm = p, 0
+                    while not free >> sm & 1:
+                        sm += 1
+                    break
+            else:
+                raise OSError("no free PIO state machine")
+        elif pio is None:
+            raise ValueError("sm needs pio")
+        elif self.sms >> (PIO_NUM_SMS * pio + sm) & 1:
+            raise ValueError("PIO%d SM%d already claimed" % (pio, sm))
+        self.sms |= 1 << PIO_NUM_SMS * pio + sm
+        self.owners[pio, sm] = owner
+        return pio, sm
+
+    def unclaim(self, pio, sm):
+        self.sms &= ~(1 << PIO_NUM_SMS * pio + sm)
+        self.owners.pop((pio, sm), None)
+
+    def is_claimed(self, pio, sm):
+        return bool(self.sms >> (PIO_NUM_SMS * pio + sm) & 1)
+
+    def owner(self, pio, sm):
+        return self.owners.get((pio, sm))
+
+state_machines = SmAllocator()
+
+def clkdiv(target_freq, clk_freq=None):
     """
     Calculate the integer and fractional dividers for a given target frequency
-    and clock frequency (default 125MHz).
+    and clock frequency (default the current system clock), rounded to the
+    nearest achievable setting. See clkplan.pio_div for the resulting error.
     """
-    divider = clk_freq / target_freq
-    assert 1 <= divider <= 65536
-    int_divider = int(divider)
-    frac_divider = int((divider - int_divider) * 256)
-    return (int_divider, frac_divider)
+    return pio_div(target_freq, clk_freq)[:2]
@@ -0,0 +1,289 @@
+#    Copyright 2025 Hessam Mehr
+
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+
+#        http://www.apache.org/licenses/LICENSE-2.0
+
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+
+from array import array
+from uctypes import addressof
+from .pio import pios, SM_FILEDS
+from .reg import Shadow
+
+PIO_INSTR_MEM_SIZE = const(32)
+
+# Opcodes (bits 15:13)
+PIO_OP_JMP  = const(0x0000)
+PIO_OP_WAIT = const(0x2000)
+PIO_OP_IN   = const(0x4000)
+PIO_OP_OUT  = const(0x6000)
+PIO_OP_PUSH = const(0x8000)
+PIO_OP_PULL = const(0x8080)
+PIO_OP_MOV  = const(0xA000)
+PIO_OP_IRQ  = const(0xC000)
+PIO_OP_SET  = const(0xE000)
+
+_JMP_COND = {"!x": 1, "~x": 1, "x--": 2, "!y": 3, "~y": 3, "y--": 4, "x!=y": 5, "pin": 6, "!osre": 7, "~osre": 7}
+_WAIT_SRC = {"gpio": 0, "pin": 1, "irq": 2}
+_IN_SRC = {"pins": 0, "x": 1, "y": 2, "null": 3, "isr": 6, "osr": 7}
+_OUT_DEST = {"pins": 0, "x": 1, "y": 2, "null": 3, "pindirs": 4, "pc": 5, "isr": 6, "exec": 7}
+_MOV_DEST = {"pins": 0, "x": 1, "y": 2, "exec": 4, "pc": 5, "isr": 6, "osr": 7}
+_MOV_SRC = {"pins": 0, "x": 1, "y": 2, "null": 3, "status": 5, "isr": 6, "osr": 7}
+_SET_DEST = {"pins": 0, "x": 1, "y": 2, "pindirs": 4}
+
+class PioProgram:
+    """
+    An assembled, relocatable PIO program.
+
+    instructions are encoded for offset 0; jmps lists the indices of JMP
+    instructions whose targets are patched when the program is loaded
+    elsewhere. wrap_target and wrap are program-relative. sideset is the
+    number of side-set value bits, without the enable bit added by
+    sideset_opt. origin is the required load offset, or -1 for any.
+    """
+
+    def __init__(self, instructions, jmps=(), wrap_target=0, wrap=None,
+                 sideset=0, sideset_opt=False, sideset_pindirs=False, origin=-1, labels=None):
+        self.instructions = array("H", instructions)
+        self.jmps = tuple(jmps)
+        self.wrap_target = wrap_target
+        self.wrap = len(self.instructions) - 1 if wrap is None else wrap
+        self.sideset = sideset
+        self.sideset_opt = sideset_opt
+        self.sideset_pindirs = sideset_pindirs
+        self.origin = origin
+        self.labels = labels or {}
+        self.key = (tuple(self.instructions), origin)
+
+    def __len__(self):
+        return len(self.instructions)
+
+    def relocated(self, offset):
+        """Instructions with JMP targets moved to a load offset."""
+        code = array("H", self.instructions)
+        for i in self.jmps:
+            code[i] = (code[i] & ~0x1F) | ((code[i] + offset) & 0x1F)
+        return code
+
+    def configure(self, pio, sm, offset, jump=True):
+        """
+        Point state machine sm of block pio at the program loaded at offset:
+        wrap bounds and side-set configuration are written with one store per
+        register and, with jump=True, the SM is sent to the program's first
+        instruction (or its "entry" label) through SM INSTR.
+        """
+        with Shadow(addressof(pios[pio].SM[sm]), SM_FILEDS) as s:
+            s.EXECCTRL.WRAP_BOTTOM = offset + self.wrap_target
+            s.EXECCTRL.WRAP_TOP = offset + self.wrap
+            s.EXECCTRL.SIDE_EN = 1 if self.sideset_opt else 0
+            s.EXECCTRL.SIDE_PINDIR = 1 if self.sideset_pindirs else 0
+            s.PINCTRL.SIDESET_COUNT = self.sideset + (1 if self.sideset_opt else 0)
+        if jump:
+            pios[pio].SM[sm].INSTR = PIO_OP_JMP | (offset + self.labels.get("entry", 0))
+
+def _number(token, defines):
+    if token in defines:
+        return defines[token]
+    return int(token, 0)
+
+def assemble(source):
+    """
+    Assemble pioasm source into a PioProgram.
+
+    Supports labels (optionally "public"), all nine instructions plus nop,
+    "side" and "[delay]" suffixes, and the .side_set, .wrap_target, .wrap,
+    .origin and .define directives; .program and other directives are
+    ignored. Comments start with ";" or "//".
+    """
+    defines = {}
+    labels = {}
+    pending = []
+    sideset = 0
+    sideset_opt = False
+    sideset_pindirs = False
+    wrap_target = 0
+    wrap = None
+    origin = -1
+    for lineno, line in enumerate(source.split("\n"), 1):
+        line = line.split(";")[0].split("//")[0].strip()
+        if not line:
+            continue
+        delay = 0
+        if "[" in line:
+            line, _, rest = line.partition("[")
+            delay = _number(rest.partition("]")[0].strip(), defines)
+        tokens = line.replace(",", " ").split()
+        if tokens[0] == "public":
+            tokens = tokens[1:]
+        if tokens[0].endswith(":"):
+            labels[tokens[0][:-1]] = len(pending)
+            tokens = tokens[1:]
+            if not tokens:
+                continue
+        op = tokens[0].lower()
+        if op.startswith("."):
+            if op == ".side_set":
+                sideset = _number(tokens[1], defines)
+                sideset_opt = "opt" in tokens[2:]
+                sideset_pindirs = "pindirs" in tokens[2:]
+            elif op == ".wrap_target":
+                wrap_target = len(pending)
+            elif op == ".wrap":
+                wrap = len(pending) - 1
+            elif op == ".origin":
+                origin = _number(tokens[1], defines)
+            elif op == ".define":
+                defines[tokens[-2]] = _number(tokens[-1], defines)
+            continue
+        side = None
+        if "side" in tokens:
+            i = tokens.index("side")
+            side = _number(tokens[i + 1], defines)
+            tokens = tokens[:i] + tokens[i + 2:]
+        try:
+            instr, target = _encode(op, tokens[1:], defines)
+        except (KeyError, IndexError, ValueError):
+            raise ValueError("line %d: cannot assemble %r" % (lineno, line))
+        # Delay/side-set field: side-set (and its enable bit) in the top bits
+        side_bits = sideset + (1 if sideset_opt else 0)
+        if delay >> (5 - side_bits):
+            raise ValueError("line %d: delay too long" % lineno)
+        field = delay
+        if side is not None:
+            field |= side << (5 - side_bits)
+            if sideset_opt:
+                field |= 0x10
+        elif sideset and not sideset_opt:
+            raise ValueError("line %d: side-set is not optional" % lineno)
+        pending.append((instr | field << 8, target, lineno))
+    jmps = []
+    instructions = []
+    for i, (instr, target, lineno) in enumerate(pending):
+        if target is not None:
+            if target in labels:
+                instr |= labels[target]
+            else:
+                instr |= _number(target, defines)
+            jmps.append(i)
+        instructions.append(instr)
+    if len(instructions) > PIO_INSTR_MEM_SIZE:
+        raise ValueError("program too long")
+    return PioProgram(instructions, jmps, wrap_target, wrap, sideset, sideset_opt, sideset_pindirs, origin, labels)
+
+def _encode(op, args, defines):
+    """Return (instruction, jmp target or None) for one instruction."""
+    target = args[-1] if args else None
+    args = [arg.lower() for arg in args]
+    if op == "nop":
+        return PIO_OP_MOV | 2 << 5 | 2, None # mov y, y
+    if op == "jmp":
+        cond = _JMP_COND[args[0]] if len(args) > 1 else 0
+        return PIO_OP_JMP | cond << 5, target
+    if op == "wait":
+        rel = 0x10 if args[-1] == "rel" else 0
+        return PIO_OP_WAIT | _number(args[0], defines) << 7 | _WAIT_SRC[args[1]] << 5 | rel | _number(args[2], defines), None
+    if op == "in":
+        return PIO_OP_IN | _IN_SRC[args[0]] << 5 | (_number(args[1], defines) & 0x1F), None
+    if op == "out":
+        return PIO_OP_OUT | _OUT_DEST[args[0]] << 5 | (_number(args[1], defines) & 0x1F), None
+    if op == "push":
+        return PIO_OP_PUSH | ("iffull" in args) << 6 | ("noblock" not in args) << 5, None
+    if op == "pull":
+        return PIO_OP_PULL | ("ifempty" in args) << 6 | ("noblock" not in args) << 5, None
+    if op == "mov":
+        src = args[-1]
+        mov_op = 0
+        if len(args) == 3:
+            mov_op = 1 if args[1] in ("!", "~") else 2
+        elif src[0] in "!~":
+            mov_op, src = 1, src[1:]
+        elif src.startswith("::"):
+            mov_op, src = 2, src[2:]
+        return PIO_OP_MOV | _MOV_DEST[args[0]] << 5 | mov_op << 3 | _MOV_SRC[src], None
+    if op == "irq":
+        rel = 0x10 if args[-1] == "rel" else 0
+        if rel:
+            args = args[:-1]
+        mode = args[0] if len(args) > 1 else "set"
+        clr = 1 if mode == "clear" else 0
+        wait = 1 if mode == "wait" else 0
+        return PIO_OP_IRQ | clr << 6 | wait << 5 | rel | _number(args[-1], defines), None
+    if op == "set":
+        return PIO_OP_SET | _SET_DEST[args[0]] << 5 | (_number(args[1], defines) & 0x1F), None
+    raise ValueError(op)
+
+class InstrMemory:
+    """
+    First-fit allocator for the 32-slot instruction memory of one PIO block.
+
+    Identical programs share one copy, reference counted, so several state
+    machines can run the same code for the cost of one load. Slots set in
+    reserved (e.g. those used through rp2.PIO) are never allocated.
+    """
+
+    def __init__(self, pio, reserved=0):
+        self.pio = pio
+        self.used = reserved
+        self.loaded = {}
+
+    def find(self, program):
+        """Lowest offset the program fits at, or -1."""
+        n = len(program)
+        mask = (1 << n) - 1
+        if program.origin >= 0:
+            return program.origin if not self.used & mask << program.origin else -1
+        for offset in range(PIO_INSTR_MEM_SIZE - n + 1):
+            if not self.used & mask << offset:
+                return offset
+        return -1
+
+    def load(self, program):
+        """Load (or share) a program and return its offset."""
+        entry = self.loaded.get(program.key)
+        if entry is not None:
+            entry[1] += 1
+            return entry[0]
+        offset = self.find(program)
+        if offset < 0:
+            raise OSError("no space for PIO program")
+        mem = pios[self.pio].INSR_MEM
+        for i, instr in enumerate(program.relocated(offset)):
+            mem[offset + i] = instr
+        self.used |= ((1 << len(program)) - 1) << offset
+        self.loaded[program.key] = [offset, 1]
+        return offset
+
+    def unload(self, program):
+        """Drop one reference to a program, freeing its slots with the last."""
+        entry = self.loaded[program.key]
+        entry[1] -= 1
+        if not entry[1]:
+            del self.loaded[program.key]
+            self.used &= ~(((1 << len(program)) - 1) << entry[0])
+
+instr_mem = [InstrMemory(0), InstrMemory(1)]
+
+def load_program(program, pio=None):
+    """
+    Load a program into block pio, or the first block with room (sharing an
+    existing copy if possible). Returns (pio, offset).
+    """
+    if pio is not None:
+        return pio, instr_mem[pio].load(program)
+    for mem in instr_mem:
+        if program.key in mem.loaded:
+            return mem.pio, mem.load(program)
+    for mem in instr_mem:
+        if mem.find(program) >= 0:
+            return mem.pio, mem.load(program)
+    raise OSError("no space for PIO program")
+
+def unload_program(program, pio):
+    instr_mem[pio].unload(program)
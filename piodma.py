@@ -0,0 +1,163 @@
+#    Copyright 2025 Hessam Mehr
+
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+
+#        http://www.apache.org/licenses/LICENSE-2.0
+
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+
+from uctypes import addressof
+from .dma import *
+from .pio import pios, PIO_BASE
+
+_DATA_SIZE = {1: DMA_SIZE_BYTE, 2: DMA_SIZE_HALFWORD, 4: DMA_SIZE_WORD}
+
+_TYPECODE_SIZE = {"b": 1, "B": 1, "h": 2, "H": 2, "i": 4, "I": 4, "l": 4, "L": 4, "f": 4}
+
+def itemsize(buf):
+    """Item size in bytes of a buffer-protocol object."""
+    view = memoryview(buf)
+    try:
+        return view.itemsize
+    except AttributeError:
+        # Ports built without MICROPY_PY_BUILTINS_MEMORYVIEW_ITEMSIZE
+        pass
+    if isinstance(buf, (bytes, bytearray)):
+        return 1
+    typecode = getattr(buf, "typecode", None)
+    if typecode in _TYPECODE_SIZE:
+        return _TYPECODE_SIZE[typecode]
+    if len(view) > 1:
+        return addressof(view[1:]) - addressof(view)
+    raise TypeError("can't tell the item size of this buffer")
+
+class PioDma:
+    """
+    DMA transfers between buffers and the FIFOs of one state machine.
+
+    put() streams any buffer-protocol object into the TX FIFO and get()
+    fills one from the RX FIFO, paced by the SM's DREQ_PIOn_TXm/RXm, with
+    the DMA transfer size taken from the buffer's item size (bytes and
+    halfwords are replicated across the FIFO's byte lanes on writes). The
+    buffer is used in place; with block=False the call returns as soon as the
+    transfer is started and the buffer must not be touched until tx_busy() /
+    rx_busy() is false.
+
+    join="tx" or "rx" joins the FIFOs (SHIFTCTRL.FJOIN_TX/RX) into one
+    8-entry FIFO in that direction, which rides out longer DMA latencies.
+    A DMA channel per direction is claimed on first use and kept until
+    close().
+    """
+
+    def __init__(self, pio, sm, join=None):
+        self.pio = pio
+        self.sm = sm
+        self.txf = PIO_BASE[pio] + 0x010 + 4 * sm
+        self.rxf = PIO_BASE[pio] + 0x020 + 4 * sm
+        self.tx_dreq = DREQ_PIO0_TX0 + 8 * pio + sm
+        self.rx_dreq = DREQ_PIO0_RX0 + 8 * pio + sm
+        self.tx_ch = None
+        self.rx_ch = None
+        self._configs = {}
+        self._tx_buf = None
+        self._rx_buf = None
+        if join is not None:
+            shiftctrl = pios[pio].SM[sm].SHIFTCTRL
+            shiftctrl.FJOIN_TX = 1 if join == "tx" else 0
+            shiftctrl.FJOIN_RX = 1 if join == "rx" else 0
+
+    def _config(self, rx, size, bswap):
+        key = (rx, size, bswap)
+        config = self._configs.get(key)
+        if config is None:
+            config = self._configs[key] = DmaConfig(
+                read_addr=self.rxf if rx else 0,
+                write_addr=0 if rx else self.txf,
+                TREQ_SEL=self.rx_dreq if rx else self.tx_dreq,
+                DATA_SIZE=_DATA_SIZE[size],
+                INCR_READ=0 if rx else 1,
+                INCR_WRITE=1 if rx else 0,
+                BSWAP=1 if bswap else 0,
+            )
+        return config
+
+    def put(self, buf, block=True, bswap=False):
+        """Write buf to the TX FIFO."""
+        if self.tx_ch is None:
+            self.tx_ch = allocator.claim_channel(owner=self)
+        else:
+            self.wait_tx()
+        config = self._config(False, itemsize(buf), bswap)
+        config.read_addr = addressof(buf)
+        config.trans_count = len(memoryview(buf))
+        self._tx_buf = buf
+        config.apply(self.tx_ch)
+        if block:
+            self.wait_tx()
+
+    def get(self, buf, block=True, bswap=False):
+        """Fill buf from the RX FIFO."""
+        if self.rx_ch is None:
+            self.rx_ch = allocator.claim_channel(owner=self)
+        else:
+            self.wait_rx()
+        config = self._config(True, itemsize(buf), bswap)
+        config.write_addr = addressof(buf)
+        config.trans_count = len(memoryview(buf))
+        self._rx_buf = buf
+        config.apply(self.rx_ch)
+        if block:
+            self.wait_rx()
+
+    def tx_busy(self):
+        return self.tx_ch is not None and bool(dma.CH[self.tx_ch].CTRL_TRIG.BUSY)
+
+    def rx_busy(self):
+        return self.rx_ch is not None and bool(dma.CH[self.rx_ch].CTRL_TRIG.BUSY)
+
+    def wait_tx(self):
+        while self.tx_busy():
+            pass
+        self._tx_buf = None
+
+    def wait_rx(self):
+        while self.rx_busy():
+            pass
+        self._rx_buf = None
+
+    def close(self):
+        mask = 0
+        for ch in (self.tx_ch, self.rx_ch):
+            if ch is not None:
+                mask |= 1 << ch
+        if mask:
+            dma_words.CHAN_ABORT = mask
+            while dma_words.CHAN_ABORT:
+                pass
+        for ch in (self.tx_ch, self.rx_ch):
+            if ch is not None:
+                allocator.unclaim_channel(ch)
+        self.tx_ch = self.rx_ch = None
+        self._tx_buf = self._rx_buf = None
+
+_streams = {}
+
+def _stream(pio, sm):
+    stream = _streams.get((pio, sm))
+    if stream is None:
+        stream = _streams[(pio, sm)] = PioDma(pio, sm)
+    return stream
+
+def put_buffer(pio, sm, buf, block=True):
+    """Write buf to the TX FIFO of state machine sm of block pio by DMA."""
+    _stream(pio, sm).put(buf, block)
+
+def get_buffer(pio, sm, buf, block=True):
+    """Fill buf from the RX FIFO of state machine sm of block pio by DMA."""
+    _stream(pio, sm).get(buf, block)
@@ -0,0 +1,148 @@
+#    Copyright 2025 Hessam Mehr
+
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+
+#        http://www.apache.org/licenses/LICENSE-2.0
+
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+
+"""
+PIO state machine health monitor.
+
+    mon = PioMonitor()
+    machine.Timer(freq=2000, callback=mon.sample)
+    ...
+    print(mon.report())
+"""
+
+from array import array
+from uctypes import BF_POS, BF_LEN, BFUINT32, struct
+from .pio import PIO_BASE
+from .reg import words
+
+# FLEVEL read in halves so that values stay small ints
+_BLOCK_FIELDS = {
+    "FLEVEL_LO":    0x00C | 0 << BF_POS | 16 << BF_LEN | BFUINT32,
+    "FLEVEL_HI":    0x00C | 16 << BF_POS | 16 << BF_LEN | BFUINT32,
+}
+
+_SM_FIELDS = {
+    "EXEC_STALLED": 0x04 | 31 << BF_POS | 1 << BF_LEN | BFUINT32,
+    "ADDR":         0x0C | 0 << BF_POS | 5 << BF_LEN | BFUINT32,
+}
+
+# Per-SM event counters
+EVENT_TXSTALL = const(0)    # SM stalled on an empty TX FIFO (pull/out)
+EVENT_TXOVER = const(1)     # Write to a full TX FIFO
+EVENT_RXUNDER = const(2)    # Read from an empty RX FIFO
+EVENT_RXSTALL = const(3)    # SM stalled on a full RX FIFO (push/in)
+EVENT_EXEC_STALLED = const(4)
+_NUM_EVENTS = const(5)
+_EVENT_NAMES = ("txstall", "txover", "rxunder", "rxstall", "stalled")
+
+# FDEBUG bit position of each sticky event, per SM
+_FDEBUG_POS = (24, 16, 8, 0)
+
+_LEVELS = const(9)  # 0-8 entries, 8 with joined FIFOs
+
+class PioMonitor:
+    """
+    Periodic profiler of PIO state machines.
+
+    sample() makes one pass over both blocks: per block it reads FLEVEL and
+    FDEBUG, clearing whichever sticky FDEBUG bits were set with a single
+    write-back, and per state machine EXECCTRL.EXEC_STALLED and ADDR. It
+    accumulates TX/RX FIFO level histograms, event counts (an FDEBUG bit seen
+    set counts one event per sample) and a histogram of the program counter,
+    all in preallocated arrays, so it can be a timer IRQ callback.
+
+    sms lists (pio, sm) pairs to watch, by default all eight.
+    """
+
+    def __init__(self, sms=None):
+        if sms is None:
+            sms = [(pio, sm) for pio in range(2) for sm in range(4)]
+        self.sms = tuple(sms)
+        n = len(self.sms)
+        self._blocks = []
+        for pio in sorted(set(p for p, _ in self.sms)):
+            base = PIO_BASE[pio]
+            members = [(k, sm, struct(base + 0x0C8 + 0x18 * sm, _SM_FIELDS))
+                       for k, (p, sm) in enumerate(self.sms) if p == pio]
+            self._blocks.append((words(base + 0x008, 1), struct(base, _BLOCK_FIELDS), members))
+        self.tx_hist = array("L", [0] * (n * _LEVELS))
+        self.rx_hist = array("L", [0] * (n * _LEVELS))
+        self.pc_hist = array("L", [0] * (n * 32))
+        self.events = array("L", [0] * (n * _NUM_EVENTS))
+        self.samples = 0
+
+    def sample(self, _=None):
+        for fdebug, block, members in self._blocks:
+            debug = fdebug[0]
+            if debug:
+                fdebug[0] = debug
+            lo = block.FLEVEL_LO
+            hi = block.FLEVEL_HI
+            for k, sm, regs in members:
+                level = (hi if sm >= 2 else lo) >> (8 * (sm & 1))
+                self.tx_hist[k * _LEVELS + (level & 0xF)] += 1
+                self.rx_hist[k * _LEVELS + (level >> 4 & 0xF)] += 1
+                self.pc_hist[k * 32 + regs.ADDR] += 1
+                e = k * _NUM_EVENTS
+                for i in range(4):
+                    if debug >> (_FDEBUG_POS[i] + sm) & 1:
+                        self.events[e + i] += 1
+                if regs.EXEC_STALLED:
+                    self.events[e + EVENT_EXEC_STALLED] += 1
+        self.samples += 1
+
+    def reset(self):
+        for a in (self.tx_hist, self.rx_hist, self.pc_hist, self.events):
+            for i in range(len(a)):
+                a[i] = 0
+        self.samples = 0
+
+    def _mean(self, hist, k):
+        total = weighted = 0
+        for level in range(_LEVELS):
+            count = hist[k * _LEVELS + level]
+            total += count
+            weighted += count * level
+        return weighted / total if total else 0
+
+    def _peak(self, hist, k):
+        for level in range(_LEVELS - 1, -1, -1):
+            if hist[k * _LEVELS + level]:
+                return level
+        return 0
+
+    def hot_pcs(self, k, n=3):
+        """The n most frequent program counters of sms[k] as (pc, fraction)."""
+        counts = sorted(((self.pc_hist[k * 32 + pc], pc) for pc in range(32)), reverse=True)
+        return [(pc, count / self.samples) for count, pc in counts[:n] if count]
+
+    def report(self):
+        """
+        One line per state machine: mean/peak TX and RX FIFO levels, event
+        counts, the share of samples with EXEC_STALLED and the hottest PCs.
+        """
+        if not self.samples:
+            return "no samples"
+        lines = ["%d samples" % self.samples]
+        for k, (pio, sm) in enumerate(self.sms):
+            e = k * _NUM_EVENTS
+            events = " ".join("%s %d" % (_EVENT_NAMES[i], self.events[e + i]) for i in range(4) if self.events[e + i])
+            pcs = " ".join("%d:%d%%" % (pc, int(100 * f)) for pc, f in self.hot_pcs(k))
+            lines.append("pio%d sm%d  tx %.1f/%d  rx %.1f/%d  exec_stalled %d%%  %s  pc %s" % (
+                pio, sm,
+                self._mean(self.tx_hist, k), self._peak(self.tx_hist, k),
+                self._mean(self.rx_hist, k), self._peak(self.rx_hist, k),
+                100 * self.events[e + EVENT_EXEC_STALLED] // self.samples,
+                events or "-", pcs))
+        return "\n".join(lines)
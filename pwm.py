@@ -1,4 +1,5 @@
 from uctypes import BF_POS, BF_LEN, BFUINT32, ARRAY, UINT32, struct
+from .reg import Atomic, flatten
 
 PWM_BASE = const(0x40050000)
 
@@ -32,7 +33,7 @@ CHANNEL_FIELDS = {
 }
 
 PWM_FIELDS = {
-    "CH": (0x00, ARRAY, 8, CHANNEL_FIELDS),
+    "CH": (0x00 | ARRAY, 8, CHANNEL_FIELDS),
     # 1 bit per channel (CH0–CH7) for the following registers
     "EN": 0xa0 | 0 << BF_POS | 8 << BF_LEN | BFUINT32,
     "INTR": 0xa4 | 0 << BF_POS | 8 << BF_LEN | BFUINT32, # Raw interrupts
@@ -42,6 +43,8 @@ PWM_FIELDS = {
 }
 
 pwm = struct(PWM_BASE, PWM_FIELDS)
+pwm_atomic = Atomic(PWM_BASE, PWM_FIELDS)
+pwm_words = struct(PWM_BASE, flatten(PWM_FIELDS))
 
 # Free-running counting dictated by fractional divider
 CSR_DIVMODE_DIV = const(0x0)
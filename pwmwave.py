@@ -0,0 +1,182 @@
+#    Copyright 2025 Hessam Mehr
+
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+
+#        http://www.apache.org/licenses/LICENSE-2.0
+
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+
+from array import array
+from uctypes import addressof
+from .clkplan import pwm_div
+from .dma import *
+from .pwm import pwm_atomic, pwm_words, CSR_FIELDS, PWM_BASE
+from .reg import field_mask
+
+PWM_CH_STRIDE = const(0x14)
+
+_CSR_PH_CORRECT = field_mask(CSR_FIELDS["PH_CORRECT"])
+_CSR_PH_RET = field_mask(CSR_FIELDS["PH_RET"])
+_CSR_PH_ADV = field_mask(CSR_FIELDS["PH_ADV"])
+
+def pack_samples(out, a, b=None, top=0xFFFF, bits=16, b_level=0):
+    """
+    Pack channel A and B samples into CC words, B in the top halfword,
+    scaling unsigned bits-wide samples by (TOP+1)/2**bits, so the largest
+    sample gives at most TOP (full on, TOP+1, does not fit CC for TOP=0xFFFF).
+    Without b, B is held at b_level (already in counts).
+    """
+    scale = top + 1
+    for i in range(len(a)):
+        cc_b = (b[i] * scale) >> bits if b is not None else b_level
+        out[i] = cc_b << 16 | (a[i] * scale) >> bits
+    return out
+
+class PwmWave:
+    """
+    DMA waveform playback into the CC register of one PWM slice.
+
+    The slice wraps at rate samples/s (divider and TOP from clkplan.pwm_div,
+    maximizing duty resolution) and each wrap's DREQ_PWM_WRAPn moves one
+    packed A/B word into CC, so outputs change exactly once per period with
+    no CPU involvement.
+
+    Playback uses two DMA channels chained to each other, each reading one
+    block of block words through a read ring aligned to its size, so neither
+    needs re-arming. block must be a power of two (at most 8192). With
+    double=False both channels play buffers[0], looping one block forever;
+    with double=True they alternate between two buffers and refills() yields
+    each buffer as it finishes so it can be reloaded while the other plays.
+    """
+
+    def __init__(self, slice_num, rate, block=256, double=False, phase_correct=False):
+        if block & (block - 1) or block > 8192:
+            raise ValueError("block must be a power of two up to 8192")
+        self.slice = slice_num
+        self.block = block
+        self.double = double
+        self.phase_correct = phase_correct
+        self.div_int, self.div_frac, self.top, self.rate, self.ppm = pwm_div(rate, phase_correct=phase_correct)
+        nbytes = 4 * block
+        nbuf = 2 if double else 1
+        # Room to align the buffers to the ring size
+        self._raw = array("L", [0] * (block * (nbuf + 1)))
+        start = (-addressof(self._raw) % nbytes) // 4
+        raw = memoryview(self._raw)
+        self.buffers = tuple(raw[start + i * block:start + (i + 1) * block] for i in range(nbuf))
+        self.dma_ch = (allocator.claim_channel(owner=self), allocator.claim_channel(owner=self))
+        ring = 0
+        while 1 << ring < nbytes:
+            ring += 1
+        self._configs = [DmaConfig(
+            read_addr=addressof(self.buffers[i % nbuf]),
+            write_addr=PWM_BASE + slice_num * PWM_CH_STRIDE + 0x0c, # CC
+            trans_count=block,
+            CHAIN_TO=self.dma_ch[1 - i],
+            TREQ_SEL=DREQ_PWM_WRAP0 + slice_num,
+            RING_SEL=0,
+            RING_SIZE=ring,
+        ) for i in range(2)]
+        self.running = False
+        self.count = 0
+
+    def load(self, a, b=None, bits=16, index=0, b_level=0):
+        """Scale and pack samples into buffers[index]."""
+        pack_samples(self.buffers[index], a, b, self.top, bits, b_level)
+
+    def arm(self):
+        """
+        Configure the slice (disabled) and start the DMA channels, which then
+        wait for the slice's first wrap. Use start(), or PwmGroup.start() to
+        enable several slices together.
+        """
+        ch = pwm_words.CH[self.slice]
+        pwm_atomic.clr.EN = 1 << self.slice
+        ch.CSR = _CSR_PH_CORRECT if self.phase_correct else 0
+        ch.DIV = self.div_int << 4 | self.div_frac
+        ch.TOP = self.top
+        ch.CC = self.buffers[0][0]
+        ch.CTR = 0
+        dma_words.INTR = 1 << self.dma_ch[0] | 1 << self.dma_ch[1]
+        self._configs[1].apply(self.dma_ch[1], trigger=False)
+        self._configs[0].apply(self.dma_ch[0])
+        self.count = 0
+        self.running = True
+
+    def start(self):
+        self.arm()
+        pwm_atomic.set.EN = 1 << self.slice
+
+    def stop(self):
+        self.running = False
+        pwm_atomic.clr.EN = 1 << self.slice
+        for ch in self.dma_ch:
+            dma.CH[ch].ALIAS1.CTRL.EN = 0
+        dma_words.CHAN_ABORT = 1 << self.dma_ch[0] | 1 << self.dma_ch[1]
+        while dma_words.CHAN_ABORT:
+            pass
+
+    def close(self):
+        if self.running:
+            self.stop()
+        for ch in self.dma_ch:
+            allocator.unclaim_channel(ch)
+
+    def refills(self):
+        """Yield (index, buffer) of each block as it finishes playing."""
+        bits = (1 << self.dma_ch[0], 1 << self.dma_ch[1])
+        n = self.count & 1
+        while self.running:
+            bit = bits[n]
+            while not dma_words.INTR & bit:
+                if not self.running:
+                    return
+            dma_words.INTR = bit
+            self.count += 1
+            yield n, self.buffers[n % len(self.buffers)]
+            n ^= 1
+
+class PwmGroup:
+    """
+    Phase-aligned control of several PWM slices (numbers or PwmWave
+    players). Counters are zeroed and the slices enabled or disabled with one
+    write to the EN mask, so they run in lockstep.
+    """
+
+    def __init__(self, slices):
+        self.players = [s for s in slices if isinstance(s, PwmWave)]
+        self.slices = [s.slice if isinstance(s, PwmWave) else s for s in slices]
+        self.mask = 0
+        for s in self.slices:
+            self.mask |= 1 << s
+
+    def start(self):
+        pwm_atomic.clr.EN = self.mask
+        for player in self.players:
+            player.arm()
+        for s in self.slices:
+            pwm_words.CH[s].CTR = 0
+        pwm_atomic.set.EN = self.mask
+
+    def stop(self):
+        pwm_atomic.clr.EN = self.mask
+        for player in self.players:
+            player.stop()
+
+    def trim(self, slice_num, steps):
+        """
+        Shift one running slice's phase by steps counter ticks (positive
+        advances) through the self-clearing CSR.PH_ADV/PH_RET bits.
+        """
+        bit = _CSR_PH_ADV if steps > 0 else _CSR_PH_RET
+        ch = pwm_words.CH[slice_num]
+        for _ in range(abs(steps)):
+            pwm_atomic.set.CH[slice_num].CSR = bit
+            while ch.CSR & bit:
+                pass
@@ -0,0 +1,271 @@
+#    Copyright 2025 Hessam Mehr
+
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+
+#        http://www.apache.org/licenses/LICENSE-2.0
+
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+
+from uctypes import BF_POS, BF_LEN, ARRAY, UINT32, sizeof, struct
+
+# Atomic register access aliases (RP2040 datasheet 2.1.2). Every peripheral
+# register is mirrored at these offsets from its normal address; a write to an
+# alias XORs, sets or clears the written bits in a single bus write.
+REG_ALIAS_RW_BITS  = const(0x0000)
+REG_ALIAS_XOR_BITS = const(0x1000)
+REG_ALIAS_SET_BITS = const(0x2000)
+REG_ALIAS_CLR_BITS = const(0x3000)
+
+def field_pos(desc):
+    """Bit position of a bitfield descriptor, e.g. DMA_CTRL_FIELDS['CHAIN_TO']."""
+    return (desc >> BF_POS) & 0x1F
+
+def field_mask(desc):
+    """In-place mask of a bitfield descriptor within its 32-bit register."""
+    return ((1 << ((desc >> BF_LEN) & 0x1F)) - 1) << ((desc >> BF_POS) & 0x1F)
+
+def pack(fields, **values):
+    """
+    Pack named bitfield values into a single register word, e.g.
+    pack(DMA_CTRL_FIELDS, EN=1, DATA_SIZE=DMA_SIZE_WORD).
+    """
+    word = 0
+    for name, value in values.items():
+        desc = fields[name]
+        pos = (desc >> BF_POS) & 0x1F
+        word |= (value << pos) & field_mask(desc)
+    return word
+
+def words(addr, n):
+    """Indexable view of n consecutive 32-bit registers starting at addr."""
+    return struct(addr, {"w": (0 | ARRAY, n | UINT32)}).w
+
+def is_bitfield(desc):
+    """True for BFUINT8..BFINT32 scalar descriptors."""
+    return 8 <= (desc >> 27) & 0xF <= 13
+
+def is_array(desc):
+    """True for (offset | ARRAY, ...) aggregate descriptors."""
+    return (desc[0] >> 29) & 3 == 2
+
+def is_register(fields):
+    """True if every field of a descriptor is a bitfield of one word at offset 0."""
+    for desc in fields.values():
+        if not isinstance(desc, int) or desc & 0x1FFFF:
+            return False
+    return True
+
+def flatten(fields):
+    """
+    Whole-word copy of a descriptor: every register, whether described by a
+    bitfield struct or a scalar, becomes a plain UINT32 at the same offset.
+    """
+    flat = {}
+    for name, desc in fields.items():
+        if isinstance(desc, int):
+            flat[name] = (desc & 0x1FFFF) | UINT32
+        elif not is_array(desc):
+            flat[name] = (desc[0] & 0x1FFFF) | UINT32 if is_register(desc[1]) else (desc[0], flatten(desc[1]))
+        elif len(desc) == 2 or is_register(desc[2]):
+            flat[name] = (desc[0], (desc[1] & 0x07FFFFFF) | UINT32)
+        else:
+            flat[name] = (desc[0], desc[1], flatten(desc[2]))
+    return flat
+
+def registers(fields, skip=()):
+    """
+    Every register word of a descriptor as (offset, name, bitfields) in offset
+    order, with array elements expanded, e.g. (0x10c, "CH[4].CTRL_TRIG",
+    DMA_CTRL_FIELDS). bitfields is None for plain words. Entries named in skip
+    are left out; where names alias the same word only the first is kept.
+    """
+    regs = []
+    _walk(fields, skip, 0, "", regs)
+    regs.sort(key=lambda r: r[0])
+    out = []
+    for r in regs:
+        if not out or out[-1][0] != r[0]:
+            out.append(r)
+    return out
+
+def _walk(fields, skip, base, prefix, out):
+    for name, desc in fields.items():
+        if name in skip:
+            continue
+        full = prefix + name
+        if isinstance(desc, int):
+            out.append((base + (desc & 0x1FFFF), full, {name: desc} if is_bitfield(desc) else None))
+            continue
+        offset = base + (desc[0] & 0x1FFFF)
+        if not is_array(desc):
+            if is_register(desc[1]):
+                out.append((offset, full, desc[1]))
+            else:
+                _walk(desc[1], skip, offset, full + ".", out)
+        elif len(desc) == 2:
+            for i in range(desc[1] & 0xFFFF):
+                out.append((offset + 4 * i, "%s[%d]" % (full, i), None))
+        elif is_register(desc[2]):
+            for i in range(desc[1]):
+                out.append((offset + 4 * i, "%s[%d]" % (full, i), desc[2]))
+        else:
+            stride = sizeof(desc[2])
+            for i in range(desc[1]):
+                _walk(desc[2], skip, offset + i * stride, "%s[%d]." % (full, i), out)
+
+class Atomic:
+    """
+    SET/CLR/XOR alias views of a register block, e.g.
+
+        pwm_atomic.set.EN = 1 << 3          # enable slice 3
+        pios_atomic[0].clr.CTRL = 1 << sm   # stop state machine sm
+        dma_atomic.xor.INTE0 = 1 << ch
+
+    Registers are exposed as whole words (see flatten) and are meant to be
+    written with a mask: a single store with no read, which cannot race with
+    the other core or an interrupt handler touching other bits of the same
+    register. Use pack() to build masks for multi-bit fields.
+    """
+
+    def __init__(self, base, fields):
+        flat = flatten(fields)
+        self.xor = struct(base + REG_ALIAS_XOR_BITS, flat)
+        self.set = struct(base + REG_ALIAS_SET_BITS, flat)
+        self.clr = struct(base + REG_ALIAS_CLR_BITS, flat)
+
+# The whole peripheral address space (0x40000000-0x5fffffff, aliases
+# included) as one word array, so that the helpers below create no views
+_PERIPH_BASE = const(0x40000000)
+_periph = words(_PERIPH_BASE, 0x07FFFFFF)
+
+def set_bits(addr, mask):
+    """Atomically set mask bits of the register at addr."""
+    _periph[(addr - _PERIPH_BASE + REG_ALIAS_SET_BITS) >> 2] = mask
+
+def clr_bits(addr, mask):
+    """Atomically clear mask bits of the register at addr."""
+    _periph[(addr - _PERIPH_BASE + REG_ALIAS_CLR_BITS) >> 2] = mask
+
+def xor_bits(addr, mask):
+    """Atomically toggle mask bits of the register at addr."""
+    _periph[(addr - _PERIPH_BASE + REG_ALIAS_XOR_BITS) >> 2] = mask
+
+class Shadow:
+    """
+    Write-coalescing transaction over a register block described by a uctypes
+    descriptor, e.g.
+
+        with Shadow(addressof(pios[0].SM[1]), SM_FILEDS) as sm:
+            sm.EXECCTRL.WRAP_TOP = 31
+            sm.EXECCTRL.WRAP_BOTTOM = 0
+            sm.SHIFTCTRL.AUTOPUSH = 1
+
+    Field accesses mirror the uctypes struct, but go to a shadow copy of the
+    touched registers: each register is read at most once (never, with
+    zero=True, where untouched bits start out as 0) and every register that
+    was assigned is written exactly once, in address order, when the block
+    exits. Registers named in late (e.g. dma.DMA_TRIGGER_REGS) are written
+    after all others. If the block raises, nothing is written.
+    """
+
+    def __init__(self, addr, fields, late=(), zero=False):
+        self.fields = fields
+        self.late = late
+        self.zero = zero
+        self.regs = words(addr, sizeof(fields) // 4)
+        self.shadow = {}
+        self.dirty = {}
+
+    def __enter__(self):
+        return _View(self, 0, self.fields, None)
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.flush()
+        else:
+            self.discard()
+
+    def read(self, i):
+        value = self.shadow.get(i)
+        if value is None:
+            value = 0 if self.zero else self.regs[i]
+            self.shadow[i] = value
+        return value
+
+    def write(self, i, value, name):
+        self.shadow[i] = value
+        self.dirty[i] = name in self.late
+
+    def flush(self):
+        """Write every dirty register once, late registers last."""
+        regs = self.regs
+        shadow = self.shadow
+        order = sorted(self.dirty)
+        for i in order:
+            if not self.dirty[i]:
+                regs[i] = shadow[i]
+        for i in order:
+            if self.dirty[i]:
+                regs[i] = shadow[i]
+        self.discard()
+
+    def discard(self):
+        self.shadow = {}
+        self.dirty = {}
+
+class _View:
+    def __init__(self, txn, base, fields, name):
+        object.__setattr__(self, "_txn", txn)
+        object.__setattr__(self, "_base", base)
+        object.__setattr__(self, "_fields", fields)
+        object.__setattr__(self, "_name", name)
+
+    def __getattr__(self, name):
+        desc = self._fields[name]
+        if isinstance(desc, int):
+            i = (self._base + (desc & 0x1FFFF)) >> 2
+            word = self._txn.read(i)
+            if is_bitfield(desc):
+                return (word & field_mask(desc)) >> field_pos(desc)
+            return word
+        offset = self._base + (desc[0] & 0x1FFFF)
+        if is_array(desc):
+            return _Array(self._txn, offset, desc, name)
+        return _View(self._txn, offset, desc[1], name)
+
+    def __setattr__(self, name, value):
+        desc = self._fields[name]
+        if not isinstance(desc, int):
+            raise TypeError("cannot assign to aggregate " + name)
+        i = (self._base + (desc & 0x1FFFF)) >> 2
+        if is_bitfield(desc):
+            mask = field_mask(desc)
+            value = (self._txn.read(i) & ~mask) | ((value << field_pos(desc)) & mask)
+            # A bitfield belongs to the register its parent struct describes
+            name = self._name or name
+        self._txn.write(i, value & 0xFFFFFFFF, name)
+
+class _Array:
+    def __init__(self, txn, base, desc, name):
+        self._txn = txn
+        self._base = base
+        self._fields = desc[2] if len(desc) == 3 else None
+        self._stride = sizeof(desc[2]) if len(desc) == 3 else 4
+        self._name = name
+
+    def __getitem__(self, n):
+        offset = self._base + n * self._stride
+        if self._fields is None:
+            return self._txn.read(offset >> 2)
+        return _View(self._txn, offset, self._fields, self._name)
+
+    def __setitem__(self, n, value):
+        if self._fields is not None:
+            raise TypeError("cannot assign to aggregate " + self._name)
+        self._txn.write((self._base + n * self._stride) >> 2, value & 0xFFFFFFFF, self._name)
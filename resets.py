@@ -0,0 +1,75 @@
+#    Copyright 2023-25 Hessam Mehr
+
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+
+#        http://www.apache.org/licenses/LICENSE-2.0
+
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+
+from uctypes import BF_POS, BF_LEN, BFUINT32, struct
+from .reg import Atomic, flatten
+
+RESETS_BASE = const(0x4000c000)
+
+# One bit per peripheral in RESET, WDSEL and RESET_DONE
+RESETS_BITS_FIELDS = {
+    "USBCTRL": 24 << BF_POS | 1 << BF_LEN | BFUINT32,
+    "UART1": 23 << BF_POS | 1 << BF_LEN | BFUINT32,
+    "UART0": 22 << BF_POS | 1 << BF_LEN | BFUINT32,
+    "TIMER": 21 << BF_POS | 1 << BF_LEN | BFUINT32,
+    "TBMAN": 20 << BF_POS | 1 << BF_LEN | BFUINT32,
+    "SYSINFO": 19 << BF_POS | 1 << BF_LEN | BFUINT32,
+    "SYSCFG": 18 << BF_POS | 1 << BF_LEN | BFUINT32,
+    "SPI1": 17 << BF_POS | 1 << BF_LEN | BFUINT32,
+    "SPI0": 16 << BF_POS | 1 << BF_LEN | BFUINT32,
+    "RTC": 15 << BF_POS | 1 << BF_LEN | BFUINT32,
+    "PWM": 14 << BF_POS | 1 << BF_LEN | BFUINT32,
+    "PLL_USB": 13 << BF_POS | 1 << BF_LEN | BFUINT32,
+    "PLL_SYS": 12 << BF_POS | 1 << BF_LEN | BFUINT32,
+    "PIO1": 11 << BF_POS | 1 << BF_LEN | BFUINT32,
+    "PIO0": 10 << BF_POS | 1 << BF_LEN | BFUINT32,
+    "PADS_QSPI": 9 << BF_POS | 1 << BF_LEN | BFUINT32,
+    "PADS_BANK0": 8 << BF_POS | 1 << BF_LEN | BFUINT32,
+    "JTAG": 7 << BF_POS | 1 << BF_LEN | BFUINT32,
+    "IO_QSPI": 6 << BF_POS | 1 << BF_LEN | BFUINT32,
+    "IO_BANK0": 5 << BF_POS | 1 << BF_LEN | BFUINT32,
+    "I2C1": 4 << BF_POS | 1 << BF_LEN | BFUINT32,
+    "I2C0": 3 << BF_POS | 1 << BF_LEN | BFUINT32,
+    "DMA": 2 << BF_POS | 1 << BF_LEN | BFUINT32,
+    "BUSCTRL": 1 << BF_POS | 1 << BF_LEN | BFUINT32,
+    "ADC": 0 << BF_POS | 1 << BF_LEN | BFUINT32,
+}
+
+RESETS_FIELDS = {
+    "RESET": (0x0, RESETS_BITS_FIELDS),      # 1 holds the peripheral in reset
+    "WDSEL": (0x4, RESETS_BITS_FIELDS),      # 1 resets the peripheral on a watchdog reset
+    "RESET_DONE": (0x8, RESETS_BITS_FIELDS), # Read only: 1 once out of reset
+}
+
+resets = struct(RESETS_BASE, RESETS_FIELDS)
+resets_atomic = Atomic(RESETS_BASE, RESETS_FIELDS)
+resets_words = struct(RESETS_BASE, flatten(RESETS_FIELDS))
+
+RESETS_SPI = (1 << 16, 1 << 17)
+RESETS_UART = (1 << 22, 1 << 23)
+
+def unreset(mask):
+    """
+    Take the peripherals in mask out of reset and wait until they are. The
+    runtime leaves UART, SPI, ADC, RTC and USB in reset until first used.
+    """
+    if resets_words.RESET & mask:
+        resets_atomic.clr.RESET = mask
+        while ~resets_words.RESET_DONE & mask:
+            pass
+
+def reset(mask):
+    """Put the peripherals in mask into reset and bring them back out."""
+    resets_atomic.set.RESET = mask
+    unreset(mask)
@@ -0,0 +1,140 @@
+#    Copyright 2025 Hessam Mehr
+
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+
+#        http://www.apache.org/licenses/LICENSE-2.0
+
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+
+from array import array
+from uctypes import addressof
+from .dma import *
+from .reg import field_mask, pack
+
+# Order in which a control block's words land in the data channel's alias
+# registers; the last one of each is the alias' trigger register.
+# 0: READ_ADDR, 1: WRITE_ADDR, 2: TRANS_COUNT, 3: CTRL
+_BLOCK_ORDER = (
+    None,
+    (3, 0, 1, 2), # ALIAS1: CTRL, READ_ADDR, WRITE_ADDR, TRANS_COUNT_TRIG
+    (3, 2, 0, 1), # ALIAS2: CTRL, TRANS_COUNT, READ_ADDR, WRITE_ADDR_TRIG
+    (3, 1, 2, 0), # ALIAS3: CTRL, WRITE_ADDR, TRANS_COUNT, READ_ADDR_TRIG
+)
+
+_CHAIN_TO_MASK = field_mask(DMA_CTRL_FIELDS["CHAIN_TO"])
+_CHAIN_TO_POS = const(11)
+
+class ScatterGather:
+    """
+    Control-block DMA: a data channel runs a list of segments back to back
+    with no CPU involvement between them.
+
+    Each segment is (read_addr, write_addr, count, ctrl), where ctrl is a
+    CTRL word such as DmaConfig(TREQ_SEL=..., INCR_WRITE=0).ctrl; its EN and
+    CHAIN_TO bits are set by the engine. The segments are laid out as packed
+    4-word control blocks in RAM. A control channel copies one block at a time
+    into the data channel's ALIAS1-3 registers, through a 16-byte write ring,
+    and the block's final word triggers the segment, which chains back to the
+    control channel when it completes.
+
+    The list ends with a null block, which stops the data channel and (with
+    quiet=True, where segments carry IRQ_QUIET) raises its interrupt once for
+    the whole list. With loop=True a third channel rewinds the control
+    channel to the first block instead, for continuous output.
+
+    Channels not given explicitly are claimed from dma.allocator and released
+    by close().
+    """
+
+    def __init__(self, segments, alias=3, loop=False, quiet=True, data_ch=None, ctrl_ch=None, reload_ch=None):
+        if not 1 <= alias <= 3:
+            raise ValueError("alias must be 1-3")
+        self.alias = alias
+        self.loop = loop
+        self.quiet = quiet
+        self._claimed = []
+        self.data_ch = self._claim(data_ch)
+        self.ctrl_ch = self._claim(ctrl_ch)
+        self.reload_ch = self._claim(reload_ch) if loop else None
+        self.table = array("L", [0] * 4 * (len(segments) + (0 if loop else 1)))
+        self.load(segments)
+        table_addr = addressof(self.table)
+        self._control = DmaConfig(
+            read_addr=table_addr,
+            write_addr=DMA_BASE + self.data_ch * DMA_CH_STRIDE + alias * 0x10,
+            trans_count=4,
+            INCR_WRITE=1,
+            RING_SEL=1,     # Wrap writes...
+            RING_SIZE=4,    # ...around the 4 registers of the alias
+        )
+        if loop:
+            self._table_addr = array("L", [table_addr])
+            self._reload = DmaConfig(
+                read_addr=addressof(self._table_addr),
+                write_addr=DMA_BASE + self.ctrl_ch * DMA_CH_STRIDE + 0x3C, # AL3_READ_ADDR_TRIG
+                trans_count=1,
+                INCR_READ=0,
+            )
+
+    def _claim(self, ch):
+        if ch is None:
+            ch = allocator.claim_channel(owner=self)
+            self._claimed.append(ch)
+        return ch
+
+    def load(self, segments):
+        """Rewrite the control blocks; the number of segments is fixed."""
+        table = self.table
+        order = _BLOCK_ORDER[self.alias]
+        extra = pack(DMA_CTRL_FIELDS, EN=1, IRQ_QUIET=1 if self.quiet else 0)
+        last = len(segments) - 1
+        for n, (read_addr, write_addr, count, ctrl) in enumerate(segments):
+            chain_to = self.reload_ch if self.loop and n == last else self.ctrl_ch
+            words = (read_addr, write_addr, count, (ctrl & ~_CHAIN_TO_MASK) | extra | chain_to << _CHAIN_TO_POS)
+            for i in range(4):
+                table[4 * n + i] = words[order[i]]
+        if not self.loop:
+            # Null block: EN=0 stops the channel and the zero trigger write
+            # raises the end-of-list interrupt in quiet mode
+            n = len(segments)
+            for i in range(4):
+                table[4 * n + i] = 0
+            table[4 * n] = pack(DMA_CTRL_FIELDS, IRQ_QUIET=1 if self.quiet else 0, CHAIN_TO=self.data_ch)
+
+    def start(self):
+        """Start from the first segment."""
+        if self.loop:
+            self._reload.apply(self.reload_ch, trigger=False)
+        self._control.apply(self.ctrl_ch)
+
+    def busy(self):
+        return bool(dma.CH[self.data_ch].CTRL_TRIG.BUSY or dma.CH[self.ctrl_ch].CTRL_TRIG.BUSY)
+
+    def wait(self):
+        while self.busy():
+            pass
+
+    def stop(self):
+        """Abort all channels of the engine."""
+        mask = 1 << self.data_ch | 1 << self.ctrl_ch
+        if self.loop:
+            mask |= 1 << self.reload_ch
+        for ch in (self.ctrl_ch, self.reload_ch, self.data_ch):
+            # Clear EN first so an aborted channel cannot fire its chain
+            if ch is not None:
+                dma.CH[ch].ALIAS1.CTRL.EN = 0
+        dma.CHAN_ABORT.ABORT = mask
+        while dma.CHAN_ABORT.ABORT & mask:
+            pass
+
+    def close(self):
+        self.stop()
+        for ch in self._claimed:
+            allocator.unclaim_channel(ch)
+        self._claimed = []
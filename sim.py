@@ -0,0 +1,410 @@
+#    Copyright 2025 Hessam Mehr
+
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+
+#        http://www.apache.org/licenses/LICENSE-2.0
+
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+
+"""
+Simulated register space for running this package off-target.
+
+This module is a drop-in replacement for uctypes backed by a Memory object
+instead of the bus. Peripheral address space (0x40000000-0x5fffffff, SIO at
+0xd0000000) is mapped lazily onto bytearrays, including the atomic XOR/SET/CLR
+aliases and the DMA channel register aliases. Buffers passed to addressof()
+are mapped into a simulated SRAM region so that DMA addresses written by
+driver code resolve to them; under CPython they are located with ctypes, on
+the unix MicroPython port through its native uctypes. Every peripheral access is counted and can be
+traced or intercepted with per register hooks.
+
+Install it before importing any of the register modules:
+
+    from rp2040hw import sim
+    mem = sim.install()
+    from rp2040hw.dma import dma, DmaConfig
+    DmaConfig(...).apply(0)
+    print(mem.reads, mem.writes)
+"""
+
+import sys
+
+try:
+    import ctypes
+except ImportError:
+    ctypes = None
+
+# MicroPython's own uctypes, imported before install() replaces it; buffers
+# are located through it there, since its memoryview has no cast() or obj
+try:
+    import uctypes as _native
+except ImportError:
+    _native = None
+if _native is not None and _native is sys.modules.get(__name__):
+    _native = None
+
+def _type(x, bits):
+    # Same encoding as MicroPython's TYPE2SMALLINT: the type sits in the top
+    # bits of a 31-bit small int
+    v = (x << (32 - bits)) & 0xFFFFFFFF
+    if v & 0x80000000:
+        v -= 1 << 32
+    return v >> 1
+
+# --- uctypes-compatible constants ---
+BF_POS = 17
+BF_LEN = 22
+
+UINT8 = _type(0, 4)
+INT8 = _type(1, 4)
+UINT16 = _type(2, 4)
+INT16 = _type(3, 4)
+UINT32 = _type(4, 4)
+INT32 = _type(5, 4)
+UINT64 = _type(6, 4)
+INT64 = _type(7, 4)
+BFUINT8 = _type(8, 4)
+BFINT8 = _type(9, 4)
+BFUINT16 = _type(10, 4)
+BFINT16 = _type(11, 4)
+BFUINT32 = _type(12, 4)
+BFINT32 = _type(13, 4)
+FLOAT32 = _type(14, 4)
+FLOAT64 = _type(15, 4)
+
+PTR = _type(1, 2)
+ARRAY = _type(2, 2)
+
+VOID = UINT8
+NATIVE = 2
+LITTLE_ENDIAN = 0
+BIG_ENDIAN = 1
+
+_SIZES = (1, 1, 2, 2, 4, 4, 8, 8, 1, 1, 2, 2, 4, 4, 4, 8)
+_SIGNED = (False, True, False, True, False, True, False, True, False, True, False, True, False, True)
+
+SRAM_BASE = 0x20000000
+DMA_BASE = 0x50000000
+SIO_BASE = 0xd0000000
+
+# On MicroPython simulated SRAM is laid linearly over the heap, with the
+# first buffer mapped at this address
+_NATIVE_ANCHOR = 0x30000000
+
+# Offsets of the READ_ADDR/WRITE_ADDR/TRANS_COUNT/CTRL registers a DMA
+# channel's alias registers refer to, indexed by offset within the channel
+_DMA_ALIASES = bytes((
+    0x0, 0x4, 0x8, 0xC,
+    0xC, 0x0, 0x4, 0x8,
+    0xC, 0x8, 0x0, 0x4,
+    0xC, 0x4, 0x8, 0x0,
+))
+
+class Memory:
+    """
+    Backing store for the simulated address space.
+
+    reads and writes count peripheral register accesses (SRAM accesses are
+    not counted). Setting trace to a list records (op, addr, value) tuples.
+    hook() installs callbacks keyed by a register's normal (non-alias)
+    address: read(addr, value) returns the value presented to the reader,
+    write(addr, value) returns the value to store (or None to store value
+    unchanged). Subclass and override read()/write() for anything more
+    elaborate.
+    """
+
+    def __init__(self):
+        self.blocks = {}
+        self.read_hooks = {}
+        self.write_hooks = {}
+        self.ram = []
+        self.ram_next = SRAM_BASE
+        self._anchor = None
+        self.trace = None
+        self.reads = 0
+        self.writes = 0
+
+    def reset_counts(self):
+        self.reads = 0
+        self.writes = 0
+
+    def hook(self, addr, read=None, write=None):
+        if read is not None:
+            self.read_hooks[addr] = read
+        if write is not None:
+            self.write_hooks[addr] = write
+
+    def _block(self, addr):
+        if addr >= SIO_BASE:
+            base, alias = addr & ~0xFFF, 0
+        else:
+            # APB/AHB peripherals sit on 16 kB boundaries with the atomic
+            # aliases in the upper three 4 kB windows
+            base, alias = addr & ~0x3FFF, (addr >> 12) & 3
+        offset = addr & 0xFFF
+        if base == DMA_BASE and offset < 0x300:
+            # Channel alias registers are views of the same four registers
+            offset = (offset & ~0x3F) | _DMA_ALIASES[(offset & 0x3F) >> 2]
+        block = self.blocks.get(base)
+        if block is None:
+            block = self.blocks[base] = bytearray(0x1000)
+        return block, base | offset, alias
+
+    def _ram(self, addr, size):
+        if _native is not None:
+            return memoryview(_native.bytearray_at(self._anchor + addr - _NATIVE_ANCHOR, size)), 0
+        for base, n, mv in self.ram:
+            if base <= addr and addr + size <= base + n:
+                return mv, addr - base
+        raise ValueError("unmapped address 0x%08x" % addr)
+
+    def peek(self, addr):
+        """Read a peripheral word without counting or hooks."""
+        block, reg, _ = self._block(addr & ~3)
+        return int.from_bytes(block[reg & 0xFFC:(reg & 0xFFC) + 4], "little")
+
+    def poke(self, addr, value):
+        """Write a peripheral word without counting, hooks or alias semantics."""
+        block, reg, _ = self._block(addr & ~3)
+        block[reg & 0xFFC:(reg & 0xFFC) + 4] = (value & 0xFFFFFFFF).to_bytes(4, "little")
+
+    def read(self, addr, size=4):
+        if SRAM_BASE <= addr < 0x40000000:
+            mv, i = self._ram(addr, size)
+            return int.from_bytes(mv[i:i + size], "little")
+        word = addr & ~3
+        _, reg, _ = self._block(word)
+        value = self.peek(reg)
+        hook = self.read_hooks.get(reg)
+        if hook is not None:
+            value = hook(reg, value)
+        self.reads += 1
+        if self.trace is not None:
+            self.trace.append(("r", word, value))
+        shift = (addr & 3) * 8
+        return (value >> shift) & ((1 << (size * 8)) - 1)
+
+    def write(self, addr, value, size=4):
+        if SRAM_BASE <= addr < 0x40000000:
+            mv, i = self._ram(addr, size)
+            mv[i:i + size] = (value & ((1 << (size * 8)) - 1)).to_bytes(size, "little")
+            return
+        word = addr & ~3
+        _, reg, alias = self._block(word)
+        old = self.peek(reg)
+        if size < 4:
+            shift = (addr & 3) * 8
+            mask = ((1 << (size * 8)) - 1) << shift
+            value = (old & ~mask) | ((value << shift) & mask) if alias == 0 else (value << shift) & mask
+        value &= 0xFFFFFFFF
+        if alias == 1:
+            value ^= old
+        elif alias == 2:
+            value |= old
+        elif alias == 3:
+            value = old & ~value
+        hook = self.write_hooks.get(reg)
+        if hook is not None:
+            stored = hook(reg, value)
+            if stored is not None:
+                value = stored
+        self.poke(reg, value)
+        self.writes += 1
+        if self.trace is not None:
+            self.trace.append(("w", addr, value))
+
+    def map_buffer(self, obj):
+        """Map a buffer into simulated SRAM and return its address."""
+        if _native is not None:
+            # Real addresses, offset into the simulated SRAM window, so that
+            # slices and their parent buffers resolve consistently
+            real = _native.addressof(obj)
+            if self._anchor is None:
+                self._anchor = real
+            addr = _NATIVE_ANCHOR + real - self._anchor
+            if not SRAM_BASE <= addr < 0x40000000:
+                raise ValueError("buffer outside the simulated SRAM window")
+            return addr
+        mv = memoryview(obj).cast("B") if not isinstance(obj, memoryview) or obj.ndim != 1 or obj.format != "B" else obj
+        real = _real_address(mv)
+        if real is not None:
+            for base, n, rmv in self.ram:
+                rreal = _real_address(rmv)
+                if rreal is not None and rreal <= real and real + len(mv) <= rreal + n:
+                    return base + real - rreal
+            if isinstance(obj, memoryview) and obj.obj is not None:
+                # Map the whole underlying buffer so other slices resolve too
+                parent = self.map_buffer(obj.obj)
+                return parent + real - _real_address(memoryview(obj.obj).cast("B"))
+        for base, n, rmv in self.ram:
+            if rmv.obj is mv.obj and n == len(mv):
+                return base
+        base = self.ram_next
+        self.ram.append((base, len(mv), mv))
+        self.ram_next = (base + len(mv) + 7) & ~7
+        return base
+
+def _real_address(mv):
+    if ctypes is None or mv.readonly or not len(mv):
+        return None
+    return ctypes.addressof(ctypes.c_char.from_buffer(mv))
+
+memory = None
+
+def install(mem=None):
+    """
+    Route uctypes to this module, backed by mem (a fresh Memory by default),
+    and provide const() for CPython. Returns the Memory in use.
+    """
+    global memory
+    memory = mem if mem is not None else Memory()
+    sys.modules["uctypes"] = sys.modules[__name__]
+    try:
+        import builtins
+    except ImportError:
+        builtins = None
+    if builtins is not None and not hasattr(builtins, "const"):
+        builtins.const = lambda x: x
+    return memory
+
+# --- uctypes-compatible API ---
+
+def _kind(desc):
+    return (desc >> 27) & 0xF
+
+def _agg(desc):
+    return (desc[0] >> 29) & 3
+
+def sizeof(desc, layout=NATIVE):
+    if isinstance(desc, (struct, _Array)):
+        desc = desc._desc
+    if isinstance(desc, int):
+        return _SIZES[_kind(desc)]
+    if isinstance(desc, tuple):
+        if _agg(desc) == 2:
+            if len(desc) == 2:
+                return (desc[1] & 0x07FFFFFF) * _SIZES[_kind(desc[1])]
+            return desc[1] * sizeof(desc[2])
+        return sizeof(desc[1])
+    size = 0
+    align = 1
+    for d in desc.values():
+        if isinstance(d, int):
+            end = (d & 0x1FFFF) + _SIZES[_kind(d)]
+            a = _SIZES[_kind(d)]
+        else:
+            end = (d[0] & 0x1FFFF) + sizeof(d)
+            a = 4
+        size = max(size, end)
+        align = max(align, a)
+    return (size + align - 1) // align * align
+
+def addressof(obj):
+    if isinstance(obj, (struct, _Array)):
+        return obj._addr
+    return memory.map_buffer(obj)
+
+def bytearray_at(addr, size):
+    if SRAM_BASE <= addr < 0x40000000:
+        mv, i = memory._ram(addr, size)
+        return mv[i:i + size]
+    block, reg, _ = memory._block(addr)
+    return memoryview(block)[reg & 0xFFF:(reg & 0xFFF) + size]
+
+def bytes_at(addr, size):
+    return bytes(bytearray_at(addr, size))
+
+def _read(addr, desc):
+    kind = _kind(desc)
+    size = _SIZES[kind]
+    value = memory.read(addr + (desc & 0x1FFFF), size)
+    if 8 <= kind <= 13:
+        pos = (desc >> BF_POS) & 0x1F
+        n = (desc >> BF_LEN) & 0x1F
+        value = (value >> pos) & ((1 << n) - 1)
+        bits = n
+    else:
+        bits = size * 8
+    if kind < len(_SIGNED) and _SIGNED[kind] and value >> (bits - 1):
+        value -= 1 << bits
+    return value
+
+def _write(addr, desc, value):
+    kind = _kind(desc)
+    size = _SIZES[kind]
+    addr += desc & 0x1FFFF
+    if 8 <= kind <= 13:
+        pos = (desc >> BF_POS) & 0x1F
+        mask = ((1 << ((desc >> BF_LEN) & 0x1F)) - 1) << pos
+        value = (memory.read(addr, size) & ~mask) | ((value << pos) & mask)
+    memory.write(addr, value, size)
+
+def _field(addr, desc):
+    if isinstance(desc, int):
+        return _read(addr, desc)
+    offset = desc[0] & 0x1FFFF
+    if _agg(desc) == 2:
+        return _Array(addr + offset, desc)
+    if _agg(desc) == 1:
+        raise NotImplementedError("PTR fields are not simulated")
+    return struct(addr + offset, desc[1])
+
+class struct:
+    def __init__(self, addr, desc, layout=NATIVE):
+        object.__setattr__(self, "_addr", addr)
+        object.__setattr__(self, "_desc", desc)
+
+    def __getattr__(self, name):
+        try:
+            desc = self._desc[name]
+        except KeyError:
+            raise AttributeError(name)
+        return _field(self._addr, desc)
+
+    def __setattr__(self, name, value):
+        try:
+            desc = self._desc[name]
+        except KeyError:
+            raise AttributeError(name)
+        if not isinstance(desc, int):
+            raise TypeError("struct: cannot assign to aggregate")
+        _write(self._addr, desc, value)
+
+class _Array:
+    def __init__(self, addr, desc):
+        self._addr = addr
+        self._desc = desc
+        if len(desc) == 2:
+            self._len = desc[1] & 0x07FFFFFF
+            self._stride = _SIZES[_kind(desc[1])]
+        else:
+            self._len = desc[1]
+            self._stride = sizeof(desc[2])
+
+    def __len__(self):
+        return self._len
+
+    def _check(self, i):
+        if i < 0:
+            i += self._len
+        if not 0 <= i < self._len:
+            raise IndexError("struct: index out of range")
+        return self._addr + i * self._stride
+
+    def __getitem__(self, i):
+        addr = self._check(i)
+        if len(self._desc) == 2:
+            return _read(addr, self._desc[1] & ~0x07FFFFFF)
+        return struct(addr, self._desc[2])
+
+    def __setitem__(self, i, value):
+        addr = self._check(i)
+        if len(self._desc) != 2:
+            raise TypeError("struct: cannot assign to aggregate")
+        _write(addr, self._desc[1] & ~0x07FFFFFF, value)
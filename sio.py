@@ -0,0 +1,366 @@
+#    Copyright 2025 Hessam Mehr
+
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+
+#        http://www.apache.org/licenses/LICENSE-2.0
+
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+
+"""
+Single-cycle IO block: bulk GPIO, the inter-core FIFOs and the hardware
+spinlocks. The interpolators are bound here and used by interp.
+
+    sio.gpio_init(0xFF << 8)            # GPIO8-15 as SIO outputs
+    sio.gpio_put(0xFF << 8, value << 8) # all eight pins in one store
+
+    lock = sio.Spinlock(sio.spinlocks.claim())
+    with lock:
+        ...
+"""
+
+from array import array
+from uctypes import BF_POS, BF_LEN, BFUINT32, ARRAY, UINT32, struct
+from .gpio import GPIO_FUNC_SIO, GPIO_PAD_FIELDS, io_bank0, pads_bank0_atomic
+from .reg import flatten, pack
+
+SIO_BASE = const(0xd0000000)
+
+FIFO_ST_FIELDS = {
+    "ROE": 3 << BF_POS | 1 << BF_LEN | BFUINT32, # Sticky: FIFO_RD read when empty
+    "WOF": 2 << BF_POS | 1 << BF_LEN | BFUINT32, # Sticky: FIFO_WR written when full
+    "RDY": 1 << BF_POS | 1 << BF_LEN | BFUINT32, # Outgoing FIFO not full
+    "VLD": 0 << BF_POS | 1 << BF_LEN | BFUINT32, # Incoming FIFO not empty
+}
+
+INTERP_CTRL_FIELDS = {
+    "OVERF": 25 << BF_POS | 1 << BF_LEN | BFUINT32,
+    "OVERF1": 24 << BF_POS | 1 << BF_LEN | BFUINT32,
+    "OVERF0": 23 << BF_POS | 1 << BF_LEN | BFUINT32,
+    "CLAMP": 22 << BF_POS | 1 << BF_LEN | BFUINT32, # INTERP1 lane 0 only
+    "BLEND": 21 << BF_POS | 1 << BF_LEN | BFUINT32, # INTERP0 lane 0 only
+    "FORCE_MSB": 19 << BF_POS | 2 << BF_LEN | BFUINT32,
+    "ADD_RAW": 18 << BF_POS | 1 << BF_LEN | BFUINT32,
+    "CROSS_RESULT": 17 << BF_POS | 1 << BF_LEN | BFUINT32,
+    "CROSS_INPUT": 16 << BF_POS | 1 << BF_LEN | BFUINT32,
+    "SIGNED": 15 << BF_POS | 1 << BF_LEN | BFUINT32,
+    "MASK_MSB": 10 << BF_POS | 5 << BF_LEN | BFUINT32,
+    "MASK_LSB": 5 << BF_POS | 5 << BF_LEN | BFUINT32,
+    "SHIFT": 0 << BF_POS | 5 << BF_LEN | BFUINT32,
+}
+
+# Reading a POP register writes each lane's result back to its accumulator
+INTERP_FIELDS = {
+    "ACCUM0": 0x00 | UINT32,
+    "ACCUM1": 0x04 | UINT32,
+    "BASE0": 0x08 | UINT32,
+    "BASE1": 0x0C | UINT32,
+    "BASE2": 0x10 | UINT32,
+    "POP_LANE0": 0x14 | UINT32,
+    "POP_LANE1": 0x18 | UINT32,
+    "POP_FULL": 0x1C | UINT32,
+    "PEEK_LANE0": 0x20 | UINT32,
+    "PEEK_LANE1": 0x24 | UINT32,
+    "PEEK_FULL": 0x28 | UINT32,
+    "CTRL_LANE0": (0x2C, INTERP_CTRL_FIELDS),
+    "CTRL_LANE1": (0x30, INTERP_CTRL_FIELDS),
+    "ACCUM0_ADD": 0x34 | UINT32,
+    "ACCUM1_ADD": 0x38 | UINT32,
+    "BASE_1AND0": 0x3C | UINT32,
+}
+
+# There are no atomic aliases on SIO: GPIO_OUT and GPIO_OE have their own
+# SET/CLR/XOR registers instead.
+SIO_FIELDS = {
+    "CPUID": 0x000 | UINT32,
+    "GPIO_IN": 0x004 | UINT32,
+    "GPIO_HI_IN": 0x008 | UINT32,
+    "GPIO_OUT": 0x010 | UINT32,
+    "GPIO_OUT_SET": 0x014 | UINT32,
+    "GPIO_OUT_CLR": 0x018 | UINT32,
+    "GPIO_OUT_XOR": 0x01C | UINT32,
+    "GPIO_OE": 0x020 | UINT32,
+    "GPIO_OE_SET": 0x024 | UINT32,
+    "GPIO_OE_CLR": 0x028 | UINT32,
+    "GPIO_OE_XOR": 0x02C | UINT32,
+    "GPIO_HI_OUT": 0x030 | UINT32,
+    "GPIO_HI_OUT_SET": 0x034 | UINT32,
+    "GPIO_HI_OUT_CLR": 0x038 | UINT32,
+    "GPIO_HI_OUT_XOR": 0x03C | UINT32,
+    "GPIO_HI_OE": 0x040 | UINT32,
+    "GPIO_HI_OE_SET": 0x044 | UINT32,
+    "GPIO_HI_OE_CLR": 0x048 | UINT32,
+    "GPIO_HI_OE_XOR": 0x04C | UINT32,
+    "FIFO_ST": (0x050, FIFO_ST_FIELDS),
+    "FIFO_WR": 0x054 | UINT32,
+    "FIFO_RD": 0x058 | UINT32,
+    "SPINLOCK_ST": 0x05C | UINT32,
+    "DIV_UDIVIDEND": 0x060 | UINT32,
+    "DIV_UDIVISOR": 0x064 | UINT32,
+    "DIV_SDIVIDEND": 0x068 | UINT32,
+    "DIV_SDIVISOR": 0x06C | UINT32,
+    "DIV_QUOTIENT": 0x070 | UINT32,
+    "DIV_REMAINDER": 0x074 | UINT32,
+    "DIV_CSR": 0x078 | UINT32,
+    "INTERP": (0x080 | ARRAY, 2, INTERP_FIELDS),
+    "SPINLOCK": (0x100 | ARRAY, 32 | UINT32),
+}
+
+sio = struct(SIO_BASE, SIO_FIELDS)
+sio_words = struct(SIO_BASE, flatten(SIO_FIELDS))
+
+SIO_NUM_SPINLOCKS = const(32)
+GPIO_MASK = const(0x3FFFFFFF)   # GPIO0-29
+
+def core():
+    """Number of the core executing the call."""
+    return sio.CPUID
+
+def gpio_in():
+    """Levels of all 30 bank 0 GPIOs in one read."""
+    return sio.GPIO_IN
+
+def gpio_set(mask):
+    sio.GPIO_OUT_SET = mask
+
+def gpio_clr(mask):
+    sio.GPIO_OUT_CLR = mask
+
+def gpio_xor(mask):
+    sio.GPIO_OUT_XOR = mask
+
+def gpio_put(mask, value):
+    """
+    Drive the pins in mask to the matching bits of value. One read and one
+    XOR store, so pins outside mask are untouched even if the other core
+    changes them in between.
+    """
+    sio.GPIO_OUT_XOR = (sio.GPIO_OUT ^ value) & mask
+
+def gpio_oe_set(mask):
+    sio.GPIO_OE_SET = mask
+
+def gpio_oe_clr(mask):
+    sio.GPIO_OE_CLR = mask
+
+def gpio_init(mask, output=True, value=0):
+    """
+    Hand the pins in mask to SIO: output level set to the matching bits of
+    value, output enabled if output, input buffer enabled and FUNCSEL set to
+    SIO.
+    """
+    mask &= GPIO_MASK
+    sio.GPIO_OE_CLR = mask
+    gpio_put(mask, value)
+    ie = pack(GPIO_PAD_FIELDS, IE=1)
+    od = pack(GPIO_PAD_FIELDS, OD=1)
+    for pin in range(30):
+        if mask >> pin & 1:
+            pads_bank0_atomic.set.GPIO[pin] = ie
+            pads_bank0_atomic.clr.GPIO[pin] = od
+            io_bank0.GPIO[pin].CTRL.FUNCSEL = GPIO_FUNC_SIO
+    if output:
+        sio.GPIO_OE_SET = mask
+
+class FifoChannel:
+    """
+    The calling core's end of the inter-core FIFOs: send() writes to the
+    other core's incoming FIFO and recv() reads this core's, eight 32-bit
+    words deep each way.
+
+    The FIFOs are a bare hardware resource. Under MicroPython, a core that
+    runs _thread code has the SDK's flash lockout handler on its FIFO
+    interrupt, which consumes incoming words; use Mailbox to pass messages
+    between two Python threads and keep FifoChannel for a peer that does
+    not install that handler.
+    """
+
+    def send(self, word):
+        """Block until there is room, then send word."""
+        while not sio.FIFO_ST.RDY:
+            pass
+        sio.FIFO_WR = word
+
+    def try_send(self, word):
+        if not sio.FIFO_ST.RDY:
+            return False
+        sio.FIFO_WR = word
+        return True
+
+    def recv(self):
+        """Block until a word arrives and return it."""
+        while not sio.FIFO_ST.VLD:
+            pass
+        return sio.FIFO_RD
+
+    def try_recv(self, default=None):
+        if not sio.FIFO_ST.VLD:
+            return default
+        return sio.FIFO_RD
+
+    def drain(self):
+        """Discard incoming words; returns how many."""
+        n = 0
+        while sio.FIFO_ST.VLD:
+            sio.FIFO_RD
+            n += 1
+        return n
+
+    def errors(self):
+        """Read and clear the sticky (ROE, WOF) error flags."""
+        # Both are write-1-to-clear: write back exactly the bits seen set
+        st = sio_words.FIFO_ST & 0b1100
+        if st:
+            sio_words.FIFO_ST = st
+        return st >> 3, st >> 2 & 1
+
+fifo = FifoChannel()
+
+# Index of a single set bit: 2**k % 37 is distinct for k < 36
+_BIT_INDEX = bytearray(37)
+for _k in range(32):
+    _BIT_INDEX[(1 << _k) % 37] = _k
+
+class SpinlockAllocator:
+    """
+    Ownership tracking for the hardware spinlocks, kept as a bitmask like
+    DmaAllocator's. The pico-sdk, and so the MicroPython runtime, uses
+    spinlocks 0-15 for itself and 16-23 for striped mutexes, so by default
+    only 24-31 are handed out. Bits set in reserved are never handed out.
+    """
+
+    def __init__(self, reserved=0x00FFFFFF):
+        self.locks = reserved
+        self.owners = {}
+
+    def claim(self, n=None, owner=None):
+        """Claim spinlock n, or the lowest free one, and return its number."""
+        if n is None:
+            free = ~self.locks & 0xFFFFFFFF
+            if not free:
+                raise OSError("no free spinlock")
+            n = _BIT_INDEX[(free & -free) % 37]
+        elif self.locks >> n & 1:
+            raise ValueError("spinlock %d already claimed" % n)
+        self.locks |= 1 << n
+        self.owners[n] = owner
+        return n
+
+    def unclaim(self, n):
+        self.locks &= ~(1 << n)
+        self.owners.pop(n, None)
+
+    def is_claimed(self, n):
+        return bool(self.locks >> n & 1)
+
+    def owner(self, n):
+        return self.owners.get(n)
+
+spinlocks = SpinlockAllocator()
+
+class Spinlock:
+    """
+    Hardware spinlock n. Reading the lock register claims it and returns
+    nonzero if the claim succeeded; any write releases it. The read goes
+    through a one-bit view so that it stays a small int, and release() is a
+    single store, so neither allocates and both can be used in an IRQ
+    handler. Spinlocks are not reentrant and do not disable interrupts.
+    """
+
+    def __init__(self, n):
+        self.n = n
+        self._reg = struct(SIO_BASE + 0x100 + 4 * n, {"LOCK": n << BF_POS | 1 << BF_LEN | BFUINT32})
+        self._word = struct(SIO_BASE + 0x100 + 4 * n, {"LOCK": UINT32})
+
+    def try_acquire(self):
+        return self._reg.LOCK
+
+    def acquire(self):
+        reg = self._reg
+        while not reg.LOCK:
+            pass
+
+    def release(self):
+        self._word.LOCK = 0
+
+    def locked(self):
+        return bool(sio.SPINLOCK_ST >> self.n & 1)
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.release()
+
+_EMPTY = object()
+
+class Mailbox:
+    """
+    Ring of depth (a power of two) 32-bit words in RAM, guarded by a hardware
+    spinlock, for passing messages between threads on both cores. send()
+    and recv() hold the lock only to move one word and never allocate.
+    """
+
+    def __init__(self, depth=16, lock=None):
+        if depth & (depth - 1):
+            raise ValueError("depth must be a power of two")
+        self._buf = array("L", [0] * depth)
+        # Head and tail count modulo 2 * depth, so full and empty differ
+        self._idx = array("H", [0, 0])
+        self._mask = depth - 1
+        self._wrap = 2 * depth - 1
+        self._own = lock is None
+        self.lock = lock or Spinlock(spinlocks.claim(owner=self))
+
+    def __len__(self):
+        return (self._idx[0] - self._idx[1]) & self._wrap
+
+    def try_send(self, word):
+        idx = self._idx
+        lock = self.lock
+        lock.acquire()
+        head = idx[0]
+        if (head - idx[1]) & self._wrap > self._mask:
+            lock.release()
+            return False
+        self._buf[head & self._mask] = word
+        idx[0] = (head + 1) & self._wrap
+        lock.release()
+        return True
+
+    def try_recv(self, default=None):
+        idx = self._idx
+        lock = self.lock
+        lock.acquire()
+        tail = idx[1]
+        if tail == idx[0]:
+            lock.release()
+            return default
+        word = self._buf[tail & self._mask]
+        idx[1] = (tail + 1) & self._wrap
+        lock.release()
+        return word
+
+    def send(self, word):
+        while not self.try_send(word):
+            pass
+
+    def recv(self):
+        idx = self._idx
+        while True:
+            while idx[0] == idx[1]:
+                pass
+            word = self.try_recv(_EMPTY)
+            if word is not _EMPTY:
+                return word
+
+    def close(self):
+        if self._own:
+            spinlocks.unclaim(self.lock.n)
+            self._own = False
@@ -0,0 +1,158 @@
+#    Copyright 2025 Hessam Mehr
+
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+
+#        http://www.apache.org/licenses/LICENSE-2.0
+
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+
+"""
+Register snapshots: save, compare and restore the configuration of a
+peripheral block.
+
+    snap = snapshot.pwm_slices()
+    snap.capture()
+    ...
+    print(snapshot.format_diff(snap.diff()))
+    snap.restore()
+"""
+
+from array import array
+from uctypes import ARRAY, UINT32
+from .reg import field_mask, field_pos, registers, words
+from .dma import DMA_BASE, DMA_CH_STRIDE, DMA_CHANNEL_FIELDS
+from .gpio import IO_BANK0_BASE, IO_BANK0_FIELDS, PADS_BANK0_BASE, PADS_BANK0_FIELDS
+from .pio import PIO_BASE, SM_FILEDS
+from .pwm import PWM_BASE, PWM_FIELDS
+
+class Snapshot:
+    """
+    Saved register words of one block described by a *_FIELDS descriptor.
+
+    The register list is worked out once from the descriptor; capture() then
+    copies every register into a preallocated array('L') in one pass (words
+    of 2**30 and up are still boxed on the way through). Registers in skip are ignored altogether. Registers in
+    readonly (status, write-1-to-clear and trigger registers) are captured
+    for diff() but never written by restore(), except those in via, which
+    maps a name to an offset (relative to the register) through which it is
+    written back, e.g. a DMA CTRL_TRIG restored through non-triggering
+    AL1_CTRL. restore() writes back only words that differ from the live
+    value, in offset order with registers in late last.
+    """
+
+    def __init__(self, base, fields, skip=(), readonly=(), late=(), via=None):
+        via = via or {}
+        regs = registers(fields, skip)
+        self.base = base
+        self.names = [r[1] for r in regs]
+        self.fields = [r[2] for r in regs]
+        self.offsets = array("H", [r[0] >> 2 for r in regs])
+        self.data = array("L", [0] * len(regs))
+        self._words = words(base, regs[-1][0] // 4 + 1 + max(list(via.values()) + [0]) // 4)
+        first, last = [], []
+        self._via = array("h", [0] * len(regs))
+        for i, (_, name, _) in enumerate(regs):
+            leaf = _leaf(name)
+            if leaf in via:
+                self._via[i] = via[leaf] >> 2
+            elif leaf in readonly:
+                continue
+            (last if leaf in late else first).append(i)
+        self._restore = array("H", first + last)
+
+    def __len__(self):
+        return len(self.data)
+
+    def capture(self):
+        w = self._words
+        data = self.data
+        offsets = self.offsets
+        for i in range(len(data)):
+            data[i] = w[offsets[i]]
+        return self
+
+    def restore(self):
+        """Write back changed writable registers; returns the number written."""
+        w = self._words
+        data = self.data
+        offsets = self.offsets
+        via = self._via
+        n = 0
+        for i in self._restore:
+            off = offsets[i]
+            value = data[i]
+            if w[off] != value:
+                w[off + via[i]] = value
+                n += 1
+        return n
+
+    def diff(self, other=None):
+        """
+        Changes from this snapshot to other (a Snapshot of the same block) or
+        to the live registers, as (register, field, old, new) tuples; field
+        is None for registers without a field description.
+        """
+        w = self._words
+        changes = []
+        for i in range(len(self.data)):
+            old = self.data[i]
+            new = other.data[i] if other is not None else w[self.offsets[i]]
+            if old == new:
+                continue
+            fields = self.fields[i]
+            if fields is None:
+                changes.append((self.names[i], None, old, new))
+                continue
+            for name, desc in fields.items():
+                mask = field_mask(desc)
+                if (old ^ new) & mask:
+                    pos = field_pos(desc)
+                    changes.append((self.names[i], name, (old & mask) >> pos, (new & mask) >> pos))
+        return changes
+
+def _leaf(name):
+    return name.rpartition(".")[2].partition("[")[0]
+
+def format_diff(changes):
+    lines = []
+    for reg, field, old, new in changes:
+        if field is None or reg.endswith(field):
+            lines.append("%s: 0x%08x -> 0x%08x" % (reg, old, new))
+        else:
+            lines.append("%s.%s: 0x%x -> 0x%x" % (reg, field, old, new))
+    return "\n".join(lines)
+
+# The channel's CH_DBG.TCR, relative to its registers (both have a 0x40 stride)
+_DMA_CHANNEL_TCR_FIELDS = dict(DMA_CHANNEL_FIELDS, TCR=0x804 | UINT32)
+
+def dma_channel(ch):
+    """
+    A DMA channel's READ_ADDR, WRITE_ADDR, TRANS_COUNT and CTRL. TRANS_COUNT
+    reads back the live count, so the reload value is saved from CH_DBG.TCR
+    and restored by writing it to TRANS_COUNT.
+    """
+    return Snapshot(DMA_BASE + ch * DMA_CH_STRIDE, _DMA_CHANNEL_TCR_FIELDS,
+                    skip=("ALIAS1", "ALIAS2", "ALIAS3"), readonly=("TRANS_COUNT",),
+                    late=("CTRL_TRIG",), via={"CTRL_TRIG": 0x04, "TCR": 0x08 - 0x804})
+
+def pio_sms(pio):
+    """The four state machines' registers of a PIO block (not INSTR_MEM)."""
+    return Snapshot(PIO_BASE[pio] + 0x0C8, {"SM": (0 | ARRAY, 4, SM_FILEDS)}, readonly=("ADDR", "INSTR"))
+
+def pwm_slices():
+    """All PWM slices and the global enable/interrupt registers."""
+    return Snapshot(PWM_BASE, PWM_FIELDS, readonly=("CTR", "INTR", "INTS"), late=("EN",))
+
+def io_bank0_pins():
+    """CTRL (function select and overrides) of every bank 0 GPIO."""
+    return Snapshot(IO_BANK0_BASE, {"GPIO": IO_BANK0_FIELDS["GPIO"]}, readonly=("STATUS",))
+
+def pads_bank0_pins():
+    """Pad configuration of every bank 0 GPIO."""
+    return Snapshot(PADS_BANK0_BASE, PADS_BANK0_FIELDS)
@@ -0,0 +1,242 @@
+#    Copyright 2023-25 Hessam Mehr
+
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+
+#        http://www.apache.org/licenses/LICENSE-2.0
+
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+
+"""
+SPI controllers, with bulk transfers by DMA.
+
+    bus = Spi(0, baudrate=20_000_000, sck=18, mosi=19, miso=16)
+    bus.write(frame)                # one DMA transfer for the whole frame
+    bus.write_readinto(cmd, resp)   # full duplex
+    bus.readinto(samples, 0xFF)
+"""
+
+from array import array
+from uctypes import BF_POS, BF_LEN, BFUINT32, UINT32, addressof, struct
+from .clkplan import spi_div
+from .dma import *
+from .gpio import GPIO_FUNC_SPI, io_bank0
+from .piodma import itemsize
+from .reg import Atomic, flatten, pack
+from .resets import RESETS_SPI, unreset
+
+SPI_BASE = [0x4003c000, 0x40040000]
+
+SSPCR0_FIELDS = {
+    "SCR": 8 << BF_POS | 8 << BF_LEN | BFUINT32, # Serial clock rate: clk_peri / (CPSDVSR * (1 + SCR))
+    "SPH": 7 << BF_POS | 1 << BF_LEN | BFUINT32, # Clock phase (Motorola format)
+    "SPO": 6 << BF_POS | 1 << BF_LEN | BFUINT32, # Clock polarity (Motorola format)
+    "FRF": 4 << BF_POS | 2 << BF_LEN | BFUINT32, # Frame format, see SPI_FRF_*
+    "DSS": 0 << BF_POS | 4 << BF_LEN | BFUINT32, # Data size select: bits per frame - 1 (3-15)
+}
+
+SSPCR1_FIELDS = {
+    "SOD": 3 << BF_POS | 1 << BF_LEN | BFUINT32, # Slave-mode output disable
+    "MS": 2 << BF_POS | 1 << BF_LEN | BFUINT32,  # 0 master, 1 slave
+    "SSE": 1 << BF_POS | 1 << BF_LEN | BFUINT32, # Port enable
+    "LBM": 0 << BF_POS | 1 << BF_LEN | BFUINT32, # Loopback
+}
+
+SSPSR_FIELDS = {
+    "BSY": 4 << BF_POS | 1 << BF_LEN | BFUINT32, # Busy sending/receiving a frame or TX FIFO not empty
+    "RFF": 3 << BF_POS | 1 << BF_LEN | BFUINT32, # Receive FIFO full
+    "RNE": 2 << BF_POS | 1 << BF_LEN | BFUINT32, # Receive FIFO not empty
+    "TNF": 1 << BF_POS | 1 << BF_LEN | BFUINT32, # Transmit FIFO not full
+    "TFE": 0 << BF_POS | 1 << BF_LEN | BFUINT32, # Transmit FIFO empty
+}
+
+# SSPIMSC, SSPRIS and SSPMIS
+SSP_INT_FIELDS = {
+    "TX": 3 << BF_POS | 1 << BF_LEN | BFUINT32,  # TX FIFO half empty or less
+    "RX": 2 << BF_POS | 1 << BF_LEN | BFUINT32,  # RX FIFO half full or more
+    "RT": 1 << BF_POS | 1 << BF_LEN | BFUINT32,  # Receive timeout
+    "ROR": 0 << BF_POS | 1 << BF_LEN | BFUINT32, # Receive overrun
+}
+
+SSPICR_FIELDS = {
+    "RTIC": 1 << BF_POS | 1 << BF_LEN | BFUINT32,
+    "RORIC": 0 << BF_POS | 1 << BF_LEN | BFUINT32,
+}
+
+SSPDMACR_FIELDS = {
+    "TXDMAE": 1 << BF_POS | 1 << BF_LEN | BFUINT32,
+    "RXDMAE": 0 << BF_POS | 1 << BF_LEN | BFUINT32,
+}
+
+SPI_FIELDS = {
+    "SSPCR0": (0x000, SSPCR0_FIELDS),
+    "SSPCR1": (0x004, SSPCR1_FIELDS),
+    "SSPDR": 0x008 | UINT32,
+    "SSPSR": (0x00C, SSPSR_FIELDS),
+    "SSPCPSR": 0x010 | UINT32,  # Clock prescale divisor, even, 2-254
+    "SSPIMSC": (0x014, SSP_INT_FIELDS),
+    "SSPRIS": (0x018, SSP_INT_FIELDS),
+    "SSPMIS": (0x01C, SSP_INT_FIELDS),
+    "SSPICR": (0x020, SSPICR_FIELDS),
+    "SSPDMACR": (0x024, SSPDMACR_FIELDS),
+}
+
+spis = [struct(addr, SPI_FIELDS) for addr in SPI_BASE]
+spis_atomic = [Atomic(addr, SPI_FIELDS) for addr in SPI_BASE]
+spis_words = [struct(addr, flatten(SPI_FIELDS)) for addr in SPI_BASE]
+
+SPI_FRF_MOTOROLA = const(0)
+SPI_FRF_TI = const(1)
+SPI_FRF_NATIONAL = const(2)
+
+_SSPCR1_SSE = const(0x2)
+_SSPICR_RORIC = const(0x1)
+
+def _nbytes(buf):
+    return len(memoryview(buf)) * itemsize(buf)
+
+class Spi:
+    """
+    SPI controller n as a Motorola-format bus master whose transfers are
+    done by a pair of DMA channels paced by the controller's TX and RX
+    DREQs. The RX channel always runs, into the read buffer or a discarded
+    sink word, so the RX FIFO never overruns and its completion marks the
+    end of the transfer. For reads, the TX channel repeats a single dummy
+    frame (INCR_READ=0). Both channels are claimed for the lifetime of the
+    object and their configurations are precomputed, so starting a
+    transfer costs ten register writes.
+
+    Frames of up to 8 bits are moved from bytes, 9 to 16 bits from
+    halfwords (e.g. array("H")). Pins given are switched to the SPI
+    function; chip select is left to the caller.
+
+    transfer() starts a transfer and returns at once; done() and wait()
+    follow it. The other methods block until their transfer completes.
+    """
+
+    def __init__(self, n, baudrate=1_000_000, bits=8, polarity=0, phase=0, sck=None, mosi=None, miso=None):
+        self.n = n
+        self.regs = spis[n]
+        self._words = spis_words[n]
+        unreset(RESETS_SPI[n])
+        for pin in (sck, mosi, miso):
+            if pin is not None:
+                io_bank0.GPIO[pin].CTRL.FUNCSEL = GPIO_FUNC_SPI
+        self._tx_ch = allocator.claim_channel(owner=self)
+        self._rx_ch = allocator.claim_channel(owner=self)
+        self._dummy = array("L", [0])
+        self._sink = array("L", [0])
+        self._refs = None
+        self.init(baudrate, bits, polarity, phase)
+
+    def init(self, baudrate=1_000_000, bits=8, polarity=0, phase=0):
+        """Reconfigure the bus; baudrate is rounded down to what is achievable."""
+        if not 4 <= bits <= 16:
+            raise ValueError("bits must be 4-16")
+        self.wait()
+        cpsdvsr, scr, self.baudrate, self.ppm = spi_div(baudrate)
+        self.bits = bits
+        w = self._words
+        w.SSPCR1 = 0
+        w.SSPCPSR = cpsdvsr
+        w.SSPCR0 = pack(SSPCR0_FIELDS, SCR=scr, SPH=phase, SPO=polarity, FRF=SPI_FRF_MOTOROLA, DSS=bits - 1)
+        w.SSPDMACR = pack(SSPDMACR_FIELDS, TXDMAE=1, RXDMAE=1)
+        w.SSPCR1 = _SSPCR1_SSE
+        self._size_log2 = 0 if bits <= 8 else 1
+        size = DMA_SIZE_BYTE if bits <= 8 else DMA_SIZE_HALFWORD
+        dr = SPI_BASE[self.n] + 0x008
+        self._tx = [DmaConfig(write_addr=dr, TREQ_SEL=DREQ_SPI0_TX + 2 * self.n, DATA_SIZE=size,
+                              INCR_READ=incr, INCR_WRITE=0) for incr in (0, 1)]
+        self._rx = [DmaConfig(read_addr=dr, TREQ_SEL=DREQ_SPI0_RX + 2 * self.n, DATA_SIZE=size,
+                              INCR_READ=0, INCR_WRITE=incr) for incr in (0, 1)]
+
+    def _count(self, buf):
+        return _nbytes(buf) >> self._size_log2
+
+    def _start(self, read_addr, incr_read, write_addr, incr_write, count, refs):
+        self.wait()
+        w = self._words
+        # Discard anything left over from machine.SPI or an aborted transfer
+        while self.regs.SSPSR.RNE:
+            w.SSPDR
+        w.SSPICR = _SSPICR_RORIC
+        rx = self._rx[incr_write]
+        rx.write_addr = write_addr
+        rx.trans_count = count
+        rx.apply(self._rx_ch, trigger=False)
+        tx = self._tx[incr_read]
+        tx.read_addr = read_addr
+        tx.trans_count = count
+        tx.apply(self._tx_ch, trigger=False)
+        self._refs = refs
+        dma_words.MULTI_CHAN_TRIGGER = 1 << self._rx_ch | 1 << self._tx_ch
+        return self
+
+    def transfer(self, wbuf=None, rbuf=None, write=0):
+        """
+        Start a transfer: wbuf out and rbuf in (full duplex, same length),
+        wbuf only (received frames are discarded) or rbuf only (write is sent
+        for every frame). Returns self.
+        """
+        if wbuf is not None and rbuf is not None:
+            count = self._count(wbuf)
+            if self._count(rbuf) != count:
+                raise ValueError("buffers differ in length")
+        elif wbuf is not None:
+            count = self._count(wbuf)
+        elif rbuf is not None:
+            count = self._count(rbuf)
+            self._dummy[0] = write
+        else:
+            raise ValueError("nothing to transfer")
+        if wbuf is not None:
+            read_addr, incr_read = addressof(wbuf), 1
+        else:
+            read_addr, incr_read = addressof(self._dummy), 0
+        if rbuf is not None:
+            write_addr, incr_write = addressof(rbuf), 1
+        else:
+            write_addr, incr_write = addressof(self._sink), 0
+        return self._start(read_addr, incr_read, write_addr, incr_write, count, (wbuf, rbuf))
+
+    def done(self):
+        if self._refs is not None and not dma.CH[self._rx_ch].CTRL_TRIG.BUSY:
+            self._refs = None
+        return self._refs is None
+
+    def wait(self):
+        while not self.done():
+            pass
+
+    def write(self, buf):
+        self.transfer(buf).wait()
+
+    def readinto(self, buf, write=0):
+        self.transfer(None, buf, write).wait()
+
+    def read(self, nbytes, write=0):
+        buf = bytearray(nbytes)
+        self.readinto(buf, write)
+        return buf
+
+    def write_readinto(self, wbuf, rbuf):
+        self.transfer(wbuf, rbuf).wait()
+
+    def abort(self):
+        if self._refs is not None:
+            dma_words.CHAN_ABORT = 1 << self._rx_ch | 1 << self._tx_ch
+            while dma_words.CHAN_ABORT:
+                pass
+            self._refs = None
+
+    def deinit(self):
+        self.abort()
+        self._words.SSPDMACR = 0
+        self._words.SSPCR1 = 0
+        for ch in (self._tx_ch, self._rx_ch):
+            allocator.unclaim_channel(ch)
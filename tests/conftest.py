@@ -0,0 +1,48 @@
+#    Copyright 2025 Hessam Mehr
+
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+
+#        http://www.apache.org/licenses/LICENSE-2.0
+
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+
+"""
+Host tests against the simulated register space: python -m pytest tests
+
+The checkout is imported as the rp2040hw package whatever its directory is
+called, and sim is installed before any register module is imported.
+"""
+
+import os
+import sys
+import types
+
+import pytest
+
+_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+if "rp2040hw" not in sys.modules:
+    package = types.ModuleType("rp2040hw")
+    package.__path__ = [_ROOT]
+    sys.modules["rp2040hw"] = package
+
+from rp2040hw import sim
+
+memory = sim.install()
+
+@pytest.fixture
+def mem():
+    """The simulated memory, with counts, trace and hooks cleared."""
+    memory.reset_counts()
+    memory.trace = None
+    memory.read_hooks.clear()
+    memory.write_hooks.clear()
+    yield memory
+    memory.read_hooks.clear()
+    memory.write_hooks.clear()
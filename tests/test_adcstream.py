@@ -0,0 +1,63 @@
+#    Copyright 2025 Hessam Mehr
+
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+
+#        http://www.apache.org/licenses/LICENSE-2.0
+
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+
+import pytest
+from uctypes import addressof
+
+from rp2040hw.adc import ADC_BASE
+from rp2040hw.adcstream import AdcStream
+from rp2040hw.dma import DMA_BASE, DMA_CH_STRIDE, DMA_CTRL_FIELDS, DREQ_ADC
+from rp2040hw.reg import field_mask, field_pos
+
+_CHAN_ABORT = DMA_BASE + 0x444
+
+def _field(word, name):
+    desc = DMA_CTRL_FIELDS[name]
+    return (word & field_mask(desc)) >> field_pos(desc)
+
+@pytest.fixture
+def stream(mem):
+    mem.hook(ADC_BASE, read=lambda a, v: v | 0x100)         # CS.READY
+    mem.hook(ADC_BASE + 0x08, read=lambda a, v: v | 0x100)  # FCS.EMPTY
+    mem.hook(_CHAN_ABORT, write=lambda a, v: 0)
+    s = AdcStream([2, 0], 10_000, block=64)
+    yield s
+    s.close()
+
+def test_ring_setup(mem, stream):
+    a, b = stream.buffers
+    assert len(a) == len(b) == 64
+    assert addressof(a) % 128 == 0 and addressof(b) == addressof(a) + 128
+    stream.start()
+    for i, ch in enumerate(stream.dma_ch):
+        base = DMA_BASE + ch * DMA_CH_STRIDE
+        assert mem.peek(base + 0x04) == addressof(stream.buffers[i])
+        assert mem.peek(base + 0x08) == 64
+        ctrl = mem.peek(base + 0x0C)
+        assert _field(ctrl, "CHAIN_TO") == stream.dma_ch[1 - i]
+        assert _field(ctrl, "TREQ_SEL") == DREQ_ADC
+        assert (_field(ctrl, "RING_SEL"), _field(ctrl, "RING_SIZE")) == (1, 7)
+        assert (_field(ctrl, "INCR_READ"), _field(ctrl, "INCR_WRITE")) == (0, 1)
+    assert stream.channels == [0, 2]
+
+def test_stop_disables_before_abort(mem, stream):
+    stream.start()
+    mem.trace = []
+    stream.stop()
+    writes = [addr for op, addr, _ in mem.trace if op == "w"]
+    abort = writes.index(_CHAN_ABORT)
+    for ch in stream.dma_ch:
+        al1_ctrl = DMA_BASE + ch * DMA_CH_STRIDE + 0x10
+        assert al1_ctrl in writes[:abort]
+        assert not _field(mem.peek(al1_ctrl), "EN")
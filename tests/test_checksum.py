@@ -0,0 +1,53 @@
+#    Copyright 2025 Hessam Mehr
+
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+
+#        http://www.apache.org/licenses/LICENSE-2.0
+
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+
+import binascii
+import zlib
+from array import array
+
+import pytest
+
+from rp2040hw import checksum
+
+CHECK = b"123456789"
+
+@pytest.mark.parametrize("name, value", [
+    ("crc32", 0xCBF43926),
+    ("crc32_mpeg2", 0x0376E6E7),
+    ("crc16", 0x29B1),
+    ("crc16_xmodem", 0x31C3),
+    ("crc16_kermit", 0x2189),
+    ("parity", 1),
+    ("sum32", 477),
+])
+def test_check_values(name, value):
+    assert checksum.new(name, CHECK, hw=False).intdigest() == value
+
+def test_matches_zlib_and_binascii():
+    data = bytes((i * 7919 + 13) & 0xFF for i in range(1000))
+    assert checksum.new("crc32", data, hw=False).intdigest() == zlib.crc32(data)
+    assert checksum.new("crc16_xmodem", data, hw=False).intdigest() == binascii.crc_hqx(data, 0)
+
+def test_split_updates_and_copy():
+    h = checksum.new("crc32", hw=False)
+    h.update(CHECK[:4])
+    partial = h.copy()
+    h.update(CHECK[4:])
+    assert h.hexdigest() == "cbf43926"
+    assert h.digest() == bytes.fromhex("cbf43926")
+    assert partial.intdigest() == zlib.crc32(CHECK[:4])
+
+def test_wide_items_are_fed_as_bytes():
+    words = array("H", [0x3231, 0x3433])
+    assert checksum.new("crc32", words, hw=False).intdigest() == zlib.crc32(b"1234")
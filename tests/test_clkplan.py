@@ -0,0 +1,85 @@
+#    Copyright 2025 Hessam Mehr
+
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+
+#        http://www.apache.org/licenses/LICENSE-2.0
+
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+
+import pytest
+
+from rp2040hw import clkplan
+
+def test_pio_div():
+    assert clkplan.pio_div(1_000_000, 125_000_000)[:3] == (125, 0, 1_000_000)
+    assert clkplan.pio_div(1.5e6, 125e6)[:2] == (83, 85)
+    assert clkplan.pio_div(125_000_000, 125_000_000)[:2] == (1, 0)
+    # INT=0 encodes a divider of 65536
+    assert clkplan.pio_div(1000, 65536 * 1000)[:2] == (0, 0)
+    with pytest.raises(ValueError):
+        clkplan.pio_div(250_000_000, 125_000_000)
+    with pytest.raises(ValueError):
+        clkplan.pio_div(1000, 125_000_000)
+
+def test_float_clocks_give_ints():
+    for fn, target in ((clkplan.pio_div, 1e6), (clkplan.pwm_div, 1e3), (clkplan.dma_timer, 3000.0),
+                       (clkplan.spi_div, 1e6), (clkplan.uart_div, 115200.0)):
+        result = fn(target, 125e6)
+        assert result == fn(target, 125_000_000)
+        assert all(isinstance(x, int) for x in result[:-2])
+
+def test_pwm_div():
+    # The smallest divider that fits TOP in 16 bits: 31/16
+    div_int, div_frac, top, freq, ppm = clkplan.pwm_div(1000, 125_000_000)
+    assert (div_int, div_frac, top) == (1, 15, 64515)
+    assert abs(ppm) < 10
+    assert clkplan.pwm_div(1000, 125_000_000, tolerance_ppm=0)[:3] == (2, 0, 62499)
+    assert clkplan.pwm_div(1000, 125_000_000, phase_correct=True)[3] == pytest.approx(1000, rel=1e-5)
+    with pytest.raises(ValueError):
+        clkplan.pwm_div(1, 125_000_000)
+
+def test_adc_div():
+    assert clkplan.adc_div(500_000)[:3] == (95, 0, 500_000)
+    assert clkplan.adc_div(1000, 65536 * 1000)[:2] == (65535, 0)
+    # DIV.INT is 16 bits: the longest period is 1 + 65535 + 255/256 clocks
+    assert clkplan.adc_div(256, 65536 * 256 + 255)[:2] == (65535, 255)
+    with pytest.raises(ValueError):
+        clkplan.adc_div(256, 65536 * 256 + 256)
+    with pytest.raises(ValueError):
+        clkplan.adc_div(600_000)
+
+def test_dma_timer():
+    x, y, freq, ppm = clkplan.dma_timer(3000, 125_000_000)
+    assert (x, y) == (1, 41667)
+    assert abs(ppm) < 10
+    assert clkplan.dma_timer(125_000_000 // 4, 125_000_000)[:2] == (1, 4)
+    with pytest.raises(ValueError):
+        clkplan.dma_timer(1000, 125_000_000)
+
+def test_best_rational():
+    assert clkplan.best_rational(355, 113, 1000) == (355, 113)
+    h, k = clkplan.best_rational(314159, 100000, 200)
+    # Numerator and denominator are both limited
+    best = min((abs(314159 * k - 100000 * h) / k, h, k) for k in range(1, 201)
+               for h in range(314159 * k // 100000, 314159 * k // 100000 + 2) if h <= 200)
+    assert (h, k) == best[1:] == (179, 57)
+
+def test_spi_div():
+    cpsdvsr, scr, freq, ppm = clkplan.spi_div(10_000_000, 125_000_000)
+    assert freq <= 10_000_000 and cpsdvsr % 2 == 0
+    assert freq == 125_000_000 / (cpsdvsr * (scr + 1))
+    assert clkplan.spi_div(62_500_000, 125_000_000)[:2] == (2, 0)
+    with pytest.raises(ValueError):
+        clkplan.spi_div(1000, 125_000_000)
+
+def test_uart_div():
+    # The datasheet's worked example (4.2.7.1)
+    assert clkplan.uart_div(115200, 125_000_000)[:2] == (67, 52)
+    with pytest.raises(ValueError):
+        clkplan.uart_div(10_000_000, 125_000_000)
@@ -0,0 +1,92 @@
+#    Copyright 2025 Hessam Mehr
+
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+
+#        http://www.apache.org/licenses/LICENSE-2.0
+
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+
+import pytest
+
+from rp2040hw import dma
+from rp2040hw.dma import DmaAllocator, DmaConfig, DMA_NUM_CHANNELS
+
+class RuntimeDMA:
+    """rp2.DMA as far as the allocator uses it: lowest free channel first."""
+
+    held = 0
+
+    def __init__(self):
+        free = ~RuntimeDMA.held & ((1 << DMA_NUM_CHANNELS) - 1)
+        if not free:
+            raise OSError(16)
+        self.channel = (free & -free).bit_length() - 1
+        RuntimeDMA.held |= 1 << self.channel
+
+    def close(self):
+        RuntimeDMA.held &= ~(1 << self.channel)
+
+@pytest.fixture
+def runtime(monkeypatch):
+    RuntimeDMA.held = 0b11     # the runtime's own channels
+    monkeypatch.setattr(dma, "_RuntimeDMA", RuntimeDMA)
+    return RuntimeDMA
+
+def test_claim_specific_channel_through_runtime(runtime):
+    alloc = DmaAllocator()
+    assert alloc.claim_channel(5) == 5
+    assert runtime.held == 0b100011
+    assert alloc.runtime(5).channel == 5
+    assert alloc.claim_channel() == 2
+    alloc.unclaim_channel(5)
+    assert runtime.held == 0b111
+
+def test_claim_runtime_channel_refused(runtime):
+    alloc = DmaAllocator()
+    with pytest.raises(OSError):
+        alloc.claim_channel(1)
+    assert runtime.held == 0b11
+    assert not alloc.is_claimed(1)
+
+def test_reserved_channels_go_back_to_runtime(runtime):
+    alloc = DmaAllocator(reserved=0b11100)
+    assert alloc.claim_channel() == 5
+    assert runtime.held == 0b100011
+    assert alloc.runtime(2) is None
+
+def test_runtime_exhausted(runtime):
+    alloc = DmaAllocator(reserved=0b111111111100)
+    with pytest.raises(OSError):
+        alloc.claim_channel()
+    assert runtime.held == 0b11
+    assert alloc._runtime == {}
+
+def test_claim_out_of_range(runtime):
+    alloc = DmaAllocator()
+    for ch in (-1, DMA_NUM_CHANNELS):
+        with pytest.raises(ValueError):
+            alloc.claim_channel(ch)
+    assert alloc.channels == 0 and runtime.held == 0b11
+
+def test_route_irq_checks_line_first(mem):
+    alloc = DmaAllocator()
+    ch = alloc.claim_channel(3)
+    with pytest.raises(ValueError):
+        alloc.route_irq(ch, 2)
+    assert mem.writes == 0
+    alloc.route_irq(ch, 1)
+    assert alloc.irq_mask == [0, 1 << 3]
+
+def test_rearm_single_store(mem):
+    config = DmaConfig(read_addr=0x20000000, write_addr=0x40014004, trans_count=1000)
+    config.apply(4)
+    mem.reset_counts()
+    config.rearm(4)
+    assert (mem.reads, mem.writes) == (0, 1)
+    assert mem.peek(dma.DMA_BASE + 4 * dma.DMA_CH_STRIDE + 0x08) == 1000
@@ -0,0 +1,112 @@
+#    Copyright 2025 Hessam Mehr
+
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+
+#        http://www.apache.org/licenses/LICENSE-2.0
+
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+
+"""
+The interpolator configurations written on the rp2 port, run through a model
+of the lane datapath (datasheet 2.3.1.6), must agree with the Python fallback.
+"""
+
+from array import array
+
+import pytest
+
+from rp2040hw import interp
+from rp2040hw.sio import sio
+
+def _signed(x):
+    x &= 0xFFFFFFFF
+    return x - (1 << 32) if x & 0x80000000 else x
+
+def _lane0(n, accum):
+    """PEEK_LANE0 of interpolator n as the hardware computes it."""
+    regs = sio.INTERP[n]
+    ctrl = regs.CTRL_LANE0
+    x = (accum & 0xFFFFFFFF) >> ctrl.SHIFT
+    x &= (2 << ctrl.MASK_MSB) - (1 << ctrl.MASK_LSB)
+    if ctrl.SIGNED and x >> ctrl.MASK_MSB & 1:
+        x |= -(1 << ctrl.MASK_MSB) & 0xFFFFFFFF
+    if ctrl.CLAMP:
+        lo, hi = regs.BASE0, regs.BASE1
+        if ctrl.SIGNED:
+            x, lo, hi = _signed(x), _signed(lo), _signed(hi)
+        x = min(max(x, lo), hi)
+    return x
+
+def _blend_lane1(a, b, alpha):
+    """PEEK_LANE1 of interpolator 0 in blend mode."""
+    regs = sio.INTERP[0]
+    ctrl = regs.CTRL_LANE1
+    t = (alpha & 0xFFFFFFFF) >> ctrl.SHIFT & (2 << ctrl.MASK_MSB) - (1 << ctrl.MASK_LSB)
+    if ctrl.SIGNED:
+        a, b = _signed(a), _signed(b)
+    return (a + ((b - a) * (t & 0xFF) >> 8)) & 0xFFFFFFFF
+
+def _clamp_hw(src, lo, hi, shift, signed):
+    interp._configure(1, interp._clamp_lane(shift, signed), {},
+                      base0=lo & 0xFFFFFFFF, base1=hi & 0xFFFFFFFF)
+    return [_signed(_lane0(1, x)) if signed else _lane0(1, x) for x in src]
+
+@pytest.mark.parametrize("shift", [0, 1, 4, 8, 15])
+def test_clamp_signed(mem, shift):
+    src = array("i", [-1 << 20, -70000, -300, -129, -128, -1, 0, 1, 127, 128, 300, 70000, 1 << 20])
+    out = array("i", [0] * len(src))
+    interp.clamp(out, src, -128, 127, shift, signed=True)
+    assert list(out) == _clamp_hw(src, -128, 127, shift, True)
+
+@pytest.mark.parametrize("shift", [0, 3, 12])
+def test_clamp_unsigned(mem, shift):
+    src = array("I", [0, 1, 255, 256, 4095, 4096, 1 << 20, 0xFFFFFFFF])
+    out = array("I", [0] * len(src))
+    interp.clamp(out, src, 0, 255, shift)
+    assert list(out) == _clamp_hw(src, 0, 255, shift, False)
+
+def _lookup_hw(src, shift, bits, lsl):
+    lane, pre = interp._lookup_lane(shift, bits, lsl)
+    interp._configure(0, lane, {})
+    # Lane 0 yields BASE0 + (index << lsl); the kernel feeds it src << pre
+    return [_lane0(0, x << pre & 0xFFFFFFFF) >> lsl for x in src]
+
+def test_lookup(mem):
+    src = bytes(range(0, 256, 7))
+    lut = bytes(255 - i for i in range(16))
+    out = bytearray(len(src))
+    interp.lookup(out, src, lut, shift=4, bits=4)
+    assert list(out) == [lut[i] for i in _lookup_hw(src, 4, 4, 0)]
+
+@pytest.mark.parametrize("shift", [0, 1, 28])
+def test_lookup_words(mem, shift):
+    # A word table indexed from the top of a 32-bit source: shifting src up
+    # by lsl = 2 first would drop the two index bits at the top
+    src = array("I", [0, 0x12345678, 0x9ABCDEF0, 0xFFFFFFFF, 0x7FFFFFFF, 0xC0000001])
+    lut = array("I", [i * 0x01010101 for i in range(16)])
+    out = array("I", [0] * len(src))
+    interp.lookup(out, src, lut, shift=shift, bits=4)
+    assert list(out) == [lut[i] for i in _lookup_hw(src, shift, 4, 2)]
+
+def test_lookup_index_too_wide(mem):
+    with pytest.raises(ValueError):
+        interp._lookup_lane(0, 31, 2)
+
+@pytest.mark.parametrize("signed", [False, True])
+def test_blend(mem, signed):
+    a = array("h" if signed else "H", [0, 100, -300 if signed else 300, 1000, 32767])
+    b = array("h" if signed else "H", [255, -100 if signed else 7, 300, 0, 0])
+    alphas = bytes([0, 1, 128, 200, 255])
+    out = array(a.typecode, [0] * len(a))
+    interp.blend(out, a, b, alphas, signed)
+    # The lane setup blend() writes, with BASE0/BASE1/ACCUM1 fed per element
+    interp._configure(0, {"BLEND": 1}, {"MASK_MSB": 7, "SIGNED": signed})
+    expected = [_blend_lane1(x & 0xFFFFFFFF, y & 0xFFFFFFFF, t) for x, y, t in zip(a, b, alphas)]
+    bits = 8 * out.itemsize
+    assert [x & (1 << bits) - 1 for x in out] == [x & (1 << bits) - 1 for x in expected]
@@ -0,0 +1,114 @@
+#    Copyright 2025 Hessam Mehr
+
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+
+#        http://www.apache.org/licenses/LICENSE-2.0
+
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+
+import pytest
+
+from rp2040hw.dma import DMA_BASE, DMA_CH_STRIDE
+from rp2040hw.logic import LogicAnalyzer
+from rp2040hw.pio import PIO_BASE, state_machines
+
+_CHAN_ABORT = DMA_BASE + 0x444
+
+class FakeDma:
+    """Stands in for the DMA channel: the test decides how far it has got."""
+
+    def __init__(self, mem, la):
+        self.written = 0
+        mem.hook(_CHAN_ABORT, write=lambda a, v: 0)
+        mem.hook(DMA_BASE + DMA_CH_STRIDE * la.dma_ch + 0x08,
+                 read=lambda a, v: 0xFFFFFFFF - self.written)
+
+@pytest.fixture
+def la(mem):
+    la = LogicAnalyzer(pin_base=0, pin_count=4, depth=16, runs=64)
+    yield la
+    la.close()
+
+def _arm(mem, la, **kw):
+    la.arm(**kw)
+    return FakeDma(mem, la)
+
+def test_encodes_while_draining(mem, la):
+    dma = _arm(mem, la, pre=0, post=32 * 8)
+    # Words of eight 4-bit samples, bit k*4 holding sample k
+    for w in range(32):
+        la.ring[w % 16] = 0x11110000 if w % 2 else 0x22222222
+        dma.written = w + 1
+        assert not la.poll() or w == 31
+    cap = la.result
+    assert not cap.truncated
+    assert len(cap) == 32 * 8
+    assert list(cap.samples())[:24] == [2] * 8 + [0] * 4 + [1] * 4 + [2] * 8
+
+def test_long_runs_split(mem, la):
+    dma = _arm(mem, la, pre=0, post=8 * 9000)
+    for w in range(9000):
+        la.ring[w % 16] = 0x33333333
+        dma.written = w + 1
+        la.poll()
+    cap = la.result
+    assert list(cap.runs) == [65535, 72000 - 65535]
+    assert list(cap.values) == [3, 3]
+    assert len(cap) == 72000 and not cap.truncated
+
+def test_run_buffer_full(mem):
+    la = LogicAnalyzer(pin_base=0, pin_count=4, depth=16, runs=8)
+    dma = _arm(mem, la, pre=0, post=8 * 16)
+    for w in range(16):
+        la.ring[w] = 0x10101010 if w % 2 else 0x01010101
+    dma.written = 16
+    assert la.poll()
+    cap = la.result
+    assert cap.truncated
+    assert list(cap.values) == [1, 0, 1, 0, 1, 0, 1, 0]
+    assert list(cap.runs) == [1] * 7 + [2]
+    la.close()
+
+def test_lapped_by_dma(mem, la):
+    dma = _arm(mem, la, pre=0, post=8 * 64)
+    dma.written = 17
+    assert la.poll()
+    assert la.result.truncated and len(la.result) == 0
+
+def test_claims_spare_state_machines(mem):
+    mem.poke(PIO_BASE[0], 0b0101)   # SM0 and SM2 of PIO0 running
+    a = LogicAnalyzer(pin_base=0, pin_count=4, depth=16)
+    b = LogicAnalyzer(pin_base=4, pin_count=4, depth=16)
+    try:
+        assert (a.pio, a.sm, a.trigger_sm) == (0, 1, 3)
+        assert (b.pio, b.sm, b.trigger_sm) == (1, 0, 1)
+        assert state_machines.owner(0, 3) is a
+    finally:
+        a.close()
+        b.close()
+        mem.poke(PIO_BASE[0], 0)
+    assert not state_machines.sms
+
+def test_trigger(mem, la):
+    irq = PIO_BASE[la.pio] + 0x030
+    mem.hook(irq, write=lambda a, v: mem.peek(a) & ~v)
+    dma = _arm(mem, la, pattern=5, pre=16, post=16)
+    la.ring[0] = la.ring[1] = 0
+    la.ring[2] = 0x55500000
+    dma.written = 3
+    assert not la.poll()            # pre satisfied
+    assert not la.poll()            # armed, no trigger yet
+    mem.poke(irq, 1)
+    assert not la.poll()            # trigger noticed after word 2
+    la.ring[3] = la.ring[4] = 0x55555555
+    dma.written = 5
+    assert la.poll()
+    cap = la.result
+    assert cap.trigger == 8 + 5
+    assert list(cap.values) == [0, 5] and list(cap.runs) == [13, 19]
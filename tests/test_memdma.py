@@ -0,0 +1,78 @@
+#    Copyright 2025 Hessam Mehr
+
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+
+#        http://www.apache.org/licenses/LICENSE-2.0
+
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+
+from array import array
+
+import pytest
+from uctypes import addressof
+
+from rp2040hw import memdma
+from rp2040hw.dma import DMA_BASE, DMA_CH_STRIDE, allocator
+
+def _channel_regs(mem, ch):
+    base = DMA_BASE + ch * DMA_CH_STRIDE
+    return mem.peek(base), mem.peek(base + 0x04), mem.peek(base + 0x08)
+
+def test_small_copy_by_cpu(mem):
+    src = bytearray(b"0123456789")
+    dst = bytearray(16)
+    t = memdma.copy(dst, src)
+    assert t.done() and mem.writes == 0
+    assert dst == b"0123456789" + bytes(6)
+
+def test_copy_splits_head_body_tail(mem):
+    src = bytearray(range(100))
+    dst = bytearray(100)
+    # 3 bytes up to alignment and 3 trailing bytes by the CPU, 92 by word transfers
+    t = memdma.copy(memoryview(dst)[1:99], memoryview(src)[1:99])
+    ch = t.ch
+    read, write, count = _channel_regs(mem, ch)
+    assert (write - addressof(dst), read - addressof(src), count) == (4, 4, 23)
+    assert dst[1:4] == src[1:4] and dst[96:99] == src[96:99]
+    t.wait()
+    assert not allocator.is_claimed(ch)
+
+def test_copy_bounds(mem):
+    with pytest.raises(ValueError):
+        memdma.copy(bytearray(8), bytearray(16))
+    with pytest.raises(ValueError):
+        memdma.copy(bytearray(64), bytearray(8), 32)
+    with pytest.raises(ValueError):
+        memdma.copy(bytearray(8), bytearray(64), 32)
+    assert mem.writes == 0
+
+def test_fill(mem):
+    buf = bytearray(10)
+    memdma.fill(buf, 0xBEEF, 2)
+    assert buf == bytes.fromhex("efbe") * 5
+    words = array("I", [0] * 4)
+    memdma.fill(words, 0x5A, nbytes=6)
+    assert list(words) == [0x5A5A5A5A, 0x5A5A, 0, 0]
+
+def test_fill_body_source_word(mem):
+    buf = bytearray(67)
+    t = memdma.fill(memoryview(buf)[1:], 0x11223344, 4)
+    read, write, count = _channel_regs(mem, t.ch)
+    assert (write - addressof(buf), count) == (4, 15)
+    # The pattern as it falls at the first aligned address, after 3 head bytes
+    assert mem.read(read) == 0x22334411
+    assert buf[1:4] == bytes([0x44, 0x33, 0x22]) and buf[64:] == bytes([0x11, 0x44, 0x33])
+    t.wait()
+
+def test_fill_bounds(mem):
+    with pytest.raises(ValueError):
+        memdma.fill(bytearray(8), 0, nbytes=9)
+    with pytest.raises(ValueError):
+        memdma.fill(bytearray(8), 0, size=3)
+    assert mem.writes == 0
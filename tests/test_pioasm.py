@@ -0,0 +1,87 @@
+#    Copyright 2025 Hessam Mehr
+
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+
+#        http://www.apache.org/licenses/LICENSE-2.0
+
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+
+import pytest
+
+from rp2040hw.pioasm import assemble
+
+@pytest.mark.parametrize("source, code", [
+    ("in pins, 1", 0x4001),
+    ("in null, 32", 0x4060),
+    ("out pins, 1", 0x6001),
+    ("out exec, 16", 0x60F0),
+    ("jmp x-- 3", 0x0043),
+    ("jmp pin 7", 0x00C7),
+    ("set pins, 1", 0xE001),
+    ("set pindirs, 1", 0xE081),
+    ("pull block", 0x80A0),
+    ("pull noblock", 0x8080),
+    ("pull ifempty block", 0x80E0),
+    ("push block", 0x8020),
+    ("push iffull noblock", 0x8040),
+    ("mov x, osr", 0xA027),
+    ("mov isr, null", 0xA0C3),
+    ("mov x, !x", 0xA029),
+    ("mov pins, ::x", 0xA011),
+    ("nop", 0xA042),
+    ("wait 1 gpio 5", 0x2085),
+    ("wait 0 pin 2", 0x2022),
+    ("wait 1 irq 3 rel", 0x20D3),
+    ("irq 0", 0xC000),
+    ("irq wait 1", 0xC021),
+    ("irq clear 2", 0xC042),
+    ("irq nowait 0 rel", 0xC010),
+    ("set x, 31 [7]", 0xE73F),
+])
+def test_encoding(source, code):
+    assert list(assemble(source).instructions) == [code]
+
+WS2812 = """
+.program ws2812
+.side_set 1
+.define public T1 2
+.define public T2 5
+.define public T3 3
+.wrap_target
+bitloop:
+    out x, 1       side 0 [T3 - 1]
+    jmp !x do_zero side 1 [T1 - 1]
+do_one:
+    jmp  bitloop   side 1 [T2 - 1]
+do_zero:
+    nop            side 0 [T2 - 1]
+.wrap
+"""
+
+def test_program_matches_pioasm():
+    # As generated by pioasm for the pico-examples ws2812 program
+    program = assemble(WS2812.replace("T3 - 1", "2").replace("T1 - 1", "1").replace("T2 - 1", "4"))
+    assert list(program.instructions) == [0x6221, 0x1123, 0x1400, 0xA442]
+    assert (program.wrap_target, program.wrap, program.sideset) == (0, 3, 1)
+    assert program.jmps == (1, 2)
+    assert list(program.relocated(10)) == [0x6221, 0x112D, 0x140A, 0xA442]
+
+def test_optional_sideset():
+    program = assemble(".side_set 1 opt\nnop side 1\nnop [3]")
+    assert list(program.instructions) == [0xB842, 0xA342]
+
+@pytest.mark.parametrize("source", [
+    "bogus x",
+    ".side_set 1\nnop",
+    ".side_set 2\nnop side 1 [8]",
+    "\n".join(["nop"] * 33),
+])
+def test_errors(source):
+    with pytest.raises(ValueError):
+        assemble(source)
@@ -0,0 +1,28 @@
+#    Copyright 2025 Hessam Mehr
+
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+
+#        http://www.apache.org/licenses/LICENSE-2.0
+
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+
+from array import array
+
+from rp2040hw import pwmwave
+
+def test_csr_masks():
+    assert (pwmwave._CSR_PH_CORRECT, pwmwave._CSR_PH_RET, pwmwave._CSR_PH_ADV) == (0x02, 0x40, 0x80)
+
+def test_pack_samples():
+    out = array("I", [0] * 3)
+    pwmwave.pack_samples(out, bytes([0, 128, 255]), bytes([255, 0, 64]), top=999, bits=8)
+    assert [(x >> 16, x & 0xFFFF) for x in out] == [(996, 0), (0, 500), (250, 996)]
+    pwmwave.pack_samples(out, array("H", [0, 0x8000, 0xFFFF]), b_level=7)
+    # At most TOP for full-scale samples
+    assert [(x >> 16, x & 0xFFFF) for x in out] == [(7, 0), (7, 0x8000), (7, 0xFFFF)]
@@ -0,0 +1,72 @@
+#    Copyright 2025 Hessam Mehr
+
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+
+#        http://www.apache.org/licenses/LICENSE-2.0
+
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+
+import pytest
+
+from rp2040hw.dma import DMA_BASE, DMA_CHANNEL_FIELDS, DMA_TRIGGER_REGS
+from rp2040hw.reg import Shadow, set_bits, clr_bits, xor_bits
+
+_PWM_EN = 0x400500A0
+_CH = DMA_BASE + 6 * 0x40
+
+def test_atomic_bit_helpers(mem):
+    mem.trace = []
+    set_bits(_PWM_EN, 0b0110)
+    clr_bits(_PWM_EN, 0b0100)
+    xor_bits(_PWM_EN, 0b0011)
+    assert [(op, addr) for op, addr, _ in mem.trace] == [
+        ("w", _PWM_EN + 0x2000), ("w", _PWM_EN + 0x3000), ("w", _PWM_EN + 0x1000)]
+    assert mem.peek(_PWM_EN) == 0b0001
+
+def test_shadow_flush_order(mem):
+    mem.poke(_CH + 0xC, 0x3F << 15)
+    mem.trace = []
+    with Shadow(_CH, DMA_CHANNEL_FIELDS, late=DMA_TRIGGER_REGS) as ch:
+        ch.CTRL_TRIG.EN = 1
+        ch.TRANS_COUNT = 4
+        ch.WRITE_ADDR = 0x20001000
+        ch.CTRL_TRIG.DATA_SIZE = 2
+        ch.READ_ADDR = 0x20000000
+        ch.TRANS_COUNT = 8
+        assert mem.trace == [("r", _CH + 0xC, 0x3F << 15)]
+    # Every register once, in address order, the trigger register last
+    assert mem.trace[1:] == [
+        ("w", _CH + 0x0, 0x20000000), ("w", _CH + 0x4, 0x20001000),
+        ("w", _CH + 0x8, 8), ("w", _CH + 0xC, 0x3F << 15 | 2 << 2 | 1)]
+
+def test_shadow_late_after_higher_addresses(mem):
+    mem.trace = []
+    with Shadow(_CH, DMA_CHANNEL_FIELDS, late=DMA_TRIGGER_REGS, zero=True) as ch:
+        ch.CTRL_TRIG.EN = 1
+        ch.ALIAS1.CTRL.IRQ_QUIET = 1
+    assert [addr for _, addr, _ in mem.trace] == [_CH + 0x10, _CH + 0xC]
+
+def test_shadow_discards_on_exception(mem):
+    mem.trace = []
+    with pytest.raises(RuntimeError):
+        with Shadow(_CH, DMA_CHANNEL_FIELDS, late=DMA_TRIGGER_REGS) as ch:
+            ch.READ_ADDR = 0x20000000
+            ch.CTRL_TRIG.EN = 1
+            raise RuntimeError
+    assert [op for op, _, _ in mem.trace] == ["r"]
+
+def test_shadow_zero(mem):
+    mem.poke(_CH + 0xC, 0xFFFF0000)
+    mem.trace = []
+    with Shadow(_CH, DMA_CHANNEL_FIELDS, zero=True) as ch:
+        ch.CTRL_TRIG.DATA_SIZE = 1
+        ch.CTRL_TRIG.EN = 1
+        assert ch.CTRL_TRIG.TREQ_SEL == 0
+    # No reads, and untouched bits start out as 0
+    assert mem.trace == [("w", _CH + 0xC, 1 << 2 | 1)]
@@ -0,0 +1,36 @@
+#    Copyright 2025 Hessam Mehr
+
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+
+#        http://www.apache.org/licenses/LICENSE-2.0
+
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+
+from rp2040hw.sio import SIO_BASE, fifo
+
+_FIFO_ST = SIO_BASE + 0x50
+
+def test_fifo_errors_write_one_to_clear(mem):
+    written = []
+
+    def write(addr, value):
+        # W1C sticky bits, read-only status bits
+        written.append(value)
+        return mem.peek(addr) & ~value & 0b1100 | mem.peek(addr) & 0b11
+
+    mem.hook(_FIFO_ST, write=write)
+    mem.poke(_FIFO_ST, 0b1110)
+    assert fifo.errors() == (1, 1)
+    assert written == [0b1100]
+    assert mem.peek(_FIFO_ST) == 0b0010
+    assert fifo.errors() == (0, 0)
+    assert written == [0b1100]
+    mem.poke(_FIFO_ST, 0b0101)
+    assert fifo.errors() == (0, 1)
+    assert written == [0b1100, 0b0100]
@@ -0,0 +1,33 @@
+#    Copyright 2025 Hessam Mehr
+
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+
+#        http://www.apache.org/licenses/LICENSE-2.0
+
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+
+from rp2040hw import snapshot
+from rp2040hw.dma import DMA_BASE, DMA_CH_STRIDE, DmaConfig
+
+def test_dma_channel_restores_reload_count(mem):
+    ch = 5
+    base = DMA_BASE + ch * DMA_CH_STRIDE
+    tcr = DMA_BASE + 0x800 + ch * DMA_CH_STRIDE + 0x04
+    # Writing TRANS_COUNT sets the reload value
+    mem.hook(base + 0x08, write=lambda a, v: mem.poke(tcr, v))
+    DmaConfig(read_addr=0x20000000, write_addr=0x20001000, trans_count=1000).apply(ch, trigger=False)
+    mem.poke(base + 0x08, 400)      # part way through
+    snap = snapshot.dma_channel(ch).capture()
+    DmaConfig(trans_count=16, INCR_WRITE=1).apply(ch, trigger=False)
+    mem.trace = []
+    snap.restore()
+    assert mem.peek(tcr) == 1000
+    writes = [(addr, value) for op, addr, value in mem.trace if op == "w"]
+    assert (base + 0x08, 1000) in writes
+    assert writes[-1][0] == base + 0x10   # CTRL through AL1_CTRL, last
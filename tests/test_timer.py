@@ -0,0 +1,116 @@
+#    Copyright 2025 Hessam Mehr
+
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+
+#        http://www.apache.org/licenses/LICENSE-2.0
+
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+
+import random
+
+import pytest
+
+from rp2040hw import timer
+from rp2040hw.timer import AlarmScheduler, TIMER_BASE
+
+class Clock:
+    """The timer's free-running count and the alarm compare, driven by the test."""
+
+    def __init__(self, mem, now):
+        self.now = now
+        mem.hook(TIMER_BASE + 0x28, read=lambda a, v: self.now & 0xFFFFFFFF)
+        mem.hook(TIMER_BASE + 0x34, read=self._intr)
+        self.mem = mem
+
+    def _intr(self, addr, value):
+        bits = 0
+        for n in range(4):
+            if (self.now - self.mem.peek(TIMER_BASE + 0x10 + 4 * n)) & 0xFFFFFFFF < 0x80000000:
+                bits |= 1 << n
+        return bits
+
+@pytest.fixture
+def sched(mem):
+    s = AlarmScheduler(capacity=32, latency=8)
+    yield s
+    s.close()
+
+def _run(sched, clock, until, step=7):
+    while clock.now < until:
+        clock.now += step
+        sched.service()
+
+@pytest.mark.parametrize("start", [1000, (1 << 30) - 500])
+def test_deadline_order(mem, sched, start):
+    clock = Clock(mem, start)
+    rng = random.Random(start)
+    delays = [rng.randrange(1, 1000) for _ in range(32)]
+    fired = []
+    handles = [sched.call_after(d, fired.append, i) for i, d in enumerate(delays)]
+    cancelled = set(range(0, 32, 5))
+    for i in cancelled:
+        assert sched.cancel(handles[i])
+    assert sched.pending() == 32 - len(cancelled)
+    _run(sched, clock, start + 1000)
+    expected = sorted((d, i) for i, d in enumerate(delays) if i not in cancelled)
+    assert [delays[i] for i in fired] == [d for d, _ in expected]
+    assert sched.pending() == 0
+    assert not sched.cancel(handles[1])
+
+def test_periodic_does_not_drift(mem, sched):
+    clock = Clock(mem, 0)
+    times = []
+    sched.call_every(100, lambda _: times.append(clock.now))
+    _run(sched, clock, 1000, step=30)
+    # Deadlines 100, 200, ... each seen at the first step at or after it
+    assert times == [-(-t // 30) * 30 for t in range(100, 1001, 100)]
+
+def test_periodic_overruns(mem, sched):
+    clock = Clock(mem, 0)
+    runs = []
+    sched.call_every(100, runs.append, "tick")
+    clock.now = 350
+    sched.service()
+    assert runs == ["tick"] and sched.overruns == 2
+    clock.now = 400
+    sched.service()
+    assert len(runs) == 2
+
+def test_callback_cancels_itself(mem, sched):
+    clock = Clock(mem, 0)
+    runs = []
+
+    def once(_):
+        runs.append(clock.now)
+        sched.cancel(h)
+
+    h = sched.call_every(50, once)
+    _run(sched, clock, 500, step=10)
+    assert runs == [50]
+
+def test_capacity(mem):
+    Clock(mem, 0)
+    s = AlarmScheduler(capacity=2)
+    try:
+        s.call_after(10, print)
+        s.call_after(20, print)
+        with pytest.raises(OSError):
+            s.call_after(30, print)
+    finally:
+        s.close()
+
+def test_alarms_claimed_once(mem):
+    a = AlarmScheduler()
+    try:
+        with pytest.raises(ValueError):
+            AlarmScheduler(alarm=a.alarm)
+        with pytest.raises(ValueError):
+            timer.claim_alarm(2)    # used by MicroPython's soft timers
+    finally:
+        a.close()
@@ -0,0 +1,90 @@
+#    Copyright 2025 Hessam Mehr
+
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+
+#        http://www.apache.org/licenses/LICENSE-2.0
+
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+
+import pytest
+from uctypes import addressof
+
+from rp2040hw.dma import DMA_BASE, DMA_CH_STRIDE
+from rp2040hw.uart import Uart
+
+_CHAN_ABORT = DMA_BASE + 0x444
+_RESET_DONE = 0x4000C008
+
+class Line:
+    """Plays the RX DMA channel: bytes land in the ring and move WRITE_ADDR."""
+
+    def __init__(self, mem, uart):
+        self.mem = mem
+        self.uart = uart
+        self.base = DMA_BASE + uart.dma_ch * DMA_CH_STRIDE
+        self.written = 0
+
+    def receive(self, data):
+        u = self.uart
+        for b in data:
+            u.ring[self.written % u.size] = b
+            self.written += 1
+        self.mem.poke(self.base + 0x04, addressof(u.ring) + self.written % u.size)
+        self.mem.poke(self.base + 0x08, 0xFFFFFFFF - self.written)
+
+@pytest.fixture
+def uart(mem):
+    mem.hook(_CHAN_ABORT, write=lambda a, v: 0)
+    mem.hook(_RESET_DONE, read=lambda a, v: 0x1FFFFFF)
+    u = Uart(1, 115200, ring=16)
+    yield u, Line(mem, u)
+    u.deinit()
+
+def test_ring_is_aligned(uart):
+    u, _ = uart
+    assert addressof(u.ring) % u.size == 0
+
+def test_views_and_consume(uart):
+    u, line = uart
+    line.receive(b"hello")
+    first, second = u.views()
+    assert bytes(first) == b"hello" and not second
+    u.consume(2)
+    assert u.any() == 3
+    assert u.read() == b"llo"
+    assert u.any() == 0
+
+def test_views_wrap(uart):
+    u, line = uart
+    line.receive(b"x" * 12)
+    u.consume(12)
+    line.receive(b"abcdefgh")
+    first, second = u.views()
+    assert (bytes(first), bytes(second)) == (b"abcd", b"efgh")
+    buf = bytearray(6)
+    assert u.readinto(buf) == 6 and buf == b"abcdef"
+    assert u.read() == b"gh"
+
+def test_overrun_keeps_latest_ring(uart):
+    u, line = uart
+    line.receive(bytes(range(20)))
+    assert u.any() == 16
+    assert u.overruns == 1
+    assert u.read() == bytes(range(4, 20))
+    line.receive(b"ok")
+    assert u.read() == b"ok"
+    assert u.overruns == 1
+
+def test_repeated_overruns_are_counted(uart):
+    u, line = uart
+    for _ in range(3):
+        line.receive(bytes(40))
+        u.any()
+    assert u.overruns == 3
+    assert u.any() == 16
@@ -0,0 +1,355 @@
+#    Copyright 2025 Hessam Mehr
+
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+
+#        http://www.apache.org/licenses/LICENSE-2.0
+
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+
+"""
+The 64-bit microsecond timer and an alarm scheduler on top of it.
+
+    sched = timer.AlarmScheduler(latency=256)
+    sched.call_every(1000, control_step)
+    sched.call_after(250, lambda _: pin.toggle())
+    sched.spin()        # e.g. on core 1 via _thread
+"""
+
+from array import array
+from uctypes import BF_POS, BF_LEN, BFUINT32, ARRAY, UINT32, struct
+from .reg import Atomic
+
+try:
+    import asyncio
+except ImportError:
+    import uasyncio as asyncio
+
+TIMER_BASE = const(0x40054000)
+
+# Read TIMELR before TIMEHR: reading the low half latches the high half.
+# TIMEHW/TIMELW set the time (the write to TIMEHW commits both halves).
+TIMER_FIELDS = {
+    "TIMEHW": 0x00 | UINT32,
+    "TIMELW": 0x04 | UINT32,
+    "TIMEHR": 0x08 | UINT32,
+    "TIMELR": 0x0C | UINT32,
+    "ALARM": (0x10 | ARRAY, 4 | UINT32), # Write arms; fires when TIMELR matches
+    "ARMED": 0x20 | UINT32,     # One bit per alarm; write 1 to disarm
+    "TIMERAWH": 0x24 | UINT32,  # Unlatched
+    "TIMERAWL": 0x28 | UINT32,
+    "DBGPAUSE": 0x2C | UINT32,
+    "PAUSE": 0x30 | UINT32,
+    "INTR": 0x34 | UINT32,      # Raw, one bit per alarm; write 1 to clear
+    "INTE": 0x38 | UINT32,
+    "INTF": 0x3C | UINT32,
+    "INTS": 0x40 | UINT32,
+}
+
+timer = struct(TIMER_BASE, TIMER_FIELDS)
+timer_atomic = Atomic(TIMER_BASE, TIMER_FIELDS)
+
+TIMER_NUM_ALARMS = const(4)
+
+def time_us():
+    """The full 64-bit time (allocates a long int)."""
+    lo = timer.TIMELR
+    return timer.TIMEHR << 32 | lo
+
+# MicroPython's soft timers use alarm 2 and the pico-sdk alarm pool alarm 3
+_alarms = 0b1100
+
+def claim_alarm(n=None):
+    """Claim alarm n, or the lowest free one, and return its number."""
+    global _alarms
+    if n is None:
+        for n in range(TIMER_NUM_ALARMS):
+            if not _alarms >> n & 1:
+                break
+        else:
+            raise OSError("no free timer alarm")
+    elif _alarms >> n & 1:
+        raise ValueError("alarm %d already claimed" % n)
+    _alarms |= 1 << n
+    return n
+
+def unclaim_alarm(n):
+    global _alarms
+    timer.ARMED = 1 << n
+    _alarms &= ~(1 << n)
+
+_TICKS_MASK = const(0x3FFFFFFF)
+_TICKS_HALF = const(0x20000000)
+_FREE = const(0xFFFF)
+
+class AlarmScheduler:
+    """
+    One-shot and periodic callbacks multiplexed onto one hardware alarm.
+
+    Deadlines are kept in a binary min-heap over capacity preallocated
+    entries, so call_at() and firing never allocate. Times are the low 30
+    bits of the timer, the same ticks as time.ticks_us(), and every
+    register is read through 30-bit views so that values stay small ints;
+    delays must be under 2**29 us (about 9 minutes).
+
+    The alarm is always armed for the earliest deadline. MicroPython cannot
+    attach a Python handler to TIMER_IRQ_n, so service() polls the alarm's
+    raw interrupt bit (one register read when nothing is due) and runs every
+    due callback as callback(arg). Call it from a spin() loop, ideally on a
+    core of its own, or from the run() task. A periodic entry is rescheduled
+    from its previous deadline, not from when it ran, so it does not drift;
+    periods missed entirely are skipped and counted in overruns.
+
+    With latency=n the delay from each deadline to its callback being
+    called is recorded into a ring of the last n values, see
+    latency_stats().
+    """
+
+    def __init__(self, alarm=None, capacity=16, latency=0):
+        self.alarm = claim_alarm(alarm)
+        self._bit = 1 << self.alarm
+        self.capacity = capacity
+        self.deadline = array("l", [0] * capacity)
+        self.period = array("l", [0] * capacity)
+        self.callbacks = [None] * capacity
+        self.args = [None] * capacity
+        self.heap = array("H", [0] * capacity)
+        self.pos = array("H", [_FREE] * capacity)
+        self._free = array("H", range(capacity - 1, -1, -1))
+        self._nfree = capacity
+        self.size = 0
+        self.overruns = 0
+        self._late = False
+        offset = 0x10 + 4 * self.alarm
+        self._regs = struct(TIMER_BASE, {
+            "NOW": 0x28 | 0 << BF_POS | 30 << BF_LEN | BFUINT32,
+            "NOW_HI": 0x28 | 30 << BF_POS | 2 << BF_LEN | BFUINT32,
+            "ALARM": offset | 0 << BF_POS | 30 << BF_LEN | BFUINT32,
+            "ALARM_HI": offset | 30 << BF_POS | 2 << BF_LEN | BFUINT32,
+            "INTR": 0x34 | 0 << BF_POS | 4 << BF_LEN | BFUINT32,
+        })
+        self.latency = array("l", [0] * latency)
+        self.reset_latency()
+
+    def now(self):
+        return self._regs.NOW
+
+    def call_at(self, t, callback, arg=None, period=0):
+        """
+        Run callback(arg) at tick t, then every period us if period is
+        nonzero. Returns a handle for cancel().
+        """
+        if not self._nfree:
+            raise OSError("scheduler full")
+        self._nfree -= 1
+        i = self._free[self._nfree]
+        self.deadline[i] = t & _TICKS_MASK
+        self.period[i] = period
+        self.callbacks[i] = callback
+        self.args[i] = arg
+        self._push(i)
+        if not self.pos[i]:
+            self._arm()
+        return i
+
+    def call_after(self, delay, callback, arg=None):
+        return self.call_at(self._regs.NOW + delay, callback, arg)
+
+    def call_every(self, period, callback, arg=None, first=None):
+        """Run callback(arg) every period us, first after first us (default period)."""
+        return self.call_at(self._regs.NOW + (period if first is None else first), callback, arg, period)
+
+    def cancel(self, h):
+        """Cancel an entry; returns False if it had already run."""
+        p = self.pos[h]
+        if p == _FREE:
+            return False
+        self._remove(p)
+        self._release(h)
+        if not p:
+            self._arm()
+        return True
+
+    def pending(self):
+        return self.size
+
+    def next_due(self):
+        """Microseconds until the earliest deadline (negative if late), or None."""
+        if not self.size:
+            return None
+        return ((self.deadline[self.heap[0]] - self._regs.NOW + _TICKS_HALF) & _TICKS_MASK) - _TICKS_HALF
+
+    def service(self, _=None):
+        """Run every due callback; returns how many ran."""
+        regs = self._regs
+        if not (regs.INTR & self._bit or self._late):
+            return 0
+        timer.INTR = self._bit
+        self._late = False
+        heap = self.heap
+        deadline = self.deadline
+        period = self.period
+        latency = self.latency
+        n = 0
+        while self.size:
+            i = heap[0]
+            t = deadline[i]
+            late = ((regs.NOW - t + _TICKS_HALF) & _TICKS_MASK) - _TICKS_HALF
+            if late < 0:
+                break
+            callback = self.callbacks[i]
+            arg = self.args[i]
+            if period[i]:
+                # Reschedule before the callback so that it may cancel itself
+                t = (t + period[i]) & _TICKS_MASK
+                while ((regs.NOW - t + _TICKS_HALF) & _TICKS_MASK) - _TICKS_HALF >= 0:
+                    t = (t + period[i]) & _TICKS_MASK
+                    self.overruns += 1
+                deadline[i] = t
+                self._sift_down(0)
+            else:
+                self._remove(0)
+                self._release(i)
+            if latency:
+                latency[self._lat_count % len(latency)] = late
+            self._lat_count += 1
+            if late > self.lat_max:
+                self.lat_max = late
+            self._lat_sum += late
+            callback(arg)
+            n += 1
+        self._arm()
+        return n
+
+    def spin(self, duration=None):
+        """Service the alarm in a busy loop, for duration us or forever."""
+        regs = self._regs
+        if duration is None:
+            while True:
+                self.service()
+        end = regs.NOW + duration
+        while ((regs.NOW - end + _TICKS_HALF) & _TICKS_MASK) - _TICKS_HALF < 0:
+            self.service()
+
+    async def run(self, period_ms=0):
+        """Service the alarm from the asyncio scheduler."""
+        while True:
+            self.service()
+            await asyncio.sleep(period_ms / 1000)
+
+    def close(self):
+        for i in range(self.capacity):
+            self.callbacks[i] = self.args[i] = None
+        self.size = 0
+        unclaim_alarm(self.alarm)
+
+    def reset_latency(self):
+        self._lat_count = 0
+        self._lat_sum = 0
+        self.lat_max = 0
+
+    def latency_stats(self):
+        """
+        Deadline-to-callback delay in us since reset_latency(): count, mean
+        and max over all callbacks, and min and median over the ring.
+        """
+        count = self._lat_count
+        ring = sorted(self.latency[:min(count, len(self.latency))])
+        return {
+            "count": count,
+            "mean": self._lat_sum / count if count else 0,
+            "max": self.lat_max,
+            "min": ring[0] if ring else None,
+            "median": ring[len(ring) // 2] if ring else None,
+        }
+
+    def _arm(self):
+        regs = self._regs
+        if not self.size:
+            timer.ARMED = self._bit
+            return
+        t = self.deadline[self.heap[0]]
+        while True:
+            hi = regs.NOW_HI
+            now = regs.NOW
+            if regs.NOW_HI == hi:
+                break
+        delta = ((t - now + _TICKS_HALF) & _TICKS_MASK) - _TICKS_HALF
+        if delta <= 0:
+            self._late = True
+            return
+        # The alarm compares all 32 bits. Writing the low 30 bits first can
+        # only match the current time if the deadline has already passed.
+        regs.ALARM = t
+        regs.ALARM_HI = (hi + ((now + delta) >> 30)) & 3
+        if ((regs.NOW - t + _TICKS_HALF) & _TICKS_MASK) - _TICKS_HALF >= 0:
+            self._late = True
+
+    def _before(self, a, b):
+        d = self.deadline
+        return ((d[a] - d[b] + _TICKS_HALF) & _TICKS_MASK) < _TICKS_HALF
+
+    def _push(self, i):
+        self.heap[self.size] = i
+        self.size += 1
+        self._sift_up(self.size - 1)
+
+    def _sift_up(self, p):
+        heap = self.heap
+        pos = self.pos
+        i = heap[p]
+        while p:
+            parent = (p - 1) >> 1
+            j = heap[parent]
+            if not self._before(i, j):
+                break
+            heap[p] = j
+            pos[j] = p
+            p = parent
+        heap[p] = i
+        pos[i] = p
+
+    def _sift_down(self, p):
+        heap = self.heap
+        pos = self.pos
+        size = self.size
+        i = heap[p]
+        while True:
+            c = 2 * p + 1
+            if c >= size:
+                break
+            if c + 1 < size and self._before(heap[c + 1], heap[c]):
+                c += 1
+            j = heap[c]
+            if not self._before(j, i):
+                break
+            heap[p] = j
+            pos[j] = p
+            p = c
+        heap[p] = i
+        pos[i] = p
+
+    def _remove(self, p):
+        heap = self.heap
+        self.size -= 1
+        last = heap[self.size]
+        if p == self.size:
+            return
+        heap[p] = last
+        self.pos[last] = p
+        if p and self._before(last, heap[(p - 1) >> 1]):
+            self._sift_up(p)
+        else:
+            self._sift_down(p)
+
+    def _release(self, i):
+        self.pos[i] = _FREE
+        self.callbacks[i] = None
+        self.args[i] = None
+        self._free[self._nfree] = i
+        self._nfree += 1
@@ -0,0 +1,359 @@
+#    Copyright 2023-25 Hessam Mehr
+
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+
+#        http://www.apache.org/licenses/LICENSE-2.0
+
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+
+"""
+UARTs, with reception into a DMA ring buffer.
+
+    u = Uart(1, 3_000_000, tx=4, rx=5, ring=4096)
+    while True:
+        first, second = u.views()   # zero-copy, second non-empty on wrap
+        handle(first, second)
+        u.consume(len(first) + len(second))
+"""
+
+from uctypes import BF_POS, BF_LEN, BFUINT32, UINT32, addressof, struct
+from .clkplan import uart_div
+from .dma import *
+from .gpio import GPIO_FUNC_UART, io_bank0
+from .reg import Atomic, flatten, pack
+from .resets import RESETS_UART, unreset
+
+try:
+    import asyncio
+except ImportError:
+    import uasyncio as asyncio
+
+try:
+    from time import ticks_us, ticks_diff
+except ImportError:
+    from time import perf_counter
+
+    def ticks_us():
+        return int(perf_counter() * 1e6) & 0x3FFFFFFF
+
+    def ticks_diff(a, b):
+        return ((a - b + 0x20000000) & 0x3FFFFFFF) - 0x20000000
+
+UART_BASE = [0x40034000, 0x40038000]
+
+UARTDR_FIELDS = {
+    "OE": 11 << BF_POS | 1 << BF_LEN | BFUINT32, # Overrun error
+    "BE": 10 << BF_POS | 1 << BF_LEN | BFUINT32, # Break error
+    "PE": 9 << BF_POS | 1 << BF_LEN | BFUINT32,  # Parity error
+    "FE": 8 << BF_POS | 1 << BF_LEN | BFUINT32,  # Framing error
+    "DATA": 0 << BF_POS | 8 << BF_LEN | BFUINT32,
+}
+
+UARTRSR_FIELDS = {
+    "OE": 3 << BF_POS | 1 << BF_LEN | BFUINT32,
+    "BE": 2 << BF_POS | 1 << BF_LEN | BFUINT32,
+    "PE": 1 << BF_POS | 1 << BF_LEN | BFUINT32,
+    "FE": 0 << BF_POS | 1 << BF_LEN | BFUINT32,
+}
+
+UARTFR_FIELDS = {
+    "RI": 8 << BF_POS | 1 << BF_LEN | BFUINT32,
+    "TXFE": 7 << BF_POS | 1 << BF_LEN | BFUINT32, # Transmit FIFO empty
+    "RXFF": 6 << BF_POS | 1 << BF_LEN | BFUINT32, # Receive FIFO full
+    "TXFF": 5 << BF_POS | 1 << BF_LEN | BFUINT32, # Transmit FIFO full
+    "RXFE": 4 << BF_POS | 1 << BF_LEN | BFUINT32, # Receive FIFO empty
+    "BUSY": 3 << BF_POS | 1 << BF_LEN | BFUINT32, # Transmitting
+    "DCD": 2 << BF_POS | 1 << BF_LEN | BFUINT32,
+    "DSR": 1 << BF_POS | 1 << BF_LEN | BFUINT32,
+    "CTS": 0 << BF_POS | 1 << BF_LEN | BFUINT32,
+}
+
+UARTLCR_H_FIELDS = {
+    "SPS": 7 << BF_POS | 1 << BF_LEN | BFUINT32,  # Stick parity
+    "WLEN": 5 << BF_POS | 2 << BF_LEN | BFUINT32, # Word length - 5
+    "FEN": 4 << BF_POS | 1 << BF_LEN | BFUINT32,  # FIFOs enabled
+    "STP2": 3 << BF_POS | 1 << BF_LEN | BFUINT32, # Two stop bits
+    "EPS": 2 << BF_POS | 1 << BF_LEN | BFUINT32,  # Even parity
+    "PEN": 1 << BF_POS | 1 << BF_LEN | BFUINT32,  # Parity enable
+    "BRK": 0 << BF_POS | 1 << BF_LEN | BFUINT32,  # Send break
+}
+
+UARTCR_FIELDS = {
+    "CTSEN": 15 << BF_POS | 1 << BF_LEN | BFUINT32,
+    "RTSEN": 14 << BF_POS | 1 << BF_LEN | BFUINT32,
+    "OUT2": 13 << BF_POS | 1 << BF_LEN | BFUINT32,
+    "OUT1": 12 << BF_POS | 1 << BF_LEN | BFUINT32,
+    "RTS": 11 << BF_POS | 1 << BF_LEN | BFUINT32,
+    "DTR": 10 << BF_POS | 1 << BF_LEN | BFUINT32,
+    "RXE": 9 << BF_POS | 1 << BF_LEN | BFUINT32,
+    "TXE": 8 << BF_POS | 1 << BF_LEN | BFUINT32,
+    "LBE": 7 << BF_POS | 1 << BF_LEN | BFUINT32,   # Loopback
+    "SIRLP": 2 << BF_POS | 1 << BF_LEN | BFUINT32,
+    "SIREN": 1 << BF_POS | 1 << BF_LEN | BFUINT32,
+    "UARTEN": 0 << BF_POS | 1 << BF_LEN | BFUINT32,
+}
+
+UARTIFLS_FIELDS = {
+    "RXIFLSEL": 3 << BF_POS | 3 << BF_LEN | BFUINT32, # RX level: 1/8, 1/4, 1/2, 3/4, 7/8 full
+    "TXIFLSEL": 0 << BF_POS | 3 << BF_LEN | BFUINT32,
+}
+
+# UARTIMSC, UARTRIS, UARTMIS and UARTICR
+UART_INT_FIELDS = {
+    "OE": 10 << BF_POS | 1 << BF_LEN | BFUINT32,
+    "BE": 9 << BF_POS | 1 << BF_LEN | BFUINT32,
+    "PE": 8 << BF_POS | 1 << BF_LEN | BFUINT32,
+    "FE": 7 << BF_POS | 1 << BF_LEN | BFUINT32,
+    "RT": 6 << BF_POS | 1 << BF_LEN | BFUINT32, # Receive timeout
+    "TX": 5 << BF_POS | 1 << BF_LEN | BFUINT32,
+    "RX": 4 << BF_POS | 1 << BF_LEN | BFUINT32,
+    "DSR": 3 << BF_POS | 1 << BF_LEN | BFUINT32,
+    "DCD": 2 << BF_POS | 1 << BF_LEN | BFUINT32,
+    "CTS": 1 << BF_POS | 1 << BF_LEN | BFUINT32,
+    "RI": 0 << BF_POS | 1 << BF_LEN | BFUINT32,
+}
+
+UARTDMACR_FIELDS = {
+    "DMAONERR": 2 << BF_POS | 1 << BF_LEN | BFUINT32, # Disable DMA on receive error
+    "TXDMAE": 1 << BF_POS | 1 << BF_LEN | BFUINT32,
+    "RXDMAE": 0 << BF_POS | 1 << BF_LEN | BFUINT32,
+}
+
+UART_FIELDS = {
+    "UARTDR": (0x000, UARTDR_FIELDS),
+    "UARTRSR": (0x004, UARTRSR_FIELDS),     # Write to clear
+    "UARTFR": (0x018, UARTFR_FIELDS),
+    "UARTILPR": 0x020 | UINT32,
+    "UARTIBRD": 0x024 | UINT32,             # Integer baud rate divisor
+    "UARTFBRD": 0x028 | UINT32,             # Fractional baud rate divisor, 1/64ths
+    "UARTLCR_H": (0x02C, UARTLCR_H_FIELDS), # Write after IBRD/FBRD to latch them
+    "UARTCR": (0x030, UARTCR_FIELDS),
+    "UARTIFLS": (0x034, UARTIFLS_FIELDS),
+    "UARTIMSC": (0x038, UART_INT_FIELDS),
+    "UARTRIS": (0x03C, UART_INT_FIELDS),
+    "UARTMIS": (0x040, UART_INT_FIELDS),
+    "UARTICR": (0x044, UART_INT_FIELDS),
+    "UARTDMACR": (0x048, UARTDMACR_FIELDS),
+}
+
+uarts = [struct(addr, UART_FIELDS) for addr in UART_BASE]
+uarts_atomic = [Atomic(addr, UART_FIELDS) for addr in UART_BASE]
+uarts_words = [struct(addr, flatten(UART_FIELDS)) for addr in UART_BASE]
+
+UART_PARITY_NONE = None
+UART_PARITY_EVEN = const(0)
+UART_PARITY_ODD = const(1)
+
+_ERRORS = const(0x780)  # OE, BE, PE and FE in UARTRIS
+
+class Uart:
+    """
+    UART n with reception by DMA into a ring of ring bytes (a power of two
+    up to 32768).
+
+    One DMA channel, paced by the UART's RX DREQ, moves every received byte
+    into the ring with RING_SEL=1 wrapping its write address, so the FIFO is
+    drained as fast as bytes arrive no matter what Python is doing. The
+    reader's position is kept in software and the writer's is the low bits
+    of the channel's live WRITE_ADDR, read through a bitfield view; views()
+    returns the bytes in between as up to two memoryview slices of the ring,
+    without copying. Data more than ring bytes behind the writer has been
+    overwritten: the byte count from TRANS_COUNT shows when that happened,
+    and the reader then skips ahead and counts an overrun.
+
+    Idle-line detection: the UART's own receive timeout (RT) only fires
+    while the RX FIFO holds data, which the DMA never lets it do. poll()
+    instead watches WRITE_ADDR and reports an idle line, once per burst,
+    when it has not moved for idle_us (by default 32 bit periods, as for
+    RT, but no finer than the polling rate), calling on_idle(uart) if
+    given. idle() waits for that from asyncio.
+
+    Transmission is by the CPU through the TX FIFO.
+    """
+
+    def __init__(self, n, baudrate=115200, bits=8, parity=None, stop=1, tx=None, rx=None,
+                 ring=1024, idle_us=None, on_idle=None):
+        if ring & (ring - 1) or not 2 <= ring <= 32768:
+            raise ValueError("ring must be a power of two up to 32768")
+        self.n = n
+        self.regs = uarts[n]
+        self._words = uarts_words[n]
+        unreset(RESETS_UART[n])
+        for pin in (tx, rx):
+            if pin is not None:
+                io_bank0.GPIO[pin].CTRL.FUNCSEL = GPIO_FUNC_UART
+        self.size = ring
+        self._raw = bytearray(2 * ring)
+        start = -addressof(self._raw) % ring
+        self.ring = memoryview(self._raw)[start:start + ring]
+        ring_bits = 0
+        while 1 << ring_bits < ring:
+            ring_bits += 1
+        self._config = DmaConfig(
+            read_addr=UART_BASE[n],
+            write_addr=addressof(self.ring),
+            trans_count=0xFFFFFFFF,
+            TREQ_SEL=DREQ_UART0_RX + 2 * n,
+            DATA_SIZE=DMA_SIZE_BYTE,
+            INCR_READ=0,
+            INCR_WRITE=1,
+            RING_SEL=1,
+            RING_SIZE=ring_bits,
+        )
+        self.dma_ch = allocator.claim_channel(owner=self)
+        # Allocation-free views of the channel's progress
+        self._pos = struct(DMA_BASE + self.dma_ch * DMA_CH_STRIDE, {
+            "HEAD": 0x004 | 0 << BF_POS | ring_bits << BF_LEN | BFUINT32,
+            "LEFT": 0x008 | 0 << BF_POS | 30 << BF_LEN | BFUINT32,
+            "BUSY": 0x00C | 24 << BF_POS | 1 << BF_LEN | BFUINT32,
+        })
+        self.tail = 0
+        self.consumed = 0
+        self.overruns = 0
+        self.on_idle = on_idle
+        self._idle_us = idle_us
+        self._last_head = 0
+        self._last_move = ticks_us()
+        self._idle = True
+        self.init(baudrate, bits, parity, stop)
+
+    def init(self, baudrate=115200, bits=8, parity=None, stop=1):
+        """Reconfigure the line; reception restarts with an empty ring."""
+        ibrd, fbrd, self.baudrate, self.ppm = uart_div(baudrate)
+        self.idle_us = self._idle_us or 32 * 1_000_000 // baudrate + 1
+        self._stop_rx()
+        w = self._words
+        w.UARTCR = 0
+        w.UARTIBRD = ibrd
+        w.UARTFBRD = fbrd
+        w.UARTLCR_H = pack(UARTLCR_H_FIELDS, WLEN=bits - 5, FEN=1, STP2=stop == 2,
+                           PEN=parity is not None, EPS=parity == UART_PARITY_EVEN)
+        w.UARTIMSC = 0
+        w.UARTICR = 0x7FF
+        w.UARTDMACR = pack(UARTDMACR_FIELDS, RXDMAE=1)
+        self._config.apply(self.dma_ch)
+        self.tail = 0
+        self.consumed = 0
+        self._last_head = 0
+        w.UARTCR = pack(UARTCR_FIELDS, UARTEN=1, TXE=1, RXE=1)
+
+    def _stop_rx(self):
+        self._words.UARTDMACR = 0
+        dma_words.CHAN_ABORT = 1 << self.dma_ch
+        while dma_words.CHAN_ABORT:
+            pass
+
+    def _written(self):
+        # Bytes written since init, modulo 2**30
+        return (0x3FFFFFFF - self._pos.LEFT) & 0x3FFFFFFF
+
+    def any(self):
+        """Number of received bytes not yet consumed."""
+        n = (self._written() - self.consumed) & 0x3FFFFFFF
+        if n > self.size:
+            # The writer has lapped the reader: drop everything but the
+            # latest ring's worth, which may itself be torn at the start
+            self.overruns += 1
+            self.consumed = (self._written() - self.size) & 0x3FFFFFFF
+            self.tail = self._pos.HEAD
+            return self.size
+        return n
+
+    def views(self):
+        """
+        The unconsumed bytes as two memoryview slices of the ring, the
+        second non-empty when they wrap. Valid until consume() and until
+        the writer comes round again.
+        """
+        n = self.any()
+        tail = self.tail
+        end = tail + n
+        if end <= self.size:
+            return self.ring[tail:end], self.ring[0:0]
+        return self.ring[tail:], self.ring[:end - self.size]
+
+    def consume(self, n):
+        self.tail = (self.tail + n) & (self.size - 1)
+        self.consumed = (self.consumed + n) & 0x3FFFFFFF
+
+    def readinto(self, buf, nbytes=None):
+        """Copy up to nbytes (default len(buf)) received bytes into buf; returns the count."""
+        first, second = self.views()
+        n = min(len(first) + len(second), len(buf) if nbytes is None else nbytes)
+        k = min(n, len(first))
+        buf[:k] = first[:k]
+        if n > k:
+            buf[k:n] = second[:n - k]
+        self.consume(n)
+        return n
+
+    def read(self, nbytes=None):
+        n = self.any()
+        buf = bytearray(n if nbytes is None else min(n, nbytes))
+        self.readinto(buf)
+        return buf
+
+    def write(self, buf):
+        regs = self.regs
+        w = self._words
+        for b in buf:
+            while regs.UARTFR.TXFF:
+                pass
+            w.UARTDR = b
+
+    def flush(self):
+        """Wait until everything written has been sent."""
+        while self.regs.UARTFR.BUSY:
+            pass
+
+    def errors(self):
+        """Read and clear the sticky receive errors as a UART_INT_FIELDS mask."""
+        w = self._words
+        err = w.UARTRIS & _ERRORS
+        if err:
+            w.UARTICR = err
+        return err
+
+    def poll(self):
+        """
+        Check for an idle line, restarting the channel if it has run out of
+        transfers. Returns True once per burst, when the line goes idle.
+        """
+        pos = self._pos
+        if not pos.BUSY:
+            # 2**32 - 1 bytes received: restart the count where it stopped
+            self.consumed = (self.consumed - self._written()) & 0x3FFFFFFF
+            config = self._config
+            config.write_addr = addressof(self.ring) + pos.HEAD
+            config.apply(self.dma_ch)
+            config.write_addr = addressof(self.ring)
+        head = pos.HEAD
+        now = ticks_us()
+        if head != self._last_head:
+            self._last_head = head
+            self._last_move = now
+            self._idle = False
+            return False
+        if self._idle or ticks_diff(now, self._last_move) < self.idle_us:
+            return False
+        self._idle = True
+        if self.on_idle is not None:
+            self.on_idle(self)
+        return True
+
+    async def idle(self, period_ms=0):
+        """Wait for the line to go idle after a burst."""
+        while not self.poll():
+            await asyncio.sleep(period_ms / 1000)
+
+    def deinit(self):
+        self._stop_rx()
+        self._words.UARTCR = 0
+        allocator.unclaim_channel(self.dma_ch)
+        self.dma_ch = None